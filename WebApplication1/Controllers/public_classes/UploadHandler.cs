@@ -77,6 +77,16 @@ namespace WebApplication1.Controllers.public_classes
                             newVal = valueElement.GetProperty("newVal").GetString()
                         };
                     }
+                    else if (valueElement.ValueKind == JsonValueKind.Array)
+                    {
+                        value = valueElement.EnumerateArray()
+                            .Select(pair => new
+                            {
+                                oldVal = pair.GetProperty("oldVal").GetString(),
+                                newVal = pair.GetProperty("newVal").GetString()
+                            })
+                            .ToList();
+                    }
                     else if (valueElement.ValueKind != JsonValueKind.Null)
                     {
                         value = valueElement.GetString();
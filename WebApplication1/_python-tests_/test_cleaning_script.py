@@ -1,7 +1,14 @@
 import unittest
+import os
+import sys
+import subprocess
+import tempfile
+import tracemalloc
+import numpy as np
 import pandas as pd
 import json
-from cleaning_script import clean_csv, DataCleaningError
+from io import StringIO
+from cleaning_script import apply_cleaning, safe_typecast, replace_values, clean_csv, clean_pipeline, clean_csv_stream, DataCleaningError
 
 class TestDataCleaningErrorHandling(unittest.TestCase):
     def setUp(self):
@@ -131,5 +138,326 @@ class TestDataCleaningErrorHandling(unittest.TestCase):
                 )
         self.assertEqual(context.exception.error_type, "JSON_PARSE_ERROR")
 
+class TestCleaningPipeline(unittest.TestCase):
+    def setUp(self):
+        self.csv_with_nulls = "id,name,value\n1,a,100\n2,,x\n3,b,\n4,,300"
+
+    def test_pipeline_applies_steps_in_order(self):
+        operations = [
+            {"method": "typecast", "column": "value", "target_type": "float"},
+            {"method": "fillna_median", "column": "value"},
+            {"method": "dropna", "column": "name"}
+        ]
+        result = pd.read_csv(StringIO(clean_pipeline(self.csv_with_nulls, operations)))
+        self.assertEqual(result["id"].tolist(), [1, 3])
+        self.assertEqual(result["value"].tolist(), [100.0, 200.0])
+
+    def test_pipeline_matches_sequential_calls(self):
+        operations = [
+            {"method": "fillna", "column": "name", "value": "unknown"},
+            {"method": "replace", "column": "name", "value": {"oldVal": "unknown", "newVal": "n/a"}, "target_type": "exact"}
+        ]
+        sequential = self.csv_with_nulls
+        for operation in operations:
+            sequential = clean_csv(sequential, **operation)
+        self.assertEqual(clean_pipeline(self.csv_with_nulls, operations), sequential)
+
+    def test_pipeline_reports_failing_step(self):
+        operations = [
+            {"method": "dropna", "column": "name"},
+            {"method": "typecast", "column": "value", "target_type": "invalid_type"}
+        ]
+        with self.assertRaises(DataCleaningError) as context:
+            clean_pipeline(self.csv_with_nulls, operations)
+        self.assertEqual(context.exception.error_type, "INVALID_TYPE")
+        self.assertIn("step 2 (typecast)", str(context.exception))
+
+    def test_pipeline_empty_operations(self):
+        with self.assertRaises(DataCleaningError) as context:
+            clean_pipeline(self.csv_with_nulls, [])
+        self.assertEqual(context.exception.error_type, "INVALID_PIPELINE")
+
+class TestStreamingCleaning(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        values = rng.normal(50, 10, 200).round(2)
+        values[rng.random(200) < 0.3] = np.nan
+        counts = rng.integers(0, 5, 200).astype(float)
+        counts[rng.random(200) < 0.3] = np.nan
+        frame = pd.DataFrame({"value": values, "count": counts})
+        frame.iloc[150:190, 0] = np.nan
+        self.csv = frame.to_csv(index=False)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmp_dir.name, "input.csv")
+        self.output_path = os.path.join(self.tmp_dir.name, "output.csv")
+        with open(self.input_path, "w") as handle:
+            handle.write(self.csv)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assert_stream_matches(self, **options):
+        rows = clean_csv_stream(self.input_path, self.output_path, chunksize=17, **options)
+        streamed = pd.read_csv(self.output_path)
+        expected = pd.read_csv(StringIO(clean_csv(self.csv, **options)))
+        self.assertEqual(rows, len(expected))
+        pd.testing.assert_frame_equal(streamed, expected, check_dtype=False)
+
+    def test_row_local_methods_match_in_memory(self):
+        self.assert_stream_matches(method="dropna")
+        self.assert_stream_matches(method="dropna", column="value")
+        self.assert_stream_matches(method="fillna", column="count", value=0)
+        self.assert_stream_matches(method="replace", column="count", value={"oldVal": "1", "newVal": "10"}, target_type="exact")
+
+    def test_fills_carry_across_chunk_boundaries(self):
+        for method in ("ffill", "bfill"):
+            for limit in (None, "3", "25"):
+                self.assert_stream_matches(method=method, limit=limit)
+                self.assert_stream_matches(method=method, column="value", limit=limit)
+
+    def test_two_pass_statistics(self):
+        self.assert_stream_matches(method="fillna_mean")
+        self.assert_stream_matches(method="fillna_mode", column="count")
+        self.assert_stream_matches(method="fillna_median", column="value")
+
+    def test_non_numeric_mean(self):
+        with open(self.input_path, "w") as handle:
+            handle.write("id,name\n1,a\n2,")
+        with self.assertRaises(DataCleaningError) as context:
+            clean_csv_stream(self.input_path, self.output_path, method="fillna_mean", column="name")
+        self.assertEqual(context.exception.error_type, "INVALID_OPERATION")
+        self.assertFalse(os.path.exists(self.output_path))
+
+    def test_datetime_format_is_inferred_once_for_the_file(self):
+        csv_data = "date\n" + "01/02/2020\n" * 20 + "25/12/2020\n" * 20
+        with open(self.input_path, "w") as handle:
+            handle.write(csv_data)
+        clean_csv_stream(self.input_path, self.output_path, method="typecast", column="date", target_type="datetime", chunksize=7)
+        with open(self.output_path) as handle:
+            self.assertEqual(handle.read(), clean_csv(csv_data, method="typecast", column="date", target_type="datetime"))
+
+    def test_invalid_column(self):
+        with self.assertRaises(DataCleaningError) as context:
+            clean_csv_stream(self.input_path, self.output_path, method="ffill", column="missing")
+        self.assertEqual(context.exception.error_type, "INVALID_COLUMN")
+
+    def test_invalid_column_of_two_pass_methods(self):
+        for method in ("fillna_mean", "fillna_median", "fillna_mode"):
+            with self.subTest(method=method):
+                with self.assertRaises(DataCleaningError) as context:
+                    clean_csv_stream(self.input_path, self.output_path, method=method, column="missing")
+                self.assertEqual(context.exception.error_type, "INVALID_COLUMN")
+                self.assertFalse(os.path.exists(self.output_path))
+
+class TestTypecastEngine(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({
+            "number": ["1", "2.5", None, "4", "x"],
+            "flag": ["yes", "No", None, "TRUE", "maybe"],
+            "date": ["2021-03-04", "2021-03-05", None, "bad", "2021-03-07"],
+            "code": [1.0, 0.0, None, 1.0, 3.0]
+        })
+
+    def typecast(self, column, target_type, **options):
+        report = {}
+        result = safe_typecast(self.data, target_type, column, report=report, **options)
+        return result[column], report["typecast"][column]["coerced_to_null"]
+
+    def test_int_is_nullable(self):
+        values, coerced = self.typecast("number", "int")
+        self.assertEqual(str(values.dtype), "Int64")
+        self.assertEqual(values.tolist(), [1, pd.NA, pd.NA, 4, pd.NA])
+        self.assertEqual(coerced, 2)
+
+    def test_bool_is_nullable(self):
+        values, coerced = self.typecast("flag", "bool")
+        self.assertEqual(str(values.dtype), "boolean")
+        self.assertEqual(values.tolist(), [True, False, pd.NA, True, pd.NA])
+        self.assertEqual(coerced, 1)
+
+        values, coerced = self.typecast("code", "bool")
+        self.assertEqual(values.tolist(), [True, False, pd.NA, True, pd.NA])
+        self.assertEqual(coerced, 1)
+
+    def test_datetime_infers_format(self):
+        values, coerced = self.typecast("date", "datetime")
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(values))
+        self.assertEqual(values.iloc[0], pd.Timestamp("2021-03-04"))
+        self.assertEqual(coerced, 1)
+
+    def test_datetime_prefers_format_that_parses_most_samples(self):
+        data = pd.DataFrame({"date": ["03/04/2021", "13/04/2021", "25/12/2020"]})
+        values = safe_typecast(data, "datetime", "date")["date"]
+        self.assertEqual(values.tolist(), [pd.Timestamp("2021-04-03"), pd.Timestamp("2021-04-13"), pd.Timestamp("2020-12-25")])
+
+    def test_datetime_falls_back_to_iso8601(self):
+        data = pd.DataFrame({"date": ["2020-02-01 10:30", "2020-02-01", "bad"]})
+        values = safe_typecast(data, "datetime", "date", date_format="%Y-%m-%d %H:%M")["date"]
+        self.assertEqual(values.tolist()[:2], [pd.Timestamp("2020-02-01 10:30"), pd.Timestamp("2020-02-01")])
+        self.assertTrue(pd.isna(values.iloc[2]))
+
+    def test_datetime_of_numbers(self):
+        data = pd.DataFrame({"epoch": [1577836800, None], "millis": [1577836800000, None], "digits": [20200101, None]})
+        expected = [pd.Timestamp("2020-01-01"), pd.NaT]
+        self.assertEqual(safe_typecast(data, "datetime", "epoch")["epoch"].tolist(), expected)
+        self.assertEqual(safe_typecast(data, "datetime", "millis", date_format="ms")["millis"].tolist(), expected)
+        self.assertEqual(safe_typecast(data, "datetime", "digits")["digits"].tolist(), expected)
+
+    def test_datetime_explicit_format(self):
+        csv_data = "date\n03/04/2021\n04/05/2021"
+        result = clean_csv(csv_data, method="typecast", column="date", target_type="datetime", value="%m/%d/%Y")
+        self.assertEqual(result, "date\n2021-03-04\n2021-04-05\n")
+
+    def test_category(self):
+        values, coerced = self.typecast("flag", "category")
+        self.assertEqual(str(values.dtype), "category")
+        self.assertEqual(coerced, 0)
+
+    def test_errors_raise(self):
+        with self.assertRaises(DataCleaningError) as context:
+            safe_typecast(self.data, "int", "number", errors="raise")
+        self.assertEqual(context.exception.error_type, "TYPECAST_ERROR")
+
+    def test_report_is_returned_with_the_response(self):
+        from cleaning_script import process_request
+        response = process_request({"csv_data": "a\n1\nx", "method": "typecast", "column": "a", "target_type": "int"})
+        self.assertEqual(response["Report"]["typecast"], {"a": {"target_type": "int", "coerced_to_null": 1}})
+        self.assertEqual(response["Report"]["changes"], {"columns": ["a"], "rows_changed": False})
+
+class TestChangeReport(unittest.TestCase):
+    def setUp(self):
+        self.csv = "a,b,c\n1,,x\n2,5,\n3,6,z\n"
+
+    def changes(self, **request):
+        from cleaning_script import process_request
+        return process_request({"csv_data": self.csv, **request})["Report"]["changes"]
+
+    def test_single_column_methods_touch_that_column(self):
+        self.assertEqual(self.changes(method="fillna", column="b", value=0), {"columns": ["b"], "rows_changed": False})
+        self.assertEqual(self.changes(method="typecast", column="a", target_type="float"), {"columns": ["a"], "rows_changed": False})
+
+    def test_whole_frame_fill_lists_only_columns_with_gaps(self):
+        self.assertEqual(self.changes(method="fillna", value=0), {"columns": ["b", "c"], "rows_changed": False})
+
+    def test_dropping_rows_changes_every_column(self):
+        self.assertEqual(self.changes(method="dropna"), {"columns": ["a", "b", "c"], "rows_changed": True})
+        self.assertEqual(self.changes(method="dropna", column="a"), {"columns": [], "rows_changed": False})
+
+    def test_pipeline_reports_net_changes(self):
+        changes = self.changes(operations=[
+            {"method": "fillna", "column": "b", "value": 0},
+            {"method": "replace", "column": "c", "value": {"oldVal": "x", "newVal": "y"}, "target_type": "exact"}
+        ])
+        self.assertEqual(changes, {"columns": ["b", "c"], "rows_changed": False})
+
+class TestReplaceEngine(unittest.TestCase):
+    def setUp(self):
+        self.csv = "name,code,score\nalpha.1,a1,1\nbeta,b2,2\nalphax1,a1,1\n,c3,3"
+
+    def replace(self, pairs, target_type, column=None):
+        value = [{"oldVal": old, "newVal": new} for old, new in pairs]
+        return pd.read_csv(StringIO(clean_csv(self.csv, method="replace", column=column, value=value, target_type=target_type)))
+
+    def test_exact_many_pairs(self):
+        result = self.replace([("beta", "B"), ("a1", "A"), ("1", "10")], "exact")
+        self.assertEqual(result["name"].tolist()[:3], ["alpha.1", "B", "alphax1"])
+        self.assertEqual(result["code"].tolist(), ["A", "b2", "A", "c3"])
+        self.assertEqual(result["score"].tolist(), [10, 2, 10, 3])
+
+    def test_contains_is_literal(self):
+        result = self.replace([("a.1", "dotted")], "contains", column="name")
+        self.assertEqual(result["name"].tolist()[:3], ["dotted", "beta", "alphax1"])
+
+    def test_contains_skips_non_text_columns(self):
+        result = self.replace([("1", "one")], "contains")
+        self.assertEqual(result["score"].tolist(), [1, 2, 1, 3])
+        self.assertEqual(result["code"].tolist(), ["one", "b2", "one", "c3"])
+
+    def test_contains_first_matching_pair_wins(self):
+        result = self.replace([("alphax", "long"), ("alpha", "short")], "contains", column="name")
+        self.assertEqual(result["name"].tolist()[:3], ["short", "beta", "long"])
+        result = self.replace([("alpha", "short"), ("alphax", "long")], "contains", column="name")
+        self.assertEqual(result["name"].tolist()[:3], ["short", "beta", "short"])
+
+    def test_contains_and_regex_agree_on_pair_order(self):
+        data = pd.DataFrame({"word": ["ab", "ba", "a", "c"]})
+        pairs = [("b", "B"), ("a", "A")]
+        for mode in ("contains", "regex"):
+            with self.subTest(mode=mode):
+                self.assertEqual(replace_values(data, pairs, mode)["word"].tolist(), ["B", "B", "A", "c"])
+
+    def test_regex_first_matching_pair_wins(self):
+        result = self.replace([("^b", "starts-b"), ("\\d$", "ends-digit")], "regex")
+        self.assertEqual(result["code"].tolist(), ["ends-digit", "starts-b", "ends-digit", "ends-digit"])
+
+    def test_invalid_regex(self):
+        with self.assertRaises(DataCleaningError) as context:
+            self.replace([("(", "x")], "regex")
+        self.assertEqual(context.exception.error_type, "REPLACE_ERROR")
+
+    def test_matches_sequential_single_pair_replace(self):
+        data = pd.DataFrame({"word": [f"w{i % 500}" for i in range(5000)]})
+        pairs = [(f"w{i}", f"W{i}") for i in range(0, 500, 3)]
+        expected = data.copy()
+        for old, new in pairs:
+            expected = replace_values(expected, [(old, new)], "exact")
+        report = {}
+        result = replace_values(data, pairs, "exact", report=report)
+        pd.testing.assert_frame_equal(result, expected)
+        self.assertEqual(report["replace"]["word"], 1670)
+
+class TestCleaningMemoryPeak(unittest.TestCase):
+    """Peak allocations per method, relative to the size of the input frame"""
+
+    METHODS = [
+        ("typecast", {"target_type": "int"}),
+        ("fillna", {"value": 0}),
+        ("ffill", {}),
+        ("bfill", {}),
+        ("fillna_mean", {}),
+        ("fillna_median", {}),
+        ("fillna_mode", {}),
+        ("replace", {"value": {"oldVal": "1", "newVal": "2"}, "target_type": "exact"})
+    ]
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        values = rng.random((20_000, 20))
+        values[rng.random(values.shape) < 0.1] = np.nan
+        self.data = pd.DataFrame(values, columns=[f"c{i}" for i in range(20)])
+        self.snapshot = self.data.copy()
+        self.size = self.data.memory_usage(index=True, deep=True).sum()
+
+    def peak_ratio(self, method, **options):
+        tracemalloc.start()
+        try:
+            result = apply_cleaning(self.data, method=method, **options)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        pd.testing.assert_frame_equal(self.data, self.snapshot)
+        self.assertEqual(result.shape, self.data.shape)
+        return peak / self.size
+
+    def test_single_column_methods_do_not_copy_the_frame(self):
+        for method, options in self.METHODS:
+            with self.subTest(method=method):
+                self.assertLess(self.peak_ratio(method, column="c0", **options), 0.5)
+
+    def test_whole_frame_methods_stay_close_to_one_copy(self):
+        for method, options in self.METHODS:
+            if method == "typecast":
+                continue
+            with self.subTest(method=method):
+                self.assertLess(self.peak_ratio(method, **options), 1.75)
+
+    def test_pandas_options_are_left_alone(self):
+        # In a fresh interpreter, as this one has imported cleaning_script already.
+        code = ("import pandas as pd; default = pd.get_option('mode.copy_on_write'); import cleaning_script; "
+                "cleaning_script.apply_cleaning(pd.DataFrame({'a': [1.0, None]}), method='fillna_mean'); "
+                "print(pd.get_option('mode.copy_on_write') == default)")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "True")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,160 @@
+import unittest
+import os
+from unittest.mock import patch
+import tempfile
+import pandas as pd
+from io import StringIO
+from dataset_cache import DatasetCache, ExtractionCache, content_id, get_dataset_cache, result_id
+import cleaning_script
+import info_script
+import visualisation_data
+
+def make_frame(rows):
+    return pd.DataFrame({"id": range(rows), "value": [float(i) for i in range(rows)]})
+
+class TestDatasetCache(unittest.TestCase):
+    def test_load_parses_once_per_content(self):
+        cache = DatasetCache()
+        calls = []
+
+        def parse(text):
+            calls.append(text)
+            return pd.read_csv(StringIO(text))
+
+        first_id, first = cache.load("a,b\n1,2", parse)
+        second_id, second = cache.load("a,b\n1,2", parse)
+        self.assertEqual(first_id, second_id)
+        self.assertIs(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertNotEqual(first_id, content_id("a,b\n1,3"))
+
+    def test_lru_eviction_respects_budget(self):
+        frame_size = int(make_frame(100).memory_usage(index=True, deep=True).sum())
+        cache = DatasetCache(memory_budget=frame_size * 2)
+        cache.put("a", make_frame(100))
+        cache.put("b", make_frame(100))
+        cache.get("a")
+        cache.put("c", make_frame(100))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertLessEqual(cache.memory_usage, cache.memory_budget)
+
+    def test_evicted_frames_are_spilled_to_disk(self):
+        frame_size = int(make_frame(100).memory_usage(index=True, deep=True).sum())
+        with tempfile.TemporaryDirectory() as spill_dir:
+            cache = DatasetCache(memory_budget=frame_size, spill_dir=spill_dir)
+            cache.put("a", make_frame(100))
+            cache.put("b", make_frame(100))
+            self.assertIn("a", cache)
+            pd.testing.assert_frame_equal(cache.get("a"), make_frame(100))
+
+            fresh_cache = DatasetCache(memory_budget=frame_size, spill_dir=spill_dir)
+            self.assertIsNotNone(fresh_cache.get("a"))
+
+    def test_frames_larger_than_budget_are_not_kept_in_memory(self):
+        cache = DatasetCache(memory_budget=10)
+        cache.put("a", make_frame(100))
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.memory_usage, 0)
+
+class TestExtractionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = ExtractionCache(self.tmp.name, max_bytes=1000)
+
+    def entries(self):
+        return sorted(name for name in os.listdir(self.tmp.name))
+
+    def test_key_covers_content_and_params(self):
+        key = ExtractionCache.key(b"%PDF", format=".pdf", mode="fast")
+        self.assertEqual(key, ExtractionCache.key(b"%PDF", mode="fast", format=".pdf"))
+        self.assertNotEqual(key, ExtractionCache.key(b"%PDF", format=".pdf", mode="exhaustive"))
+        self.assertNotEqual(key, ExtractionCache.key(b"%PDF-", format=".pdf", mode="fast"))
+
+    def test_round_trip_leaves_no_temporary_files(self):
+        self.assertIsNone(self.cache.get("missing"))
+        self.cache.put("a", b"[1, 2]")
+        self.assertEqual(self.cache.get("a"), b"[1, 2]")
+        self.assertEqual(self.entries(), ["a.json"])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for age, key in enumerate("abc"):
+            self.cache.put(key, b"x" * 300)
+            os.utime(os.path.join(self.tmp.name, f"{key}.json"), (1000 + age, 1000 + age))
+        self.cache.get("a")
+        self.cache.put("d", b"x" * 300)
+        self.assertEqual(self.entries(), ["a.json", "c.json", "d.json"])
+
+    def test_payloads_larger_than_the_cache_are_not_stored(self):
+        self.cache.put("big", b"x" * 1001)
+        self.assertEqual(self.entries(), [])
+
+class TestDatasetIdRequests(unittest.TestCase):
+    def setUp(self):
+        self.csv = "Type,Value\nA,10\nB,\nA,12"
+
+    def test_operations_chain_through_dataset_ids(self):
+        cleaned = cleaning_script.process_request({"csv_data": self.csv, "method": "dropna"})
+        self.assertEqual(cleaned["DatasetId"], result_id(content_id(cleaned["Data"])))
+        with patch("cleaning_script.content_id", wraps=content_id) as hashed:
+            cleaning_script.process_request({"csv_data": self.csv, "method": "fillna", "value": 0})
+        self.assertEqual(hashed.call_count, 1)
+
+        info = info_script.process_request({"dataset_id": cleaned["DatasetId"]})
+        self.assertEqual(info["Status"], "success")
+        self.assertEqual(info["Data"], info_script.csv_info(cleaned["Data"]))
+
+        chart = visualisation_data.process_request({
+            "dataset_id": cleaned["DatasetId"], "method": "sum",
+            "target_column": "Type", "selected_cols": ["Value"]
+        })
+        self.assertEqual(pd.read_csv(StringIO(chart["Data"]))["Value_Total"].tolist(), [22.0])
+
+    def test_chart_of_inline_data_hashes_it_once(self):
+        with patch("dataset_cache.content_id", wraps=content_id) as loaded, \
+                patch("visualisation_data.content_id", wraps=content_id) as looked_up:
+            chart = visualisation_data.process_request({"csv_data": self.csv + "\nC,1", "method": "sum",
+                                                        "target_column": "Type", "selected_cols": ["Value"]})
+        self.assertEqual(chart["DatasetId"], content_id(self.csv + "\nC,1"))
+        self.assertEqual(loaded.call_count + looked_up.call_count, 1)
+
+    def test_uploading_a_result_parses_it_afresh(self):
+        requests = [({"method": "typecast", "column": "Value", "target_type": "str"}, {"method": "dropna"}, 2),
+                    ({"method": "typecast", "column": "Type", "target_type": "category"},
+                     {"method": "fillna_mean", "column": "Value"}, 3)]
+        for first, then, rows in requests:
+            with self.subTest(first=first):
+                result = cleaning_script.process_request({"csv_data": self.csv, **first})["Data"]
+                warm = cleaning_script.process_request({"csv_data": result, **then})
+                get_dataset_cache().clear()
+                cold = cleaning_script.process_request({"csv_data": result, **then})
+                self.assertEqual(warm["Data"], cold["Data"])
+                self.assertEqual(len(pd.read_csv(StringIO(warm["Data"]))), rows)
+
+    def test_inline_data_larger_than_the_cache_budget(self):
+        with patch("dataset_cache._default_cache", DatasetCache(memory_budget=1)):
+            info = info_script.process_request({"csv_data": self.csv})
+            self.assertEqual(info["Data"], info_script.csv_info(self.csv))
+            for method in ("sum", "rollup"):
+                with self.subTest(method=method):
+                    chart = visualisation_data.process_request({"csv_data": self.csv, "method": method,
+                                                                "target_column": "Type", "selected_cols": ["Value"]})
+                    self.assertEqual(chart["Status"], "success")
+
+    def test_unknown_dataset_id(self):
+        with self.assertRaises(cleaning_script.DataCleaningError) as context:
+            cleaning_script.clean_csv(None, dataset_id="missing")
+        self.assertEqual(context.exception.error_type, "DATASET_NOT_FOUND")
+
+        with self.assertRaises(info_script.DataCleaningError) as context:
+            info_script.csv_info(None, dataset_id="missing")
+        self.assertEqual(context.exception.error_type, "DATASET_NOT_FOUND")
+
+        with self.assertRaises(visualisation_data.DataCleaningError) as context:
+            visualisation_data.vis_data(None, "sum", "Type", ["Value"], dataset_id="missing")
+        self.assertEqual(context.exception.error_type, "DATASET_NOT_FOUND")
+
+if __name__ == '__main__':
+    unittest.main()
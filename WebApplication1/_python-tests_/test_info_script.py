@@ -0,0 +1,296 @@
+import unittest
+import os
+import tempfile
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from io import StringIO
+from unittest import mock
+import cleaning_script
+import info_script
+from info_script import (column_type_counts, type_counts, csv_info, csv_info_sample, csv_info_stream, merge_profiles,
+                         profile_chunks, profile_info, process_request)
+from dataset_cache import content_id
+from benchmarks.parallel_profile import make_wide_frame, measure_scaling
+from benchmarks.type_profile import make_frame, per_cell_type_counts
+
+class TestTypeCounts(unittest.TestCase):
+    def assert_same_rows(self, data):
+        expected = per_cell_type_counts(data).fillna(0).astype("int64")
+        result = type_counts(data).fillna(0).astype("int64")
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_matches_per_cell_profile(self):
+        frames = {
+            "csv": pd.DataFrame({"a": [1, 2], "b": ["x", None], "c": [1.5, np.nan], "d": [True, False]}),
+            "single text column": pd.DataFrame({"s": [np.nan, "y", None]}),
+            "mixed objects": pd.DataFrame({"m": [1, "a", 2.5, None, True, np.nan, pd.NaT]}, dtype=object),
+            "categorical": pd.DataFrame({"k": pd.Categorical(["a", None, "b"]), "n": pd.Categorical([1, 2, None])}),
+            "datetime-like": pd.DataFrame({
+                "t": pd.to_datetime(["2020-01-01", None]),
+                "tz": pd.to_datetime(["2020-01-01", None]).tz_localize("UTC"),
+                "td": pd.to_timedelta([1, None])
+            }),
+            "all missing": pd.DataFrame({"n": [None, None]}),
+            "generated": make_frame(1000)
+        }
+        for name, data in frames.items():
+            with self.subTest(frame=name):
+                self.assert_same_rows(data)
+
+    def test_nullable_missing_values_are_na(self):
+        counts = column_type_counts(pd.Series([1, None, 3], dtype="Int64"))
+        self.assertEqual(counts.to_dict(), {"<class 'int'>": 2, "<class 'pandas._libs.missing.NAType'>": 1})
+
+    def test_info_keeps_type_count_rows(self):
+        info = pd.read_csv(StringIO(csv_info("a,b\n1,x\n2,")), index_col=0)
+        self.assertEqual(info.loc["<class 'int'>"].astype(float).tolist(), [2, 0])
+        self.assertEqual(info.loc["<class 'str'>"].astype(float).tolist(), [0, 1])
+        self.assertEqual(info.loc["<class 'float'>"].astype(float).tolist(), [0, 1])
+
+    def test_faster_than_per_cell_profile(self):
+        data = make_frame(200_000)
+        start = time.perf_counter()
+        per_cell_type_counts(data)
+        per_cell = time.perf_counter() - start
+        start = time.perf_counter()
+        type_counts(data)
+        vectorized = time.perf_counter() - start
+        self.assertLess(vectorized * 3, per_cell)
+
+class TestStreamingInfo(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "input.csv")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w") as f:
+            f.write(text)
+        return text
+
+    def test_small_file_matches_in_memory_info(self):
+        csv = self.write("a,b,c,d,e\n1,x,1.5,True,\n2,,2.5,False,\n3,x,,True,\n4,y,4,False,\n")
+        for chunksize in (1, 3, 100):
+            with self.subTest(chunksize=chunksize):
+                info, rows = csv_info_stream(self.path, chunksize=chunksize)
+                self.assertEqual(info, csv_info(csv))
+                self.assertEqual(rows, 4)
+
+    def test_large_file_exact_and_approximate_rows(self):
+        rng = np.random.default_rng(0)
+        rows = 50_000
+        data = pd.DataFrame({
+            "value": rng.normal(100, 15, rows).round(3),
+            "label": rng.choice(["red", "green", "blue"], rows, p=[0.5, 0.3, 0.2]),
+            "code": rng.integers(0, 20_000, rows).astype(str) + "x"
+        })
+        data.loc[rng.random(rows) < 0.1, "value"] = np.nan
+        data.to_csv(self.path, index=False)
+
+        expected = pd.read_csv(StringIO(csv_info(data.to_csv(index=False))), index_col=0)
+        info = pd.read_csv(StringIO(csv_info_stream(self.path, chunksize=7000)[0]), index_col=0)
+        self.assertEqual(list(info.index), list(expected.index))
+        for row in ("count", "mean", "std", "min", "max", "null value count"):
+            self.assertAlmostEqual(float(info.loc[row, "value"]), float(expected.loc[row, "value"]), places=8)
+        for row in ("25%", "50%", "75%"):
+            self.assertAlmostEqual(float(info.loc[row, "value"]), float(expected.loc[row, "value"]), delta=1.0)
+        self.assertEqual(info.loc["top", "label"], "red")
+        self.assertEqual(info.loc["freq", "label"], expected.loc["freq", "label"])
+        self.assertEqual(info.loc["unique", "label"], "3")
+        unique_codes = int(expected.loc["unique", "code"])
+        self.assertLess(abs(int(info.loc["unique", "code"]) - unique_codes) / unique_codes, 0.03)
+
+    def test_partial_profiles_merge_exactly(self):
+        data = pd.DataFrame({"n": [str(i) for i in range(1000)], "t": ["a", "b", None, "a"] * 250})
+        single = profile_chunks([data])
+        left = profile_chunks([data.iloc[:300], data.iloc[300:450]])
+        right = profile_chunks([data.iloc[450:]])
+        merged = merge_profiles(left, right)
+        # Everything but the sketched quantiles is exact.
+        quantiles = ["25%", "50%", "75%"]
+        pd.testing.assert_frame_equal(profile_info(merged).drop(quantiles), profile_info(single).drop(quantiles))
+        np.testing.assert_array_equal(merged["t"].distinct.registers, single["t"].distinct.registers)
+
+    def test_process_request_with_input_path(self):
+        self.write("a\n1\n2\n")
+        response = process_request({"input_path": self.path})
+        self.assertEqual(response["Rows"], 2)
+        self.assertIn("null value count", response["Data"])
+
+        with self.assertRaises(Exception) as context:
+            process_request({"input_path": os.path.join(self.tmp.name, "missing.csv")})
+        self.assertEqual(context.exception.error_type, "FILE_NOT_FOUND")
+
+class TestIncrementalInfo(unittest.TestCase):
+    def setUp(self):
+        self.csv = "a,b,c\n1,,x\n2,5,\n3,6,z\n"
+        self.original = process_request({"csv_data": self.csv})
+
+    def profile_after(self, **cleaning):
+        cleaned = cleaning_script.process_request({"csv_data": self.csv, **cleaning})
+        request = {"dataset_id": cleaned["DatasetId"], "previous_dataset_id": content_id(self.csv),
+                   "changes": cleaned["Report"]["changes"]}
+        with mock.patch("info_script.column_info", wraps=info_script.column_info) as column_info:
+            response = process_request(request)
+        profiled = [call.args[0].name for call in column_info.call_args_list]
+        self.assertEqual(response["Data"], csv_info(cleaned["Data"]))
+        return profiled
+
+    def test_only_changed_columns_are_profiled(self):
+        self.assertEqual(self.profile_after(method="fillna", column="b", value=0), ["b"])
+        self.assertEqual(self.profile_after(method="typecast", column="a", target_type="float"), ["a"])
+
+    def test_row_changes_profile_every_column(self):
+        self.assertEqual(self.profile_after(method="dropna"), ["a", "b", "c"])
+
+    def test_unknown_previous_dataset_profiles_every_column(self):
+        info_script._profile_cache.clear()
+        self.assertEqual(self.profile_after(method="fillna", column="b", value=0), ["a", "b", "c"])
+
+class TestSelectiveInfo(unittest.TestCase):
+    def setUp(self):
+        self.csv = "a,b,c\n1,x,\n2,y,3.5\n,x,4.5\n"
+        self.full = pd.read_csv(StringIO(csv_info(self.csv)), index_col=0)
+
+    def info(self, **request):
+        return pd.read_csv(StringIO(process_request({"csv_data": self.csv, **request})["Data"]), index_col=0)
+
+    def test_column_subset_matches_full_info(self):
+        info = self.info(columns=["c", "a"])
+        self.assertEqual(list(info.columns), ["c", "a"])
+        pd.testing.assert_frame_equal(info.astype(float), self.full.loc[info.index, ["c", "a"]].astype(float))
+
+    def test_stat_subsets(self):
+        self.assertEqual(list(self.info(stats=["nulls"]).index), ["null value count"])
+        self.assertEqual(self.info(stats="nulls").loc["null value count"].tolist(), [1, 0, 1])
+        types = self.info(stats=["types"])
+        self.assertEqual(list(types.index), [row for row in self.full.index if row.startswith("<class")])
+        describe = self.info(stats=["describe"])
+        self.assertNotIn("null value count", describe.index)
+        self.assertIn("mean", describe.index)
+
+    def test_invalid_selection(self):
+        with self.assertRaises(info_script.DataCleaningError) as context:
+            csv_info(self.csv, columns=["missing"])
+        self.assertEqual(context.exception.error_type, "INVALID_COLUMN")
+        with self.assertRaises(info_script.DataCleaningError) as context:
+            csv_info(self.csv, stats=["median"])
+        self.assertEqual(context.exception.error_type, "INVALID_VALUE")
+
+    def test_selected_column_of_a_wide_frame_is_faster(self):
+        wide = pd.DataFrame(np.random.default_rng(0).normal(size=(2000, 200))).add_prefix("c").to_csv(index=False)
+        _, data = info_script.load_dataset(wide)
+        start = time.perf_counter()
+        info_script.info_from_columns(info_script.profile_columns(data))
+        full_time = time.perf_counter() - start
+        start = time.perf_counter()
+        info_script.info_from_columns(info_script.profile_columns(data[["c0"]], stats=("nulls",)), ("nulls",))
+        self.assertLess(time.perf_counter() - start, full_time / 10)
+
+class TestSampledInfo(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        rows = 50_000
+        self.data = pd.DataFrame({
+            "group": rng.choice(["a", "b", "c"], rows, p=[0.7, 0.2, 0.1]),
+            "value": rng.normal(10, 3, rows),
+            "score": np.where(rng.random(rows) < 0.1, np.nan, rng.random(rows))
+        })
+        self.csv = self.data.to_csv(index=False)
+
+    def test_bounds_cover_population_values(self):
+        truths = {("value", "mean"): self.data["value"].mean(), ("score", "mean"): self.data["score"].mean(),
+                  ("score", "null value count"): self.data["score"].isna().sum()}
+        for method in ("reservoir", "stratified"):
+            covered = 0
+            for seed in range(20):
+                _, summary = csv_info_sample(self.csv, sample={"method": method, "by": "group", "size": 1000, "seed": seed})
+                self.assertEqual((summary["Rows"], summary["Method"]), (50_000, method))
+                for (column, stat), truth in truths.items():
+                    bounds = summary["Estimates"][column][stat]
+                    covered += bounds["Lower"] <= truth <= bounds["Upper"]
+            # 95% intervals: all but a few of the 60 should contain the true value.
+            self.assertGreaterEqual(covered, 52, method)
+
+    def test_sample_of_everything_is_exact(self):
+        data, summary = csv_info_sample(self.csv[:2000], sample={"size": 1000})
+        self.assertEqual(data, csv_info(self.csv[:2000]))
+        bounds = summary["Estimates"]["value"]["mean"]
+        self.assertEqual(bounds["Lower"], bounds["Upper"])
+
+    def test_sampled_file_is_typed_like_read_csv(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "data.csv")
+            self.data.to_csv(path, index=False)
+            response = process_request({"input_path": path, "columns": ["value"], "stats": ["describe"], "chunksize": 7000,
+                                        "sample": {"method": "stratified", "by": "group", "size": 500, "seed": 0}})
+        info = pd.read_csv(StringIO(response["Data"]), index_col=0)
+        self.assertEqual(list(info.columns), ["value"])
+        self.assertIn("mean", info.index)
+        self.assertEqual(response["Sample"]["By"], "group")
+        self.assertEqual(list(response["Sample"]["Estimates"]["value"]), ["count", "mean"])
+
+    def test_file_stratified_by_a_numeric_column(self):
+        sample = {"method": "stratified", "by": "group", "size": 500, "seed": 0}
+        # Numbers that are not valid positions in the strata, and numbers that are.
+        for codes in ((5, 7, 9), (0, 1, 2)):
+            with self.subTest(codes=codes), tempfile.TemporaryDirectory() as tmp:
+                data = self.data.assign(group=self.data["group"].map(dict(zip("abc", codes))))
+                path = os.path.join(tmp, "data.csv")
+                data.to_csv(path, index=False)
+                with warnings.catch_warnings():
+                    warnings.simplefilter("error")
+                    _, summary = csv_info_sample(input_path=path, chunksize=7000, sample=sample)
+                _, in_memory = csv_info_sample(data.to_csv(index=False), sample=sample)
+                self.assertEqual(summary["Rows"], 50_000)
+                self.assertEqual(summary, in_memory)
+
+    def test_invalid_sample(self):
+        for sample, error_type in [({"method": "systematic"}, "INVALID_METHOD"), ({"method": "stratified"}, "MISSING_COLUMN"),
+                                   ({"size": 1}, "INVALID_VALUE"), ({"confidence": 2}, "INVALID_VALUE")]:
+            with self.subTest(sample=sample):
+                with self.assertRaises(info_script.DataCleaningError) as context:
+                    csv_info_sample(self.csv, sample=sample)
+                self.assertEqual(context.exception.error_type, error_type)
+
+class TestParallelInfo(unittest.TestCase):
+    def setUp(self):
+        self.data = make_wide_frame(500, 40)
+
+    def test_pool_matches_single_process(self):
+        serial = info_script.info_from_columns(info_script.profile_columns(self.data))
+        parallel = info_script.info_from_columns(info_script.profile_columns(self.data, workers=3))
+        pd.testing.assert_frame_equal(parallel, serial)
+
+    def test_groups_can_be_sent_to_workers(self):
+        # What a worker does where processes cannot be forked.
+        group = list(self.data.columns[:3])
+        result = info_script._profile_group(group, ("nulls",), self.data[group])
+        self.assertEqual(result, {column: {"nulls": int(self.data[column].isna().sum())} for column in group})
+
+    def test_worker_count(self):
+        self.assertEqual(info_script.profile_workers(4), 4)
+        with mock.patch.dict(os.environ, {"CRESCO_PROFILE_WORKERS": "3"}):
+            self.assertEqual(info_script.profile_workers(), 3)
+        with self.assertRaises(info_script.DataCleaningError) as context:
+            process_request({"csv_data": "a\n1", "workers": "many"})
+        self.assertEqual(context.exception.error_type, "INVALID_VALUE")
+
+    def test_request_with_workers(self):
+        csv = self.data.to_csv(index=False)
+        # Profiles are cached by dataset, so each side has to start from an empty cache.
+        info_script._profile_cache.clear()
+        expected = csv_info(csv)
+        info_script._profile_cache.clear()
+        self.assertEqual(process_request({"csv_data": csv, "workers": 2})["Data"], expected)
+
+    def test_scaling_benchmark_tables_are_identical(self):
+        results = measure_scaling(self.data, worker_counts=(1, 2), repeat=1)
+        self.assertEqual([same for _, same in results.values()], [True, True])
+
+if __name__ == '__main__':
+    unittest.main()
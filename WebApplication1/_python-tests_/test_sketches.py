@@ -0,0 +1,147 @@
+import unittest
+import numpy as np
+import pandas as pd
+from sketches import HyperLogLog, KLLSketch, RowSample, RunningMoments, SpaceSaving
+
+class TestKLLSketch(unittest.TestCase):
+    def setUp(self):
+        self.values = np.random.default_rng(0).normal(0, 1, 100_000)
+
+    def rank_error(self, sketch, q):
+        estimate = sketch.quantile(q)
+        return abs(np.mean(self.values <= estimate) - q)
+
+    def test_exact_before_first_compaction(self):
+        sketch = KLLSketch(k=200)
+        sketch.update(self.values[:100])
+        self.assertEqual(sketch.quantile(0.5), np.median(self.values[:100]))
+
+    def test_rank_error_is_small(self):
+        sketch = KLLSketch(k=200, seed=1)
+        for chunk in np.array_split(self.values, 37):
+            sketch.update(chunk)
+        self.assertEqual(sketch.count, len(self.values))
+        for q in (0.1, 0.5, 0.9):
+            self.assertLess(self.rank_error(sketch, q), 0.02)
+
+    def test_merged_sketches_match_single_sketch_accuracy(self):
+        parts = [KLLSketch(k=200, seed=i) for i in range(4)]
+        for part, chunk in zip(parts, np.array_split(self.values, 4)):
+            part.update(chunk)
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+        self.assertEqual(merged.count, len(self.values))
+        self.assertLess(self.rank_error(merged, 0.5), 0.02)
+
+    def test_nulls_are_ignored(self):
+        sketch = KLLSketch()
+        sketch.update([1.0, np.nan, 3.0])
+        self.assertEqual(sketch.count, 2)
+        self.assertEqual(sketch.quantile(0.5), 2.0)
+        self.assertTrue(np.isnan(KLLSketch().quantile(0.5)))
+
+class TestRunningMoments(unittest.TestCase):
+    def test_merged_batches_match_numpy(self):
+        values = np.random.default_rng(0).normal(5, 2, 10_001)
+        parts = [RunningMoments() for _ in range(3)]
+        for part, chunk in zip(parts, np.array_split(values, 3)):
+            for batch in np.array_split(chunk, 5):
+                part.update(batch)
+        merged = parts[0].merge(parts[1]).merge(parts[2])
+        self.assertEqual(merged.count, len(values))
+        self.assertAlmostEqual(merged.mean, values.mean(), places=10)
+        self.assertAlmostEqual(merged.std(), values.std(ddof=1), places=10)
+        self.assertEqual((merged.min, merged.max), (values.min(), values.max()))
+
+    def test_single_value_has_no_std(self):
+        moments = RunningMoments()
+        moments.update([3.0, np.nan])
+        self.assertTrue(np.isnan(moments.std()))
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_estimate_is_close(self):
+        sketch = HyperLogLog()
+        sketch.update([f"v{i}" for i in range(200_000)])
+        self.assertLess(abs(sketch.estimate() - 200_000) / 200_000, 0.03)
+
+    def test_merge_equals_single_pass(self):
+        values = [f"v{i % 5000}" for i in range(20_000)]
+        single = HyperLogLog()
+        single.update(values)
+        left, right = HyperLogLog(), HyperLogLog()
+        left.update(values[:7000])
+        right.update(values[7000:])
+        np.testing.assert_array_equal(left.merge(right).registers, single.registers)
+        self.assertLess(abs(single.estimate() - 5000), 100)
+
+class TestSpaceSaving(unittest.TestCase):
+    def test_exact_below_capacity(self):
+        sketch = SpaceSaving(k=10)
+        sketch.update(list("abcab"))
+        sketch.update(list("bc"))
+        self.assertEqual(sketch.counts, {"a": 2, "b": 3, "c": 2})
+        self.assertEqual(sketch.top(), ("b", 3))
+        self.assertFalse(sketch.saturated)
+
+    def test_heavy_hitters_survive_merges(self):
+        rng = np.random.default_rng(0)
+        values = np.concatenate([np.full(5000, "hot"), rng.integers(0, 100_000, 50_000).astype(str)])
+        rng.shuffle(values)
+        parts = [SpaceSaving(k=50) for _ in range(4)]
+        for part, chunk in zip(parts, np.array_split(values, 4)):
+            part.update(chunk)
+        merged = parts[0].merge(parts[1]).merge(parts[2]).merge(parts[3])
+        value, count = merged.top()
+        self.assertEqual(value, "hot")
+        self.assertGreaterEqual(count, 5000)
+        self.assertTrue(merged.saturated)
+
+    def test_ties_go_to_first_seen_value(self):
+        sketch = SpaceSaving()
+        sketch.update(["b", "a"])
+        sketch.update(["a", "b"])
+        self.assertEqual(sketch.top(), ("b", 2))
+
+def chunks(data, parts):
+    bounds = np.linspace(0, len(data), parts + 1).astype(int)
+    return [data.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+class TestRowSample(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({"id": range(10_000), "group": ["a"] * 9000 + ["b"] * 900 + [None] * 100})
+
+    def test_keeps_size_rows_in_original_order(self):
+        sample = RowSample(500, seed=0)
+        for chunk in chunks(self.data, 7):
+            sample.update(chunk)
+        [(size, rows)] = sample.strata()
+        self.assertEqual(size, 10_000)
+        self.assertEqual(len(rows), 500)
+        self.assertTrue(rows["id"].is_monotonic_increasing)
+        self.assertEqual(rows["id"].nunique(), 500)
+
+    def test_whole_table_when_smaller_than_size(self):
+        sample = RowSample(20_000, seed=0)
+        sample.update(self.data)
+        [(size, rows)] = sample.strata()
+        pd.testing.assert_frame_equal(rows, self.data)
+
+    def test_stratified_allocation_is_proportional(self):
+        sample = RowSample(1000, by="group", seed=0)
+        for chunk in chunks(self.data, 3):
+            sample.update(chunk)
+        sizes = [(size, len(rows)) for size, rows in sample.strata()]
+        self.assertEqual(sorted(sizes), [(100, 10), (900, 90), (9000, 900)])
+
+    def test_merged_samples_are_uniform_over_both_parts(self):
+        left, right = RowSample(1000, seed=0), RowSample(1000, seed=1)
+        left.update(self.data.iloc[:2000])
+        right.update(self.data.iloc[2000:])
+        [(size, rows)] = left.merge(right).strata()
+        self.assertEqual((size, len(rows)), (10_000, 1000))
+        # About a fifth of the kept rows come from the first fifth of the table.
+        self.assertLess(abs((rows["id"] < 2000).mean() - 0.2), 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
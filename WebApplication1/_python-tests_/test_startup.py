@@ -0,0 +1,49 @@
+import unittest
+import os
+import base64
+import tempfile
+from unittest.mock import patch
+from io import BytesIO
+from docx import Document
+from benchmarks.pdf_tables import make_pdf
+from benchmarks.startup import ENTRY_POINTS, STARTUP_BUDGETS_MS, measure_startup
+
+class TestStartupBudgets(unittest.TestCase):
+    def test_rejected_requests_stay_within_budget(self):
+        for script, request in ENTRY_POINTS.items():
+            with self.subTest(script=script):
+                result = measure_startup(script, request["args"], request["stdin"])
+                self.assertEqual(result["heavy_modules"], [])
+                self.assertLessEqual(result["import_ms"], STARTUP_BUDGETS_MS[script])
+
+    def test_pdf_requests_do_not_import_python_docx(self):
+        result = measure_startup("table_extractor.py", [".pdf"], base64.b64encode(b"not a pdf"))
+        self.assertEqual(result["returncode"], 1)
+        self.assertIn("pdfplumber", result["heavy_modules"])
+        self.assertNotIn("docx", result["heavy_modules"])
+
+    def test_docx_requests_do_not_import_pdfplumber(self):
+        document = Document()
+        table = document.add_table(rows=2, cols=2)
+        for row, values in zip(table.rows, [["a", "b"], ["1", "2"]]):
+            for cell, value in zip(row.cells, values):
+                cell.text = value
+        output = BytesIO()
+        document.save(output)
+
+        result = measure_startup("table_extractor.py", [".docx"], base64.b64encode(output.getvalue()))
+        self.assertEqual(result["returncode"], 0)
+        self.assertIn("docx", result["heavy_modules"])
+        self.assertNotIn("pdfplumber", result["heavy_modules"])
+
+    def test_cached_extractions_skip_the_document_libraries(self):
+        document = base64.b64encode(make_pdf(2, rows=3, columns=3))
+        with tempfile.TemporaryDirectory() as cache_dir, patch.dict(os.environ, {"CRESCO_TABLE_CACHE_DIR": cache_dir}):
+            # The timed run extracts and fills the cache; the import-time run that follows is served from it.
+            result = measure_startup("table_extractor.py", [".pdf"], document)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+        self.assertEqual(result["returncode"], 0)
+        self.assertEqual(result["heavy_modules"], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,20 @@
 import unittest
 from unittest.mock import patch, mock_open
+import os
+import mmap
 import base64
-from io import BytesIO
+import tempfile
+from io import BytesIO, TextIOWrapper
 import sys
-from table_extractor import extract_tables_from_docx, DocHandlerError, main
+import json
+import pandas as pd
+import pdfplumber
+import table_extractor
+from docx import Document
+from table_extractor import (extract_tables_from_docx, parse_pages, MappedDocument, pdf_tables_to_list, streamed_tables, table_json,
+                             worth_extracting, write_ndjson, DocHandlerError, main)
+from transport import read_framed_response, write_response
+from benchmarks.pdf_tables import make_pdf, measure_prefilter
 
 class TestDocumentHandler(unittest.TestCase):
     def setUp(self):
@@ -81,11 +92,246 @@ class TestDocumentHandler(unittest.TestCase):
                 main()
         self.assertEqual(cm.exception.code, 1)
 
+    def test_streamed_tables_match_printed_json(self):
+        tables = [pd.DataFrame({"a": ["1"], "b": ["2"]}), pd.DataFrame({"c": ["x", "y"]})]
+        stream = BytesIO()
+        write_response({"Status": "success", "Data": streamed_tables(tables, "gzip")}, stream)
+        _, payload, _ = read_framed_response(BytesIO(stream.getvalue()))
+        self.assertEqual(payload.decode("utf-8"), json.dumps([table_json(i, df) for i, df in enumerate(tables)]))
+
     def test_doc_handler_error_creation(self):
         error = DocHandlerError("Test message", "TEST_ERROR", "Test details")
         self.assertEqual(str(error), "Test message")
         self.assertEqual(error.error_type, "TEST_ERROR")
         self.assertEqual(error.details, "Test details")
 
+class TestParallelPdf(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.document = make_pdf(6, rows=3, columns=3, tables_per_page=2, blank_pages=(2,))
+
+    def run_main(self, *args):
+        stdout = TextIOWrapper(BytesIO())
+        with patch('sys.argv', ['script.py', '.pdf', *args]), patch('sys.stdout', stdout), \
+                patch('sys.stdin', BytesIO(base64.b64encode(self.document))):
+            main()
+        stdout.flush()
+        output = stdout.buffer.getvalue().decode("utf-8")
+        if "--ndjson" in args:
+            return [json.loads(line) for line in output.splitlines()]
+        return json.loads(output)
+
+    @patch('table_extractor.PARALLEL_MIN_PAGES', 1)
+    def test_tables_keep_page_order(self):
+        serial = pdf_tables_to_list(self.document)
+        self.assertEqual(len(serial), 10)
+        self.assertEqual(serial[4].iloc[0, 0], "p3t0r1c0")
+        for workers in (2, 4):
+            with self.subTest(workers=workers):
+                tables = pdf_tables_to_list(self.document, workers=workers)
+                self.assertEqual(len(tables), len(serial))
+                for table, expected in zip(tables, serial):
+                    pd.testing.assert_frame_equal(table, expected)
+
+    @patch('table_extractor.PARALLEL_MIN_PAGES', 1)
+    def test_workers_option(self):
+        tables = self.run_main("--workers=3")
+        self.assertEqual([table["table_index"] for table in tables], list(range(10)))
+        self.assertEqual(tables, self.run_main())
+        self.assertEqual(tables[9]["data"][-1]["col2"], "p5t1r3c2")
+
+    def test_invalid_options(self):
+        for option in ("--workers=0", "--workers=many", "--sheet=1", "--pages=9", "--pages=3-2", "--pages=one",
+                       "--max-tables=0", "--mode=quick"):
+            with self.subTest(option=option):
+                with self.assertRaises(SystemExit) as cm:
+                    self.run_main(option)
+                self.assertEqual(cm.exception.code, 1)
+
+class TestIncrementalTables(unittest.TestCase):
+    run_main = TestParallelPdf.run_main
+
+    @classmethod
+    def setUpClass(cls):
+        cls.document = make_pdf(6, rows=3, columns=3, tables_per_page=2, blank_pages=(2,))
+
+    def test_parse_pages(self):
+        self.assertEqual(parse_pages(None, 3), [0, 1, 2])
+        self.assertEqual(parse_pages("5-,1-2,2", 6), [0, 1, 4, 5])
+        self.assertEqual(parse_pages("3-40", 4), [2, 3])
+
+    def test_ndjson_records_with_pages(self):
+        records = self.run_main("--ndjson", "--pages=2-4")
+        self.assertEqual([(record["table_index"], record["page"]) for record in records], [(0, 2), (1, 2), (2, 4), (3, 4)])
+        self.assertEqual(records[2]["data"][0]["col0"], "p3t0r1c0")
+        self.assertEqual(records[0]["columns"], ["col0", "col1", "col2"])
+
+    @patch('table_extractor.PARALLEL_MIN_PAGES', 1)
+    def test_max_tables_stops_early(self):
+        with patch('table_extractor.page_tables', wraps=table_extractor.page_tables) as pages:
+            records = self.run_main("--ndjson", "--max-tables=3")
+        self.assertEqual([record["page"] for record in records], [1, 1, 2])
+        self.assertEqual(pages.call_count, 2)
+        self.assertEqual(self.run_main("--ndjson", "--max-tables=3", "--workers=2"), records)
+        tables = self.run_main("--max-tables=1")
+        self.assertEqual(len(tables), 1)
+        self.assertNotIn("page", tables[0])
+
+    def test_each_table_is_written_before_the_next_is_extracted(self):
+        handle = BytesIO()
+        def tables():
+            for page in range(1, 4):
+                self.assertEqual(handle.getvalue().count(b"\n"), page - 1)
+                yield page, pd.DataFrame({"a": [str(page)]})
+        write_ndjson(tables(), handle)
+        self.assertEqual(len(handle.getvalue().splitlines()), 3)
+
+    def test_no_tables_in_selected_pages(self):
+        with self.assertRaises(DocHandlerError) as context:
+            pdf_tables_to_list(self.document, pages="3")
+        self.assertEqual(context.exception.error_type, "NO_TABLES")
+
+class TestPagePrefilter(unittest.TestCase):
+    run_main = TestParallelPdf.run_main
+
+    @classmethod
+    def setUpClass(cls):
+        cls.document = make_pdf(8, rows=3, columns=3, blank_pages=(7,), text_pages=(1, 2, 4, 5, 6))
+
+    def test_pages_worth_extracting(self):
+        boxed = make_pdf(1, rows=0, columns=1)
+        with pdfplumber.open(BytesIO(self.document)) as pdf:
+            self.assertEqual([worth_extracting(page) for page in pdf.pages],
+                             [True, False, False, True, False, False, False, False])
+        with pdfplumber.open(BytesIO(boxed)) as pdf:
+            self.assertFalse(worth_extracting(pdf.pages[0]))
+
+    def test_fast_mode_skips_text_pages(self):
+        # Timing is left to benchmarks/pdf_tables.py; here the skipped pages are never laid out.
+        extract_tables = pdfplumber.page.Page.extract_tables
+        calls = {}
+        for mode in ("exhaustive", "fast"):
+            with patch.object(pdfplumber.page.Page, "extract_tables", autospec=True, side_effect=extract_tables) as extract:
+                pdf_tables_to_list(self.document, mode=mode)
+            calls[mode] = extract.call_count
+        self.assertEqual(calls, {"exhaustive": 8, "fast": 2})
+        results = measure_prefilter(self.document)
+        self.assertEqual(results["fast"][1], 6)
+        self.assertTrue(results["fast"][2])
+
+    def test_mode_option(self):
+        tables = self.run_main("--mode=exhaustive")
+        self.assertEqual(tables, self.run_main("--mode=fast"))
+        self.assertEqual([table["data"][0]["col0"] for table in tables], ["p0t0r1c0", "p3t0r1c0"])
+
+class TestExtractionCache(unittest.TestCase):
+    run_main = TestParallelPdf.run_main
+
+    @classmethod
+    def setUpClass(cls):
+        cls.document = make_pdf(4, rows=3, columns=3, tables_per_page=2, text_pages=(1,))
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        environ = patch.dict(os.environ, {"CRESCO_TABLE_CACHE_DIR": self.tmp.name})
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def test_repeat_upload_is_served_from_the_cache(self):
+        tables = self.run_main()
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+        with patch('table_extractor.iter_pdf_tables', side_effect=AssertionError("extracted again")):
+            self.assertEqual(self.run_main(), tables)
+            self.assertEqual(self.run_main("--max-tables=2"), tables[:2])
+            records = self.run_main("--ndjson")
+        self.assertEqual([record["page"] for record in records], [1, 1, 3, 3, 4, 4])
+        self.assertEqual([{key: record[key] for key in ("table_index", "data", "columns")} for record in records],
+                         tables)
+
+    def test_parameters_are_part_of_the_key(self):
+        self.run_main()
+        with patch('table_extractor.iter_pdf_tables', wraps=table_extractor.iter_pdf_tables) as extract:
+            self.run_main("--mode=exhaustive")
+            self.run_main("--pages=1")
+            self.run_main("--workers=2")
+        self.assertEqual(extract.call_count, 2)
+        self.assertEqual(len(os.listdir(self.tmp.name)), 3)
+
+    def test_incomplete_extractions_are_not_stored(self):
+        self.run_main("--max-tables=1")
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+class TestDocumentInput(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.document = make_pdf(5, rows=3, columns=3, tables_per_page=2)
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, "report.pdf")
+        with open(cls.path, "wb") as handle:
+            handle.write(cls.document)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def run_main(self, extension, stdin, *args):
+        stdout = TextIOWrapper(BytesIO())
+        with patch('sys.argv', ['script.py', extension, *args]), patch('sys.stdout', stdout), \
+                patch('sys.stdin', BytesIO(stdin)):
+            main()
+        stdout.flush()
+        return json.loads(stdout.buffer.getvalue())
+
+    def setUp(self):
+        self.expected = self.run_main(".pdf", base64.b64encode(self.document))
+
+    def test_raw_stdin(self):
+        self.assertEqual(self.run_main(".pdf", self.document, "--raw"), self.expected)
+        self.assertEqual(len(self.expected), 10)
+
+    @patch('table_extractor.PARALLEL_MIN_PAGES', 1)
+    def test_mapped_file(self):
+        self.assertEqual(self.run_main(".pdf", b"", f"--path={self.path}"), self.expected)
+        self.assertEqual(self.run_main(".pdf", b"", f"--path={self.path}", "--workers=2"), self.expected)
+        with patch.dict(os.environ, {"CRESCO_TABLE_CACHE_DIR": os.path.join(self.tmp.name, "cache")}):
+            self.run_main(".pdf", b"", f"--path={self.path}")
+            with patch('table_extractor.iter_pdf_tables', side_effect=AssertionError("extracted again")):
+                self.assertEqual(self.run_main(".pdf", self.document, "--raw"), self.expected)
+
+    def test_mapped_word_document(self):
+        document = Document()
+        table = document.add_table(rows=2, cols=2)
+        for row, values in zip(table.rows, [["a", "b"], ["1", "2"]]):
+            for cell, value in zip(row.cells, values):
+                cell.text = value
+        path = os.path.join(self.tmp.name, "report.docx")
+        document.save(path)
+        tables = self.run_main(".docx", b"", f"--path={path}")
+        self.assertEqual(tables, [{"table_index": 0, "data": [{"a": "1", "b": "2"}], "columns": ["a", "b"]}])
+
+    def test_readers_of_one_mapping_keep_their_own_position(self):
+        with open(self.path, "rb") as handle:
+            mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.addCleanup(mapping.close)
+        first, second = MappedDocument(mapping), MappedDocument(mapping)
+        self.assertEqual(first.read(8), self.document[:8])
+        self.assertEqual(second.read(4), self.document[:4])
+        self.assertEqual(first.tell(), 8)
+        first.seek(-5, os.SEEK_END)
+        self.assertEqual(first.read(), self.document[-5:])
+        self.assertTrue(first.seekable())
+
+    def test_invalid_input(self):
+        empty = os.path.join(self.tmp.name, "empty.pdf")
+        open(empty, "wb").close()
+        for args, stdin in [([f"--path={os.path.join(self.tmp.name, 'missing.pdf')}"], b""),
+                            ([f"--path={empty}"], b""), (["--raw"], b""),
+                            (["--raw", f"--path={self.path}"], self.document)]:
+            with self.subTest(args=args):
+                with self.assertRaises(SystemExit) as cm:
+                    self.run_main(".pdf", stdin, *args)
+                self.assertEqual(cm.exception.code, 1)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
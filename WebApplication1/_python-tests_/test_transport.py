@@ -0,0 +1,195 @@
+import unittest
+import json
+import numpy as np
+import pandas as pd
+from io import BytesIO, StringIO
+from dataset_cache import content_id
+from transport import (FRAME_LENGTH, FrameWriter, StreamedBody, TransportError, arrow_available, decode_frame,
+                       encode_frame, negotiate_format, read_framed_response, read_request, response_framing,
+                       write_response)
+import cleaning_script
+import info_script
+import visualisation_data
+
+def make_frame():
+    return pd.DataFrame({
+        "int": [1, 2, 3],
+        "float": [1.5, np.nan, 3.0],
+        "text": ["a", np.nan, "é"],
+        "nullable": pd.array([1, None, 3], dtype="Int64"),
+        "flag": pd.array([True, None, False], dtype="boolean"),
+        "when": pd.to_datetime(["2024-01-01", None, "2024-03-01"]),
+        "kind": pd.Categorical(["x", "y", "x"])
+    })
+
+class TestFrameCodecs(unittest.TestCase):
+    def test_npz_round_trip_keeps_dtypes(self):
+        frame = make_frame()
+        payload = encode_frame(frame, "npz")
+        self.assertIsInstance(payload, bytes)
+        pd.testing.assert_frame_equal(decode_frame(payload, "npz"), frame)
+
+    @unittest.skipUnless(arrow_available(), "pyarrow is not installed")
+    def test_arrow_round_trip(self):
+        frame = make_frame()
+        pd.testing.assert_frame_equal(decode_frame(encode_frame(frame, "arrow"), "arrow"), frame)
+
+    def test_index_becomes_leading_column(self):
+        frame = pd.DataFrame({"a": [1.0]}, index=["count"])
+        decoded = decode_frame(encode_frame(frame, "npz", index=True), "npz")
+        self.assertEqual(list(decoded.columns), ["", "a"])
+        self.assertEqual(decoded.iloc[0, 0], "count")
+
+    def test_invalid_npz(self):
+        with self.assertRaises(TransportError) as context:
+            decode_frame(b"not an archive", "npz")
+        self.assertEqual(context.exception.error_type, "PARSE_ERROR")
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate_format(None), "csv")
+        self.assertEqual(negotiate_format("parquet"), "csv")
+        self.assertEqual(negotiate_format(["parquet", "npz"]), "npz")
+        self.assertEqual(negotiate_format("arrow"), "arrow" if arrow_available() else "npz")
+
+class TestFraming(unittest.TestCase):
+    def test_json_document_request(self):
+        request, body = read_request(BytesIO(b'{\n"csv_data": "a\\n1"\n}'))
+        self.assertEqual(request["csv_data"], "a\n1")
+        self.assertIsNone(body)
+
+    def test_header_and_body_request(self):
+        stream = BytesIO(b'{"data_format": "npz", "data_length": 3}\nabcdef')
+        request, body = read_request(stream)
+        self.assertEqual(request["data_format"], "npz")
+        self.assertEqual(body, b"abc")
+
+    def test_csv_format_in_a_json_document(self):
+        request, body = read_request(BytesIO(b'{"csv_data": "a\\n1", "data_format": "csv"}\n'))
+        self.assertEqual(request["csv_data"], "a\n1")
+        self.assertIsNone(body)
+        request, body = read_request(BytesIO(b'{"data_format": "csv", "data_length": 3}\na,b'))
+        self.assertEqual(body, b"a,b")
+        request, body = read_request(BytesIO(b'{"data_format": "npz"}\nabc'))
+        self.assertEqual(body, b"abc")
+
+    def test_truncated_body(self):
+        with self.assertRaises(TransportError) as context:
+            read_request(BytesIO(b'{"data_format": "npz", "data_length": 10}\nabc'))
+        self.assertEqual(context.exception.error_type, "MISSING_DATA")
+
+    def test_binary_response(self):
+        stream = BytesIO()
+        write_response({"Status": "success", "Data": b"\x00\x01", "DataFormat": "npz"}, stream)
+        output = BytesIO(stream.getvalue())
+        header = json.loads(output.readline())
+        self.assertEqual(header["DataLength"], 2)
+        self.assertNotIn("Data", header)
+        self.assertEqual(output.read(), b"\x00\x01")
+
+class TestFramedResponses(unittest.TestCase):
+    def setUp(self):
+        self.csv = "Type,Value\nA,10\nB,\nA,12"
+
+    def write(self, response):
+        stream = BytesIO()
+        trailer = write_response(response, stream)
+        return stream, trailer
+
+    def test_frames_are_length_prefixed_and_terminated(self):
+        stream = BytesIO()
+        writer = FrameWriter(stream, frame_size=4)
+        writer.write(b"abcdefghij")
+        writer.close()
+        payload = BytesIO(stream.getvalue())
+        lengths = []
+        while True:
+            (length,) = FRAME_LENGTH.unpack(payload.read(FRAME_LENGTH.size))
+            lengths.append(length)
+            if length == 0:
+                break
+            payload.read(length)
+        self.assertEqual(lengths, [4, 4, 2, 0])
+        self.assertEqual(writer.size, 10)
+        self.assertEqual(writer.content_id, content_id(b"abcdefghij"))
+
+    def test_gzip_frames_form_one_gzip_stream(self):
+        body = StreamedBody(lambda handle: handle.write(b"x" * 100_000), "gzip")
+        stream, trailer = self.write({"Status": "success", "Data": body})
+        header, payload, _ = read_framed_response(BytesIO(stream.getvalue()))
+        self.assertEqual(header["Compression"], "gzip")
+        self.assertEqual(payload, b"x" * 100_000)
+        self.assertEqual(trailer["DataLength"], 100_000)
+        self.assertLess(len(stream.getvalue()), 1000)
+
+    def test_framed_cleaning_result_matches_inline_result(self):
+        inline = cleaning_script.process_request({"csv_data": self.csv, "method": "dropna"})
+        for compression in (None, "gzip"):
+            with self.subTest(compression=compression):
+                response = cleaning_script.process_request(
+                    {"csv_data": self.csv, "method": "dropna", "framed": True, "compression": compression})
+                self.assertNotIn("DatasetId", response)
+                stream, _ = self.write(response)
+                header, payload, trailer = read_framed_response(BytesIO(stream.getvalue()))
+                self.assertEqual(header["Status"], "success")
+                self.assertEqual(payload.decode("utf-8"), inline["Data"])
+                self.assertEqual(trailer["DatasetId"], inline["DatasetId"])
+
+        info = info_script.process_request({"dataset_id": inline["DatasetId"], "framed": True})
+        _, payload, _ = read_framed_response(BytesIO(self.write(info)[0].getvalue()))
+        self.assertEqual(payload.decode("utf-8"), info_script.csv_info(inline["Data"]))
+
+    def test_framed_binary_output(self):
+        chart = visualisation_data.process_request({
+            "csv_data": self.csv, "method": "sum", "target_column": "Type",
+            "selected_cols": ["Value"], "output_format": "npz", "compression": "gzip"
+        })
+        _, payload, _ = read_framed_response(BytesIO(self.write(chart)[0].getvalue()))
+        self.assertEqual(decode_frame(payload, "npz")["Value_Total"].tolist(), [22.0, 0.0])
+
+    def test_body_failure_is_reported_in_trailer(self):
+        def fail(handle):
+            handle.write(b"partial")
+            raise ValueError("disk full")
+
+        stream, trailer = self.write({"Status": "success", "Data": StreamedBody(fail)})
+        _, payload, read_trailer = read_framed_response(BytesIO(stream.getvalue()))
+        self.assertEqual(payload, b"partial")
+        self.assertEqual(trailer, read_trailer)
+        self.assertEqual(trailer["Status"], "error")
+        self.assertEqual(trailer["Error"]["Details"], "disk full")
+
+    def test_unsupported_compression(self):
+        self.assertEqual(response_framing({}), (False, None))
+        self.assertEqual(response_framing({"compression": "gzip"}), (True, "gzip"))
+        with self.assertRaises(info_script.DataCleaningError) as context:
+            info_script.process_request({"csv_data": self.csv, "compression": "brotli"})
+        self.assertEqual(context.exception.error_type, "INVALID_COMPRESSION")
+
+class TestBinaryRequests(unittest.TestCase):
+    def setUp(self):
+        self.csv = "Type,Value\nA,10\nB,\nA,12"
+        self.payload = encode_frame(pd.read_csv(StringIO(self.csv)), "npz")
+
+    def test_binary_requests_match_csv_requests(self):
+        request = {"data_format": "npz", "output_format": "npz", "method": "dropna"}
+        cleaned = cleaning_script.process_request(request, self.payload)
+        self.assertEqual(cleaned["DataFormat"], "npz")
+        expected = pd.read_csv(StringIO(cleaning_script.process_request({"csv_data": self.csv, "method": "dropna"})["Data"]))
+        pd.testing.assert_frame_equal(decode_frame(cleaned["Data"], "npz"), expected)
+
+        info = info_script.process_request({"data_format": "npz"}, self.payload)
+        self.assertEqual(info["Data"], info_script.csv_info(self.csv))
+
+        chart = visualisation_data.process_request({
+            "data_format": "npz", "output_format": "npz", "method": "sum",
+            "target_column": "Type", "selected_cols": ["Value"]
+        }, self.payload)
+        self.assertEqual(decode_frame(chart["Data"], "npz")["Value_Total"].tolist(), [22.0, 0.0])
+
+    def test_unavailable_format(self):
+        with self.assertRaises(info_script.DataCleaningError) as context:
+            info_script.process_request({"data_format": "parquet"}, b"data")
+        self.assertEqual(context.exception.error_type, "INVALID_FORMAT")
+
+if __name__ == '__main__':
+    unittest.main()
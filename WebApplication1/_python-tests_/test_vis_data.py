@@ -1,8 +1,14 @@
 import unittest
+import os
 import json
+import tempfile
+import numpy as np
 import pandas as pd
 from io import StringIO
-from visualisation_data import vis_data, DataCleaningError
+from unittest import mock
+from visualisation_data import (aggregate_groups, build_rollup, chart_groups, composite_key, lttb, parse_stats,
+                                pivot_groups, process_request, rollup_table, slice_rollup, vis_data, vis_data_stream, DataCleaningError, GroupPartials)
+from benchmarks.vis_aggregate import groupby_reference, make_frame
 
 class TestDataVisualization(unittest.TestCase):
     def setUp(self):
@@ -127,5 +133,353 @@ B,15,def"""
         self.assertIn("Value1_Total", df.columns)
         self.assertIn("Value2_Total", df.columns)
 
+class TestSinglePassAggregation(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.data = make_frame(5000, 40)
+        self.data.loc[rng.random(5000) < 0.02, "key"] = None
+        self.data["flag"] = rng.random(5000) < 0.5
+        # A group whose values are all missing.
+        self.data.loc[self.data["key"] == "group0", "amount"] = np.nan
+        self.columns = ["amount", "quantity", "flag"]
+
+    def test_methods_match_groupby_output(self):
+        for method in ("sum", "mean", "both"):
+            with self.subTest(method=method):
+                expected = groupby_reference(self.data, "key", self.columns, [stat for stat, _, _ in parse_stats(method)])
+                result = aggregate_groups(self.data, "key", self.columns, parse_stats(method))
+                pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12)
+
+    def test_every_statistic_matches_groupby(self):
+        stats = ["count", "sum", "mean", "min", "max", "std", "median", "p10", "p99.5"]
+        expected = groupby_reference(self.data, "key", ["amount", "quantity"], stats)
+        result = aggregate_groups(self.data, "key", ["amount", "quantity"], parse_stats(None, stats))
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12, check_dtype=False)
+        self.assertEqual(list(result.columns[:4]), ["key", "Counts", "amount_Count", "quantity_Count"])
+
+    def test_csv_output_is_unchanged_for_small_data(self):
+        csv = "Type,Value1,Value2\nA,10,20\nB,15,25\nA,12,22\nC,,1\n"
+        data = pd.read_csv(StringIO(csv))
+        expected = groupby_reference(data, "Type", ["Value1", "Value2"], ["sum", "mean"]).to_csv(index=False)
+        self.assertEqual(vis_data(csv, "both", "Type", ["Value1", "Value2"]), expected)
+
+    def test_stats_request(self):
+        response = process_request({"csv_data": "k,v\na,1\na,3\nb,2", "target_column": "k", "selected_cols": ["v"],
+                                    "stats": ["max", "p50"]})
+        result = pd.read_csv(StringIO(response["Data"]))
+        self.assertEqual(list(result.columns), ["k", "Counts", "v_Max", "v_P50"])
+        self.assertEqual(result.values.tolist(), [["a", 2, 3, 2.0], ["b", 1, 2, 2.0]])
+
+    def test_invalid_statistic(self):
+        for stats in (["mode"], ["p101"]):
+            with self.assertRaises(DataCleaningError) as context:
+                vis_data("k,v\na,1", None, "k", ["v"], stats=stats)
+            self.assertEqual(context.exception.error_type, "INVALID_METHOD")
+
+class TestRollupCube(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.data = make_frame(2000, 12)
+        self.data["region"] = rng.choice(["north", "south", None], 2000)
+        self.data["id"] = np.arange(2000)
+        self.csv = self.data.to_csv(index=False)
+
+    def test_dimensions_are_low_cardinality_non_float_columns(self):
+        cube = build_rollup(self.data, max_cardinality=50)
+        self.assertEqual(list(cube), ["key", "quantity", "region"])
+        self.assertEqual(list(build_rollup(self.data, max_cardinality=5)), ["region"])
+
+    def test_slices_match_vis_data(self):
+        cube = build_rollup(self.data)
+        for target in cube:
+            for method, stats in (("sum", None), ("both", None), (None, ["count", "min", "max", "std"])):
+                with self.subTest(target=target, method=method):
+                    expected = aggregate_groups(self.data, target, ["amount", "quantity"], parse_stats(method, stats))
+                    result = slice_rollup(cube, method, target, ["amount", "quantity"], stats)
+                    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected)
+
+    def test_requests_the_cube_cannot_answer(self):
+        cube = build_rollup(self.data)
+        self.assertIsNone(slice_rollup(cube, "sum", "id", ["amount"]))
+        self.assertIsNone(slice_rollup(cube, None, "key", ["amount"], ["median"]))
+
+    def test_long_table_holds_every_dimension(self):
+        cube = build_rollup(self.data)
+        table = rollup_table(cube)
+        self.assertEqual(list(table.columns[:3]), ["Dimension", "Value", "Counts"])
+        self.assertEqual(len(table), sum(len(grouped) for grouped in cube.values()))
+        self.assertEqual(table.loc[table["Dimension"] == "region", "Counts"].sum(), self.data["region"].notna().sum())
+
+    def test_switching_target_is_a_lookup(self):
+        rollup = process_request({"csv_data": self.csv, "method": "rollup"})
+        self.assertEqual(rollup["Dimensions"], ["key", "quantity", "region"])
+        request = {"dataset_id": rollup["DatasetId"], "method": "both", "selected_cols": ["amount"]}
+        expected = {target: vis_data(self.csv, "both", target, ["amount"]) for target in ("key", "region")}
+        with mock.patch("visualisation_data.load_dataset", side_effect=AssertionError("dataset was loaded")):
+            for target in ("key", "region"):
+                response = process_request({**request, "target_column": target})
+                self.assertEqual(response["Data"], expected[target])
+            # The same content sent again is found by its content address.
+            response = process_request({"csv_data": self.csv, "method": "sum", "target_column": "region",
+                                        "selected_cols": ["quantity"]})
+        self.assertEqual(response["Data"], vis_data(self.csv, "sum", "region", ["quantity"]))
+
+class TestBoundedCharts(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        rows = 20_000
+        self.data = pd.DataFrame({
+            "id": np.arange(rows),
+            "time": pd.date_range("2024-01-01", periods=rows, freq="min"),
+            "value": rng.normal(size=rows).cumsum(),
+            "code": rng.integers(0, 3000, rows).astype(str)
+        })
+        self.data.loc[5, "value"] = np.nan
+        self.stats = parse_stats("both")
+
+    def test_fixed_width_bins(self):
+        result = chart_groups(self.data, "value", ["id"], self.stats, bins={"count": 8})
+        self.assertLessEqual(len(result), 8)
+        self.assertEqual(result["Counts"].sum(), self.data["value"].notna().sum())
+        edges = [float(label.split(",")[0][1:]) for label in result["value"]]
+        self.assertEqual(edges, sorted(edges))
+
+    def test_quantile_bins_of_datetimes(self):
+        result = chart_groups(self.data, "time", ["value"], self.stats, bins={"method": "quantile", "count": 4})
+        self.assertEqual(result["Counts"].tolist(), [5000] * 4)
+        first = self.data.iloc[:5000]
+        self.assertAlmostEqual(result["value_Total"].iloc[0], first["value"].sum())
+
+    def test_invalid_bins(self):
+        for bins, error_type in [({"count": 5}, "INVALID_DATA_TYPE"), ({"method": "log"}, "INVALID_METHOD"),
+                                 ({"count": 0}, "INVALID_VALUE")]:
+            with self.subTest(bins=bins):
+                target = "code" if error_type == "INVALID_DATA_TYPE" else "value"
+                with self.assertRaises(DataCleaningError) as context:
+                    chart_groups(self.data, target, ["id"], self.stats, bins=bins)
+                self.assertEqual(context.exception.error_type, error_type)
+
+    def test_top_groups_and_other(self):
+        result = chart_groups(self.data, "code", ["id"], self.stats, top_n=10)
+        self.assertEqual(len(result), 11)
+        self.assertEqual(result["code"].iloc[-1], "Other")
+        top = self.data["code"].value_counts().index[:10]
+        pd.testing.assert_frame_equal(result.iloc[:10].reset_index(drop=True),
+                                      aggregate_groups(self.data, "code", ["id"], self.stats).iloc[:10])
+        rest = self.data.loc[~self.data["code"].isin(top), "id"]
+        self.assertEqual(result.iloc[-1][["Counts", "id_Total"]].tolist(), [len(rest), rest.sum()])
+        self.assertAlmostEqual(result["id_Mean"].iloc[-1], rest.mean())
+
+    def test_cardinality_is_capped_by_default(self):
+        with mock.patch("visualisation_data.MAX_CHART_GROUPS", 50):
+            result = chart_groups(self.data, "id", ["value"], self.stats)
+        self.assertEqual(len(result), 51)
+        self.assertEqual(result["Counts"].sum(), len(self.data))
+        self.assertEqual(len(chart_groups(self.data.iloc[:40], "id", ["value"], self.stats)), 40)
+
+    def test_lttb_keeps_ends_and_extremes(self):
+        x = np.arange(1000)
+        y = np.sin(x / 50)
+        y[617] = 25
+        kept = lttb(x, y, 30)
+        self.assertEqual(len(kept), 30)
+        self.assertEqual((kept[0], kept[-1]), (0, 999))
+        self.assertIn(617, kept)
+        self.assertTrue((np.diff(kept) > 0).all())
+        np.testing.assert_array_equal(lttb(x[:20], y[:20], 30), np.arange(20))
+
+    def test_downsampled_series(self):
+        result = chart_groups(self.data, "time", ["value"], parse_stats("mean"), downsample=200)
+        self.assertEqual(len(result), 200)
+        self.assertTrue(result["time"].is_monotonic_increasing)
+        self.assertEqual(result["time"].iloc[0], self.data["time"].iloc[0])
+        with self.assertRaises(DataCleaningError):
+            chart_groups(self.data, "code", ["value"], self.stats, downsample=200)
+
+    def test_payload_is_bounded(self):
+        csv = self.data[["id", "value"]].to_csv(index=False)
+        request = {"csv_data": csv, "method": "sum", "target_column": "id", "selected_cols": ["value"]}
+        full = len(vis_data(csv, "sum", "id", ["value"]))
+        self.assertLess(len(process_request({**request, "downsample": 100})["Data"]), full / 5)
+        self.assertLess(len(process_request({**request, "bins": 10})["Data"]), full / 5)
+
+class TestStreamingVisData(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        rows = 30_000
+        self.data = pd.DataFrame({
+            "key": rng.integers(0, 200, rows).astype(float),
+            "amount": rng.normal(size=rows),
+            "quantity": rng.integers(0, 100, rows),
+            "flag": rng.random(rows) < 0.3
+        })
+        self.data.loc[rng.random(rows) < 0.01, "key"] = np.nan
+        self.data.loc[rng.random(rows) < 0.05, "amount"] = np.nan
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.write(self.data.to_csv(index=False))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text, name="data.csv"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def assert_same_table(self, streamed, in_memory):
+        streamed, in_memory = pd.read_csv(StringIO(streamed)), pd.read_csv(StringIO(in_memory))
+        # Float sums are added chunk by chunk, so only their last bits may differ.
+        pd.testing.assert_frame_equal(streamed, in_memory, check_exact=False, rtol=1e-9)
+        exact = [col for col in in_memory.columns if not col.startswith("amount_") and not col.endswith(("_Mean", "_Std"))]
+        pd.testing.assert_frame_equal(streamed[exact], in_memory[exact])
+
+    def test_matches_in_memory_path(self):
+        csv = self.data.to_csv(index=False)
+        columns = ["amount", "quantity", "flag"]
+        for method, stats in (("both", None), (None, ["count", "sum", "mean", "min", "max", "std"])):
+            with self.subTest(method=method):
+                streamed, rows = vis_data_stream(self.path, method, "key", columns, stats, chunksize=4000)
+                self.assertEqual(rows, len(self.data))
+                self.assert_same_table(streamed, vis_data(csv, method, "key", columns, stats=stats))
+        # The target may also be aggregated.
+        for target in ("quantity", "key"):
+            with self.subTest(target=target):
+                columns = [target, "amount"]
+                streamed, _ = vis_data_stream(self.path, "both", target, columns, chunksize=4000)
+                self.assert_same_table(streamed, vis_data(csv, "both", target, columns))
+
+    def test_top_groups_and_downsampling_match(self):
+        csv = self.data.to_csv(index=False)
+        streamed, _ = vis_data_stream(self.path, "both", "key", ["amount"], top_n=15, chunksize=4000)
+        self.assert_same_table(streamed, vis_data(csv, "both", "key", ["amount"], top_n=15))
+        streamed, _ = vis_data_stream(self.path, "mean", "key", ["quantity"], downsample=20, chunksize=4000)
+        self.assert_same_table(streamed, vis_data(csv, "mean", "key", ["quantity"], downsample=20))
+
+    def test_keys_are_typed_like_read_csv(self):
+        path = self.write("key,value\n1,10\n2,20\n1.0,30\n,40\n", "keys.csv")
+        streamed, _ = vis_data_stream(path, "sum", "key", ["value"], chunksize=1)
+        self.assertEqual(streamed, vis_data("key,value\n1,10\n2,20\n1.0,30\n,40\n", "sum", "key", ["value"]))
+        self.assertEqual(pd.read_csv(StringIO(streamed))["key"].tolist(), [1.0, 2.0])
+
+    def test_memory_follows_groups_not_rows(self):
+        partials = GroupPartials("key", ["amount"])
+        for chunk in pd.read_csv(self.path, dtype={"key": str}, chunksize=3000):
+            partials.update(chunk)
+        self.assertEqual(len(partials.keys), self.data["key"].nunique())
+        self.assertEqual(len(partials.partials["amount"]["sum"]), len(partials.keys))
+
+    def test_columns_that_are_not_numeric_in_every_chunk(self):
+        path = self.write("key,value\na,1\nb,2\na,x\n", "text.csv")
+        with self.assertRaises(DataCleaningError) as context:
+            vis_data_stream(path, "sum", "key", ["value"], chunksize=2)
+        self.assertEqual(context.exception.error_type, "INVALID_DATA_TYPE")
+
+    def test_unsupported_requests(self):
+        with self.assertRaises(DataCleaningError) as context:
+            vis_data_stream(self.path, None, "key", ["amount"], ["median"])
+        self.assertEqual(context.exception.error_type, "INVALID_METHOD")
+        with self.assertRaises(DataCleaningError) as context:
+            process_request({"input_path": self.path, "method": "sum", "target_column": "amount",
+                             "selected_cols": ["quantity"], "bins": 5})
+        self.assertEqual(context.exception.error_type, "INVALID_OPERATION")
+        with self.assertRaises(DataCleaningError) as context:
+            vis_data_stream(os.path.join(self.tmp.name, "missing.csv"), "sum", "key", ["amount"])
+        self.assertEqual(context.exception.error_type, "FILE_NOT_FOUND")
+
+    def test_process_request_with_input_path(self):
+        response = process_request({"input_path": self.path, "method": "sum", "target_column": "key",
+                                    "selected_cols": ["quantity"], "chunksize": 5000})
+        self.assertEqual(response["Rows"], len(self.data))
+        self.assertEqual(pd.read_csv(StringIO(response["Data"]))["quantity_Total"].sum(),
+                         self.data.loc[self.data["key"].notna(), "quantity"].sum())
+
+class TestMultiKeyGrouping(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        rows = 20_000
+        self.data = pd.DataFrame({
+            "region": rng.choice(["north", "south", "east", "west"], rows),
+            "year": rng.integers(2015, 2025, rows),
+            "product": rng.integers(0, 300, rows).astype(str),
+            "amount": rng.normal(100, 15, rows)
+        })
+        self.data.loc[[3, 70], "region"] = None
+        self.stats = parse_stats("both")
+
+    def test_composite_key_matches_groupby(self):
+        keys = ["region", "year"]
+        result = aggregate_groups(self.data, keys, ["amount"], self.stats)
+        expected = self.data.groupby(keys)["amount"].agg(["size", "sum", "mean"])
+        self.assertEqual(len(result), len(expected))
+        self.assertEqual(result["Counts"].sum(), len(self.data) - 2)
+        self.assertTrue((np.diff(result["Counts"]) <= 0).all())
+        aligned = expected.loc[list(zip(result["region"], result["year"]))]
+        np.testing.assert_array_equal(result["Counts"], aligned["size"])
+        np.testing.assert_allclose(result["amount_Total"], aligned["sum"])
+        np.testing.assert_allclose(result["amount_Mean"], aligned["mean"])
+        self.assertEqual(result["year"].dtype, self.data["year"].dtype)
+
+    def test_composite_codes_stay_below_group_count(self):
+        codes, uniques = composite_key(self.data, ["product", "region", "year"])
+        self.assertEqual(codes.max() + 1, len(uniques))
+        self.assertEqual((codes < 0).sum(), 2)
+        self.assertEqual(len(uniques), self.data.dropna().groupby(["product", "region", "year"]).ngroups)
+
+    def test_top_groups_fold_into_other(self):
+        result = chart_groups(self.data, ["product", "year"], ["amount"], self.stats, top_n=20)
+        self.assertEqual(len(result), 21)
+        self.assertEqual(result.iloc[-1][["product", "year"]].tolist(), ["Other", "Other"])
+        self.assertEqual(result["Counts"].sum(), len(self.data))
+
+    def test_pivot_is_a_matrix(self):
+        pivot = chart_groups(self.data, ["region", "year"], ["amount"], self.stats, pivot={"value": "amount_Total"})
+        self.assertEqual(pivot["region"].tolist(), ["east", "north", "south", "west"])
+        self.assertEqual(list(pivot.columns[1:]), [str(year) for year in range(2015, 2025)])
+        expected = self.data[(self.data["region"] == "east") & (self.data["year"] == 2020)]["amount"].sum()
+        self.assertAlmostEqual(pivot.loc[0, "2020"], expected)
+        counts = chart_groups(self.data, ["region", "year"], ["amount"], self.stats, pivot=True)
+        self.assertEqual(counts.iloc[:, 1:].to_numpy().sum(), len(self.data) - 2)
+
+    def test_pivot_groups_of_a_chart_table(self):
+        table = pd.DataFrame({"region": ["west", "east", "west"], "year": [2021, 2020, 2020],
+                              "Counts": [5, 3, 2], "amount_Total": [50.0, 30.0, 20.0]})
+        matrix = pivot_groups(table, ["region", "year"], {"value": "amount_Total"})
+        self.assertEqual(list(matrix.columns), ["region", "2020", "2021"])
+        self.assertEqual(matrix["region"].tolist(), ["east", "west"])
+        self.assertEqual(matrix["2020"].tolist(), [30.0, 20.0])
+        self.assertTrue(np.isnan(matrix.loc[0, "2021"]))
+        self.assertEqual(pivot_groups(table, ["region", "year"], True)["2021"].tolist()[1], 5)
+
+    def test_pivot_cells_are_capped(self):
+        pivot = chart_groups(self.data, ["product", "year"], ["amount"], self.stats, pivot={"max_cells": 500})
+        self.assertLessEqual(pivot.shape[0] * (pivot.shape[1] - 1), 500)
+        top = self.data["product"].value_counts().index[0]
+        self.assertIn(top, pivot["product"].tolist())
+
+    def test_invalid_requests(self):
+        requests = [
+            ({"pivot": True}, ["region", "year", "product"], "INVALID_OPERATION"),
+            ({"pivot": True}, "region", "INVALID_OPERATION"),
+            ({"pivot": {"value": "amount_Median"}}, ["region", "year"], "INVALID_COLUMN"),
+            ({"bins": 5}, ["year", "region"], "INVALID_OPERATION"),
+        ]
+        for options, target, error_type in requests:
+            with self.subTest(options=options, target=target):
+                with self.assertRaises(DataCleaningError) as context:
+                    chart_groups(self.data, target, ["amount"], self.stats, **options)
+                self.assertEqual(context.exception.error_type, error_type)
+
+    def test_process_request(self):
+        csv = self.data.to_csv(index=False)
+        response = process_request({"csv_data": csv, "method": "sum", "target_column": ["region", "year"],
+                                    "selected_cols": ["amount"], "pivot": True})
+        self.assertEqual(response["Status"], "success")
+        self.assertEqual(pd.read_csv(StringIO(response["Data"])).shape, (4, 11))
+        with self.assertRaises(DataCleaningError) as context:
+            process_request({"csv_data": csv, "method": "sum", "target_column": ["region", "missing"],
+                             "selected_cols": ["amount"]})
+        self.assertEqual(context.exception.error_type, "INVALID_COLUMN")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
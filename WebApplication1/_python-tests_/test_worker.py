@@ -0,0 +1,99 @@
+import unittest
+import json
+import pandas as pd
+from io import BytesIO, StringIO
+from transport import decode_frame, encode_frame, read_framed_response
+from worker import handle_request, serve
+
+class TestWorker(unittest.TestCase):
+    def setUp(self):
+        self.valid_csv = "Type,Value1,Value2\nA,10,20\nB,,25\nA,12,22"
+
+    def run_lines(self, requests):
+        stdin = BytesIO("".join(json.dumps(r) + "\n" for r in requests).encode("utf-8"))
+        stdout = BytesIO()
+        serve(stdin, stdout)
+        return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_dispatches_each_operation(self):
+        responses = self.run_lines([
+            {"operation": "clean", "csv_data": self.valid_csv, "method": "dropna"},
+            {"operation": "info", "csv_data": self.valid_csv},
+            {"operation": "vis_data", "csv_data": self.valid_csv, "method": "sum",
+             "target_column": "Type", "selected_cols": ["Value2"]}
+        ])
+        self.assertEqual([r["Status"] for r in responses], ["success"] * 3)
+        cleaned = pd.read_csv(StringIO(responses[0]["Data"]))
+        self.assertEqual(len(cleaned), 2)
+        self.assertIn("null value count", responses[1]["Data"])
+        self.assertIn("Value2_Total", responses[2]["Data"])
+
+    def test_errors_do_not_stop_the_worker(self):
+        responses = self.run_lines([
+            {"operation": "clean", "csv_data": self.valid_csv, "method": "invalid_method"},
+            {"operation": "clean", "csv_data": self.valid_csv, "method": "dropna"}
+        ])
+        self.assertEqual(responses[0]["Status"], "error")
+        self.assertEqual(responses[0]["Error"]["Type"], "INVALID_METHOD")
+        self.assertEqual(responses[1]["Status"], "success")
+
+    def test_binary_bodies_between_requests(self):
+        body = encode_frame(pd.read_csv(StringIO(self.valid_csv)), "npz")
+        header = {"operation": "clean", "method": "dropna", "data_format": "npz",
+                  "data_length": len(body), "output_format": "npz", "request_id": 1}
+        stdin = BytesIO(json.dumps(header).encode("utf-8") + b"\n" + body
+                        + json.dumps({"operation": "info", "csv_data": self.valid_csv}).encode("utf-8") + b"\n")
+        stdout = BytesIO()
+        serve(stdin, stdout)
+
+        output = BytesIO(stdout.getvalue())
+        first = json.loads(output.readline())
+        self.assertEqual(first["DataFormat"], "npz")
+        self.assertEqual(first["RequestId"], 1)
+        cleaned = decode_frame(output.read(first["DataLength"]), "npz")
+        self.assertEqual(len(cleaned), 2)
+        second = json.loads(output.readline())
+        self.assertEqual(second["Status"], "success")
+
+    def test_framed_response_between_requests(self):
+        stdin = BytesIO("".join(json.dumps(r) + "\n" for r in [
+            {"operation": "info", "csv_data": self.valid_csv, "compression": "gzip", "request_id": 1},
+            {"operation": "info", "csv_data": self.valid_csv, "request_id": 2}
+        ]).encode("utf-8"))
+        stdout = BytesIO()
+        serve(stdin, stdout)
+
+        output = BytesIO(stdout.getvalue())
+        header, payload, _ = read_framed_response(output)
+        self.assertEqual(header["RequestId"], 1)
+        second = json.loads(output.readline())
+        self.assertEqual(second["RequestId"], 2)
+        self.assertEqual(payload.decode("utf-8"), second["Data"])
+
+    def test_csv_format_in_a_json_document(self):
+        [response] = self.run_lines([{"operation": "clean", "csv_data": self.valid_csv, "data_format": "csv",
+                                      "method": "dropna"}])
+        self.assertEqual(response["Status"], "success")
+
+    def test_binary_format_without_body(self):
+        response = handle_request(json.dumps({"operation": "info", "data_format": "npz"}))
+        self.assertEqual(response["Error"]["Type"], "MISSING_DATA")
+
+    def test_invalid_json(self):
+        response = handle_request("{'invalid': json}")
+        self.assertEqual(response["Error"]["Type"], "JSON_PARSE_ERROR")
+
+    def test_unknown_operation(self):
+        response = handle_request(json.dumps({"operation": "nope", "csv_data": self.valid_csv}))
+        self.assertEqual(response["Error"]["Type"], "INVALID_OPERATION")
+
+    def test_missing_data(self):
+        response = handle_request(json.dumps({"operation": "info"}))
+        self.assertEqual(response["Error"]["Type"], "MISSING_DATA")
+
+    def test_request_id_is_echoed(self):
+        response = handle_request(json.dumps({"operation": "info", "request_id": 7}))
+        self.assertEqual(response["RequestId"], 7)
+
+if __name__ == '__main__':
+    unittest.main()
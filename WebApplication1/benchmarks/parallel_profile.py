@@ -0,0 +1,57 @@
+"""Scaling benchmark of csv_info's column profiling over a process pool.
+
+    python benchmarks/parallel_profile.py [--rows N] [--columns N] [--repeat N] [--workers 1 2 4 8]
+
+Run it from WebApplication1. The frame repeats the column kinds of the type count
+benchmark until it is as wide as asked; each worker count profiles every column
+and the info table is checked against the single-process one.
+"""
+import os
+import sys
+import time
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from info_script import info_from_columns, profile_columns
+from benchmarks.type_profile import make_frame
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+def make_wide_frame(rows, columns, seed=0):
+    """columns columns cycling through integers, floats with gaps, text with gaps and mixed values"""
+    base = make_frame(rows, seed)
+    kinds = list(base.columns)
+    return pd.DataFrame({f"{kinds[i % len(kinds)]}_{i}": base[kinds[i % len(kinds)]] for i in range(columns)})
+
+def measure_scaling(data, worker_counts=WORKER_COUNTS, repeat=3):
+    """{workers: (best seconds, info table identical to one worker's)}"""
+    expected = info_from_columns(profile_columns(data))
+    results = {}
+    for workers in worker_counts:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            info = info_from_columns(profile_columns(data, workers=workers))
+            timings.append(time.perf_counter() - start)
+        results[workers] = (min(timings), info.equals(expected))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--columns", type=int, default=320)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=list(WORKER_COUNTS))
+    options = parser.parse_args()
+
+    data = make_wide_frame(options.rows, options.columns)
+    results = measure_scaling(data, options.workers, options.repeat)
+    baseline = results[min(results)][0]
+
+    print(f"{options.rows:,} rows x {options.columns} columns, {os.cpu_count()} CPUs")
+    for workers, (seconds, same) in results.items():
+        print(f"{workers} workers {seconds * 1000:10.1f} ms  ({baseline / seconds:.2f}x, identical table: {same})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmarks of table_extractor's PDF extraction over a process pool and of its page prefilter.
+
+    python benchmarks/pdf_tables.py [--pages N] [--rows N] [--text-pages N] [--repeat N] [--workers 1 2 4 8]
+
+Run it from WebApplication1. The document is generated here, one ruled table per
+page with a header row, so no PDF library beyond pdfplumber is needed; each worker
+count extracts every table and the result is checked against the serial one. The
+prefilter is timed on the same document with --text-pages pages of running text
+interleaved, in "fast" and "exhaustive" mode.
+"""
+import io
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pdfplumber
+from table_extractor import pdf_tables_to_list, worth_extracting
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+def _page_content(page, rows, columns, tables_per_page):
+    """Drawing operators for the page's tables: cell rectangles, then the cell text"""
+    width, height = 540 / columns, 14
+    operators = ["0.5 w"]
+    top = 760
+    for table in range(tables_per_page):
+        for row in range(rows + 1):
+            for column in range(columns):
+                x, y = 36 + column * width, top - (row + 1) * height
+                operators.append(f"{x:.2f} {y:.2f} {width:.2f} {height:.2f} re S")
+                text = f"col{column}" if row == 0 else f"p{page}t{table}r{row}c{column}"
+                operators.append(f"BT /F1 7 Tf {x + 2:.2f} {y + 4:.2f} Td ({text}) Tj ET")
+        top -= (rows + 3) * height
+    return "\n".join(operators).encode("latin-1")
+
+def _text_content(page, lines=60):
+    """Drawing operators for a page of running text, with no rules"""
+    return "\n".join(f"BT /F1 8 Tf 36 {770 - line * 12} Td (Page {page} line {line}: lorem ipsum dolor sit amet, "
+                     f"consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore) Tj ET"
+                     for line in range(lines)).encode("latin-1")
+
+def make_pdf(pages, rows=20, columns=6, tables_per_page=1, blank_pages=(), text_pages=()):
+    """A letter-size PDF with tables_per_page ruled tables on every page except blank_pages and text_pages (0-based)"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        if page in blank_pages:
+            content = b""
+        elif page in text_pages:
+            content = _text_content(page)
+        else:
+            content = _page_content(page, rows, columns, tables_per_page)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    document = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(document))
+        document += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(document)
+    document += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    document += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    document += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(document)
+
+def measure_scaling(document, worker_counts=WORKER_COUNTS, repeat=3):
+    """{workers: (best seconds, tables identical to one worker's)}"""
+    expected = pdf_tables_to_list(document)
+    results = {}
+    for workers in worker_counts:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tables = pdf_tables_to_list(document, workers=workers)
+            timings.append(time.perf_counter() - start)
+        same = len(tables) == len(expected) and all(df.equals(other) for df, other in zip(tables, expected))
+        results[workers] = (min(timings), same)
+    return results
+
+def measure_prefilter(document, repeat=1):
+    """{mode: (best seconds, pages skipped, tables identical to exhaustive mode's)}"""
+    with pdfplumber.open(io.BytesIO(document)) as pdf:
+        skipped = sum(not worth_extracting(page) for page in pdf.pages)
+    results = {}
+    expected = None
+    for mode in ("exhaustive", "fast"):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tables = pdf_tables_to_list(document, mode=mode)
+            timings.append(time.perf_counter() - start)
+        expected = tables if expected is None else expected
+        same = len(tables) == len(expected) and all(df.equals(other) for df, other in zip(tables, expected))
+        results[mode] = (min(timings), skipped if mode == "fast" else 0, same)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--text-pages", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=list(WORKER_COUNTS))
+    options = parser.parse_args()
+
+    document = make_pdf(options.pages, options.rows)
+    results = measure_scaling(document, options.workers, options.repeat)
+    baseline = results[min(results)][0]
+
+    print(f"{options.pages} pages, {len(document):,} bytes, {os.cpu_count()} CPUs")
+    for workers, (seconds, same) in results.items():
+        print(f"{workers} workers {seconds * 1000:10.1f} ms  ({baseline / seconds:.2f}x, identical tables: {same})")
+
+    pages = options.pages + options.text_pages
+    document = make_pdf(pages, options.rows, text_pages=range(1, 2 * options.text_pages, 2))
+    results = measure_prefilter(document, options.repeat)
+    exhaustive = results["exhaustive"][0]
+    print(f"{pages} pages, {options.text_pages} of them text only")
+    for mode, (seconds, skipped, same) in results.items():
+        print(f"{mode:10} {seconds * 1000:10.1f} ms  ({skipped} pages skipped, {exhaustive - seconds:.2f} s saved, "
+              f"identical tables: {same})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Cold-start benchmark for the Python entry points.
+
+Every script is started in a fresh interpreter with a request it rejects during
+validation, which is the cheapest path through it: the time spent there is pure
+startup. For each script this reports the median wall time, the time spent
+importing modules after interpreter startup, and which heavy dependencies got
+loaded anyway.
+
+    python benchmarks/startup.py [--repeat N]
+
+Run it from WebApplication1, like the scripts themselves.
+"""
+import os
+import sys
+import base64
+import argparse
+import statistics
+import subprocess
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "pdfplumber", "docx", "requests")
+
+# Requests each script rejects before it needs any of its heavy dependencies.
+ENTRY_POINTS = {
+    "cleaning_script.py": {"args": [], "stdin": b"{}"},
+    "info_script.py": {"args": [], "stdin": b"{}"},
+    "visualisation_data.py": {"args": [], "stdin": b"{}"},
+    "html_data.py": {"args": [], "stdin": b"not-a-url\n"},
+    "table_extractor.py": {"args": [".txt"], "stdin": base64.b64encode(b"not a document")},
+    "worker.py": {"args": [], "stdin": b""}
+}
+
+# Import time budgets in milliseconds for the rejected requests above. Importing
+# pandas alone takes several hundred milliseconds, so these fail as soon as an
+# entry point loads it, or something similar, before validation.
+STARTUP_BUDGETS_MS = {
+    "cleaning_script.py": 150,
+    "info_script.py": 150,
+    "visualisation_data.py": 150,
+    "html_data.py": 100,
+    "table_extractor.py": 100,
+    "worker.py": 150
+}
+
+def parse_importtime(stderr):
+    """(modules imported, milliseconds spent importing after interpreter startup)"""
+    modules = set()
+    total_us = 0
+    after_site = False
+    for line in stderr.decode("utf-8", "replace").splitlines():
+        if not line.startswith("import time:") or line.endswith("imported package"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        module = name.strip()
+        modules.add(module)
+        # Nested imports are indented below the module that triggered them.
+        top_level = name[1:] == module
+        if top_level and after_site:
+            total_us += int(cumulative_us)
+        if top_level and module == "site":
+            after_site = True
+    return modules, total_us / 1000
+
+def run_script(script, args=(), stdin=b"", importtime=False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + [script] + list(args)
+    start = time.perf_counter()
+    process = subprocess.run(command, input=stdin, capture_output=True, cwd=SCRIPT_DIR)
+    return process, (time.perf_counter() - start) * 1000
+
+def measure_startup(script, args=(), stdin=b"", repeat=1):
+    """Median cold wall time and import time of one script run, plus the heavy modules it loaded"""
+    wall_ms = [run_script(script, args, stdin)[1] for _ in range(repeat)]
+    import_ms = []
+    for _ in range(repeat):
+        process, _ = run_script(script, args, stdin, importtime=True)
+        modules, elapsed = parse_importtime(process.stderr)
+        import_ms.append(elapsed)
+    return {
+        "wall_ms": statistics.median(wall_ms),
+        "import_ms": statistics.median(import_ms),
+        "heavy_modules": sorted(module for module in modules if module in HEAVY_MODULES),
+        "returncode": process.returncode
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    baseline = statistics.median(run_script("-c", ["pass"])[1] for _ in range(options.repeat))
+    print(f"{'interpreter (python -c pass)':<30}{baseline:>10.1f} ms wall")
+    for script, request in ENTRY_POINTS.items():
+        result = measure_startup(script, request["args"], request["stdin"], options.repeat)
+        budget = STARTUP_BUDGETS_MS[script]
+        status = "ok" if result["import_ms"] <= budget and not result["heavy_modules"] else "OVER BUDGET"
+        print(f"{script:<30}{result['wall_ms']:>10.1f} ms wall{result['import_ms']:>10.1f} ms imports"
+              f"  (budget {budget} ms, {status})  heavy: {', '.join(result['heavy_modules']) or '-'}")
+
+if __name__ == "__main__":
+    main()
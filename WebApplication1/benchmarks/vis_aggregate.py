@@ -0,0 +1,71 @@
+"""Benchmark of vis_data's single-pass aggregation against the groupby version it replaced.
+
+    python benchmarks/vis_aggregate.py [--rows N] [--groups N] [--repeat N]
+
+Run it from WebApplication1. The reference runs one groupby per statistic plus a
+value_counts and merges them on the key, as vis_data did for method "both"; the
+single pass also computes every other statistic the chart menu offers.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from visualisation_data import aggregate_groups, parse_stats
+
+GROUPBY_STATS = {"count": "count", "sum": "sum", "mean": "mean", "min": "min", "max": "max", "std": "std",
+                 "median": "median"}
+
+def groupby_reference(data, target_column, selected_cols, stats):
+    """One groupby per statistic and a value_counts, merged on the key"""
+    counts = data[target_column].value_counts().reset_index()
+    counts.columns = [target_column, "Counts"]
+    grouped = []
+    for stat, suffix, q in parse_stats(None, stats):
+        by_key = data.groupby(target_column)[selected_cols]
+        part = by_key.quantile(q) if stat not in GROUPBY_STATS else getattr(by_key, GROUPBY_STATS[stat])()
+        grouped.append(part.rename(columns={col: f"{col}_{suffix}" for col in part.columns}))
+    return counts.merge(pd.concat(grouped, axis=1).reset_index(), on=target_column)
+
+def make_frame(rows, groups, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(100, 15, rows)
+    values[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        "key": pd.Series(rng.integers(0, groups, rows)).map(lambda code: f"group{code}"),
+        "amount": values,
+        "quantity": rng.integers(0, 50, rows)
+    })
+
+def best_time(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--groups", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    data = make_frame(options.rows, options.groups)
+    columns = ["amount", "quantity"]
+    print(f"{options.rows:,} rows, {options.groups:,} groups")
+    for stats in (["sum", "mean"], ["count", "sum", "mean", "min", "max", "std", "median", "p90"]):
+        reference, expected = best_time(lambda: groupby_reference(data, "key", columns, stats), options.repeat)
+        single, result = best_time(lambda: aggregate_groups(data, "key", columns, parse_stats(None, stats)),
+                                   options.repeat)
+        same = np.allclose(result.iloc[:, 1:].to_numpy(float), expected.iloc[:, 1:].to_numpy(float), equal_nan=True)
+        print(f"{', '.join(stats)}")
+        print(f"  groupby per statistic {reference * 1000:10.1f} ms")
+        print(f"  single pass           {single * 1000:10.1f} ms  ({reference / single:.1f}x faster, same values: {same})")
+
+if __name__ == "__main__":
+    main()
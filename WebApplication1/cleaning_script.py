@@ -1,7 +1,24 @@
-import pandas as pd
+import functools
+import re
+import warnings
+import os
 import sys
 import io
 import json
+from collections import Counter
+from dataset_cache import content_id, get_dataset_cache, result_id
+from lazy_import import lazy_import
+from sketches import KLLSketch
+from transport import (StreamedBody, TransportError, decode_frame, encode_frame, negotiate_format, read_request,
+                       response_framing, write_response)
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+STREAM_CHUNKSIZE = 100_000
+ROW_LOCAL_METHODS = ("dropna", "fillna", "replace", "typecast")
+EPOCH_UNITS = ("s", "ms", "us", "ns")
+DATETIME_SAMPLE_ROWS = 1000
 
 class DataCleaningError(Exception):
     def __init__(self, message, error_type=None, details=None):
@@ -9,20 +26,145 @@ class DataCleaningError(Exception):
         self.error_type = error_type
         self.details = details
 
-def safe_typecast(data: pd.DataFrame, target_type: type, column: str, errors: str = 'coerce') -> pd.DataFrame:
+TRUE_VALUES = ["true", "1", "yes", "y"]
+FALSE_VALUES = ["false", "0", "no", "n"]
+
+def _typecast_int(values, date_format=None):
+    numeric = pd.to_numeric(values, errors="coerce")
+    if pd.api.types.is_integer_dtype(numeric) or pd.api.types.is_bool_dtype(numeric):
+        return numeric.astype("Int64")
+    numbers = numeric.to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(invalid="ignore"):
+        integral = (np.floor(numbers) == numbers) & (np.abs(numbers) < 2 ** 63)
+    return pd.Series(
+        pd.arrays.IntegerArray(np.where(integral, numbers, 0).astype(np.int64), ~integral),
+        index=values.index
+    )
+
+def _typecast_float(values, date_format=None):
+    return pd.to_numeric(values, errors="coerce").astype("float64")
+
+def _typecast_str(values, date_format=None):
+    return values.astype(str)
+
+def _typecast_bool(values, date_format=None):
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype("boolean")
+    if pd.api.types.is_numeric_dtype(values):
+        numbers = values.to_numpy(dtype=float, na_value=np.nan)
+        return pd.Series(
+            pd.arrays.BooleanArray(numbers == 1, ~((numbers == 0) | (numbers == 1))),
+            index=values.index
+        )
+    # Text is lowered and matched once per distinct value, then broadcast through the codes.
+    codes, uniques = pd.factorize(values)
+    lowered = pd.Index(uniques.astype(str)).str.strip().str.lower()
+    truthy = np.append(lowered.isin(TRUE_VALUES), False)
+    known = np.append(lowered.isin(TRUE_VALUES) | lowered.isin(FALSE_VALUES), False)
+    return pd.Series(pd.arrays.BooleanArray(truthy[codes], ~known[codes]), index=values.index)
+
+@functools.lru_cache(maxsize=1024)
+def _guess_datetime_formats(sample):
+    from pandas.tseries.api import guess_datetime_format
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        guesses = (guess_datetime_format(sample), guess_datetime_format(sample, dayfirst=True))
+    return tuple(fmt for fmt in dict.fromkeys(guesses) if fmt is not None)
+
+def infer_datetime_format(values, samples=20):
+    """Format that parses the most of the first distinct non-null values, or None.
+
+    Samples come from the first DATETIME_SAMPLE_ROWS values, which the streaming
+    path reads ahead so that every chunk uses the same format. Ties go to the most
+    frequent guess, then to month-first over day-first. Guesses
+    are cached per sample string, so a worker converting similar files again skips
+    the guessing.
+    """
+    head = values.head(DATETIME_SAMPLE_ROWS)
+    sample_values = pd.unique(head[head.notna()].astype(str))[:samples]
+    candidates = Counter(fmt for sample in sample_values for fmt in _guess_datetime_formats(sample))
+    if not candidates:
+        return None
+    parsed = {
+        fmt: pd.to_datetime(pd.Series(sample_values), format=fmt, errors="coerce").notna().sum()
+        for fmt in candidates
+    }
+    return max(candidates, key=lambda fmt: (parsed[fmt], candidates[fmt]))
+
+def _integer_text(values):
+    integers = _typecast_int(values)
+    return integers.astype(str).where(integers.notna())
+
+def datetime_format(values):
+    """Format the datetime typecast infers for values: a strftime format, an epoch unit or None.
+
+    Numbers are read as digits first (20210304 is "%Y%m%d"); those that match no
+    format are taken as seconds since the Unix epoch.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return None
+    if pd.api.types.is_numeric_dtype(values):
+        return infer_datetime_format(_integer_text(values)) or "s"
+    return infer_datetime_format(values)
+
+def _typecast_datetime(values, date_format=None):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    date_format = date_format or datetime_format(values)
+    if date_format in EPOCH_UNITS:
+        return pd.to_datetime(_typecast_float(values), unit=date_format, errors="coerce")
+    if pd.api.types.is_numeric_dtype(values):
+        values = _integer_text(values)
+    parsed = pd.to_datetime(values, format=date_format or "mixed", errors="coerce", cache=True)
+    # A strict format misses other ISO 8601 spellings, e.g. a date without the time.
+    missed = parsed.isna() & values.notna()
+    if date_format not in (None, "mixed", "ISO8601") and missed.any():
+        parsed[missed] = pd.to_datetime(values[missed], format="ISO8601", errors="coerce")
+    return parsed
+
+def _typecast_category(values, date_format=None):
+    return values.astype("category")
+
+TYPECASTS = {
+    "int": _typecast_int,
+    "float": _typecast_float,
+    "str": _typecast_str,
+    "bool": _typecast_bool,
+    "datetime": _typecast_datetime,
+    "category": _typecast_category
+}
+
+def safe_typecast(data: "pd.DataFrame", target_type: str, column: str, errors: str = 'coerce', date_format: str = None, report: dict = None) -> "pd.DataFrame":
+    """Convert one column to target_type without calling Python per cell.
+
+    "int" and "bool" produce the nullable Int64 and boolean dtypes, "datetime" parses
+    with date_format or a format inferred from the first values, falling back to
+    ISO 8601 for values the format misses; an epoch unit ("s", "ms", "us", "ns") as
+    date_format reads numbers since the Unix epoch. Values that cannot
+    be converted become null; with errors='raise' they fail the typecast instead.
+    The number of such values is added to report["typecast"][column] when a report
+    dict is given.
+    """
+    if isinstance(target_type, type):
+        target_type = target_type.__name__
     try:
-        result = data.copy()
-        
-        if target_type == bool:
-            result[column] = result[column].map(lambda x: str(x).lower() in ['true', '1', 'yes', 'y'] if pd.notna(x) else None)
-        else:
-            result[column] = pd.to_numeric(result[column], errors=errors) if target_type in (int, float) else result[column].astype(str)
-            
-            if target_type == int and errors == 'coerce':
-                result[column] = result[column].where(result[column].notna() & (result[column] % 1 == 0), pd.NA)
-                
+        result = data.copy(deep=False)
+        values = data[column]
+
+        converted = TYPECASTS[target_type](values, date_format)
+        coerced = int((converted.isna().to_numpy() & values.notna().to_numpy()).sum())
+
+        if coerced and errors == 'raise':
+            raise ValueError(f"{coerced} value(s) cannot be converted to {target_type}")
+
+        result[column] = converted
+        if report is not None:
+            entry = report.setdefault("typecast", {}).setdefault(column, {"target_type": target_type, "coerced_to_null": 0})
+            entry["target_type"] = target_type
+            entry["coerced_to_null"] += coerced
         return result
-        
+
     except Exception as e:
         raise DataCleaningError(
             message=f"Failed to typecast column '{column}'",
@@ -30,8 +172,135 @@ def safe_typecast(data: pd.DataFrame, target_type: type, column: str, errors: st
             details=str(e)
         )
 
+REPLACE_MODES = ["exact", "contains", "regex"]
+
+def _as_number(text):
+    try:
+        return float(text) if '.' in text else int(text)
+    except (ValueError, TypeError):
+        return text
+
+def parse_replacements(value, target_type):
+    """Validate replace parameters and return a list of (old, new) pairs.
+
+    value is one {'oldVal', 'newVal'} dict or a list of them. Numeric text is
+    converted to numbers, except old values used as contains/regex patterns.
+    """
+    pairs = value if isinstance(value, list) else [value]
+    if len(pairs) == 0 or not all(isinstance(pair, dict) and 'oldVal' in pair and 'newVal' in pair for pair in pairs):
+        raise DataCleaningError(
+            message="Invalid replacement values",
+            error_type="INVALID_VALUE",
+            details="Both 'oldVal' and 'newVal' values must be provided for replace method"
+        )
+
+    if target_type not in REPLACE_MODES:
+        raise DataCleaningError(
+            message="Invalid target_type for replace method",
+            error_type="INVALID_TYPE",
+            details=f"target_type must be one of: {', '.join(REPLACE_MODES)}"
+        )
+
+    replacements = []
+    for pair in pairs:
+        old_value = str(pair['oldVal'] if pair['oldVal'] is not None else "").strip()
+        new_value = str(pair['newVal'] if pair['newVal'] is not None else "").strip()
+        if old_value == "" or new_value == "":
+            raise DataCleaningError(
+                message="Please provide both the 'old value' and 'new value' for the replacement operation",
+                error_type="REPLACE_ERROR"
+            )
+        replacements.append((_as_number(old_value) if target_type == "exact" else old_value, _as_number(new_value)))
+    return replacements
+
+def _is_text_dtype(values):
+    return pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)
+
+def _unique_replacer(replacements, mode):
+    """Function mapping one distinct cell value to its replacement, or _NO_MATCH"""
+    if mode == "exact":
+        lookup = {}
+        for old_value, new_value in replacements:
+            lookup.setdefault(old_value, new_value)
+        return lambda cell: lookup.get(cell, _NO_MATCH)
+
+    if mode == "contains":
+        # One alternation for all pairs rejects cells without any old value in a single
+        # scan; the others take the first pair in order whose old value they contain.
+        lookup = {}
+        for old_value, new_value in replacements:
+            lookup.setdefault(old_value, new_value)
+        pattern = re.compile("|".join(re.escape(old_value) for old_value in lookup))
+
+        def replace_contains(cell):
+            if not isinstance(cell, str) or not pattern.search(cell):
+                return _NO_MATCH
+            return next(new_value for old_value, new_value in lookup.items() if old_value in cell)
+        return replace_contains
+
+    patterns = [(re.compile(old_value), new_value) for old_value, new_value in replacements]
+
+    def replace_regex(cell):
+        if isinstance(cell, str):
+            for pattern, new_value in patterns:
+                if pattern.search(cell):
+                    return new_value
+        return _NO_MATCH
+    return replace_regex
+
+_NO_MATCH = object()
+
+def _fillna_columns(data, fill_values):
+    """data.fillna(fill_values) for per-column fill values.
+
+    A shallow copy shares every column with data and only the columns with gaps are
+    reassigned, so the frame is not duplicated and data, which may be held by the
+    dataset cache, is never modified.
+    """
+    result = data.copy(deep=False)
+    for col, value in dict(fill_values).items():
+        if data[col].isna().any():
+            result[col] = data[col].fillna(value)
+    return result
+
+def replace_values(data, replacements, mode="exact", column=None, report=None):
+    """Replace cell values for many (old, new) pairs in one pass per column.
+
+    "exact" replaces cells equal to an old value. "contains" (literal text) and
+    "regex" replace the whole cell when it contains a match; the first matching
+    pair wins. Every column is factorized once and matched per distinct value, so
+    hundreds of pairs cost one scan of the data. Without a column only text
+    columns are visited, plus numeric columns when an exact old value is numeric.
+    """
+    replace_unique = _unique_replacer(replacements, mode)
+    numeric_keys = mode == "exact" and any(isinstance(old_value, (int, float)) for old_value, _ in replacements)
+
+    if column:
+        columns = [column]
+    else:
+        columns = [
+            col for col in data.columns
+            if _is_text_dtype(data[col]) or (numeric_keys and pd.api.types.is_numeric_dtype(data[col]) and not pd.api.types.is_bool_dtype(data[col]))
+        ]
+
+    result = data.copy(deep=False)
+    for col in columns:
+        codes, uniques = pd.factorize(data[col])
+        new_uniques = [replace_unique(unique) for unique in uniques]
+        changed = np.array([new is not _NO_MATCH for new in new_uniques], dtype=bool)
+        if not changed.any():
+            continue
+
+        lookup = pd.Series([new if new is not _NO_MATCH else old for old, new in zip(uniques, new_uniques)], dtype=None if not _is_text_dtype(data[col]) else object)
+        replaced_values = pd.api.extensions.take(lookup.to_numpy(), codes, allow_fill=True)
+        result[col] = pd.Series(replaced_values, index=data.index)
+        if report is not None:
+            counts = report.setdefault("replace", {})
+            counts[col] = counts.get(col, 0) + int(np.bincount(codes[codes >= 0], minlength=len(uniques))[changed].sum())
+    return result
+
 def validate_csv_data(csv_data):
-    """Validate CSV data before processing"""
+    """Validate CSV data before processing and return the parsed DataFrame"""
     if not csv_data or not isinstance(csv_data, str):
         raise DataCleaningError(
             message="Invalid CSV data format",
@@ -52,267 +321,585 @@ def validate_csv_data(csv_data):
             error_type="PARSE_ERROR",
             details=str(e)
         )
+    return df
 
-def clean_csv(input_data, method="dropna", column=None, value=None, target_type="str", limit=None):
+def parse_payload(payload, data_format):
+    """Decode a binary dataset body into a DataFrame"""
     try:
-        validate_csv_data(input_data)
-        data = pd.read_csv(io.StringIO(input_data))
+        data = decode_frame(payload, data_format)
+    except TransportError as e:
+        raise DataCleaningError(message=str(e), error_type=e.error_type, details=e.details)
+    except Exception as e:
+        raise DataCleaningError(
+            message=f"Failed to parse {data_format} data",
+            error_type="PARSE_ERROR",
+            details=str(e)
+        )
+    if data.empty:
+        raise DataCleaningError(
+            message="Empty dataset",
+            error_type="INVALID_CSV",
+            details="The dataset contains no rows"
+        )
+    return data
 
-        if column and column not in data.columns:
+def load_dataset(input_data=None, dataset_id=None, data_format="csv"):
+    """Return (dataset_id, DataFrame) from the dataset cache, parsing input_data on a miss"""
+    cache = get_dataset_cache()
+    if dataset_id:
+        data = cache.get(dataset_id)
+        if data is None:
             raise DataCleaningError(
-                message=f"Column '{column}' not found in dataset",
-                error_type="INVALID_COLUMN",
-                details=f"Available columns: {', '.join(data.columns)}"
+                message=f"Dataset '{dataset_id}' not found",
+                error_type="DATASET_NOT_FOUND",
+                details="The dataset is no longer cached, send the CSV data again"
+            )
+        return dataset_id, data
+    if data_format == "csv":
+        return cache.load(input_data, validate_csv_data)
+    return cache.load(input_data, lambda payload: parse_payload(payload, data_format))
+
+def register_result(cleaned_data, output_format="csv", framed=False, compression=None):
+    """Serialize a cleaning result and cache it so the next operation can start from it.
+
+    Returns (result, the id it is cached under). A framed result is left for
+    write_response to stream; it is cached once written, under the result_id of the
+    bytes that were sent, so its id is None here.
+    """
+    def cache_result(written_id):
+        get_dataset_cache().put(result_id(written_id), cleaned_data)
+        return {"DatasetId": result_id(written_id)}
+
+    try:
+        if framed:
+            return StreamedBody.for_frame(cleaned_data, output_format, compression=compression, on_written=cache_result), None
+        result = encode_frame(cleaned_data, output_format)
+    except TransportError as e:
+        raise DataCleaningError(message=str(e), error_type=e.error_type, details=e.details)
+    dataset_id = result_id(content_id(result))
+    get_dataset_cache().put(dataset_id, cleaned_data)
+    return result, dataset_id
+
+def _same_column(before, after):
+    if before.dtype != after.dtype:
+        return False
+    if isinstance(before.dtype, np.dtype):
+        # Untouched columns of a copy-on-write result still share their buffer.
+        old, new = before.to_numpy(), after.to_numpy()
+        if old.__array_interface__["data"] == new.__array_interface__["data"] and old.strides == new.strides:
+            return True
+    return before.equals(after)
+
+def record_changes(report, before, after):
+    """Note in report which columns a cleaning result changed and whether rows changed.
+
+    A different set of rows changes every column's statistics, so then all columns are
+    listed. csv_info uses this to recompute only what changed.
+    """
+    if report is None:
+        return
+    rows_changed = len(before) != len(after) or not before.index.equals(after.index)
+    columns = [
+        column for column in after.columns
+        if rows_changed or column not in before.columns or not _same_column(before[column], after[column])
+    ]
+    report["changes"] = {"columns": columns, "rows_changed": rows_changed}
+
+def apply_cleaning(data, method="dropna", column=None, value=None, target_type="str", limit=None, report=None):
+    if column and column not in data.columns:
+        raise DataCleaningError(
+            message=f"Column '{column}' not found in dataset",
+            error_type="INVALID_COLUMN",
+            details=f"Available columns: {', '.join(data.columns)}"
+        )
+
+    if method == "typecast":
+        if not target_type:
+            raise DataCleaningError(
+                message="Target type must be specified for typecast method",
+                error_type="MISSING_TYPE"
+            )
+        if not column:
+            raise DataCleaningError(
+                message="Column name must be specified for typecast method",
+                error_type="MISSING_COLUMN"
             )
-        
-        if method == "typecast":
-            if not target_type:
-                raise DataCleaningError(
-                    message="Target type must be specified for typecast method",
-                    error_type="MISSING_TYPE"
-                )
-            if not column:
-                raise DataCleaningError(
-                    message="Column name must be specified for typecast method",
-                    error_type="MISSING_COLUMN"
-                )
-                
-            type_map = {
-                "int": int,
-                "float": float,
-                "str": str,
-                "bool": bool
-            }
             
-            if target_type not in type_map:
-                raise DataCleaningError(
-                    message=f"Unsupported type: {target_type}",
-                    error_type="INVALID_TYPE",
-                    details=f"Supported types: {', '.join(type_map.keys())}"
-                )
-                
-            cleaned_data = safe_typecast(
-                data,
-                type_map[target_type],
-                column=column,
-                errors='coerce'
+        if target_type not in TYPECASTS:
+            raise DataCleaningError(
+                message=f"Unsupported type: {target_type}",
+                error_type="INVALID_TYPE",
+                details=f"Supported types: {', '.join(TYPECASTS.keys())}"
             )
+            
+        cleaned_data = safe_typecast(
+            data,
+            target_type,
+            column=column,
+            errors='coerce',
+            date_format=value if target_type == "datetime" and isinstance(value, str) and value else None,
+            report=report
+        )
 
-        elif method == "dropna":
+    elif method == "dropna":
+        if column:
+            cleaned_data = data.dropna(subset=[column])
+        else:
+            cleaned_data = data.dropna()
+    elif method == "fillna":
+        if value is None:
+            raise DataCleaningError(
+                message="Value must be provided for 'fillna' method",
+                error_type="MISSING_VALUE"
+            )
+        try:
             if column:
-                cleaned_data = data.dropna(subset=[column])
+                cleaned_data = data.copy(deep=False)
+                cleaned_data[column] = data[column].fillna(value)
+            else:
+                cleaned_data = data.fillna(value)
+        except ValueError as e:
+            raise DataCleaningError(
+                message="Invalid fill value for the data type",
+                error_type="INVALID_VALUE",
+                details=str(e)
+            )
+    elif method == "ffill":
+        try:
+            if limit:
+                limit = int(limit)
+                if column:
+                    cleaned_data = data.copy(deep=False)
+                    cleaned_data[column] = data[column].ffill(limit=limit if limit > 0 else None)
+                else:
+                    cleaned_data = data.ffill(limit=limit if limit > 0 else None)
+            else:
+                if column:
+                    cleaned_data = data.copy(deep=False)
+                    cleaned_data[column] = data[column].ffill()
+                else:
+                    cleaned_data = data.ffill()
+        except ValueError as e:
+            raise DataCleaningError(
+                message="Invalid limit value",
+                error_type="INVALID_VALUE",
+                details=str(e)
+            )
+        
+    elif method == "bfill":
+        try:
+            if limit:
+                limit = int(limit)
+                if column:
+                    cleaned_data = data.copy(deep=False)
+                    cleaned_data[column] = data[column].bfill(limit=limit if limit > 0 else None)
+                else:
+                    cleaned_data = data.bfill(limit=limit if limit > 0 else None)
             else:
-                cleaned_data = data.dropna()
-        elif method == "fillna":
-            if value is None:
+                if column:
+                    cleaned_data = data.copy(deep=False)
+                    cleaned_data[column] = data[column].bfill()
+                else:
+                    cleaned_data = data.bfill()
+        except ValueError as e:
+            raise DataCleaningError(
+                message="Invalid limit value",
+                error_type="INVALID_VALUE",
+                details=str(e)
+            )
+
+    elif method == "fillna_mean":
+        if column:
+            try:
+                mean_value = data[column].mean()
+                cleaned_data = data.copy(deep=False)
+                cleaned_data[column] = data[column].fillna(mean_value)
+            except TypeError as e:
                 raise DataCleaningError(
-                    message="Value must be provided for 'fillna' method",
-                    error_type="MISSING_VALUE"
+                    message=f"Cannot calculate 'mean' for non-numeric column '{column}'",
+                    error_type="INVALID_OPERATION",
+                    details=f"Column data type: {data[column].dtype}"
                 )
+        else:
             try:
-                if column:
-                    cleaned_data = data.copy()
-                    cleaned_data[column] = data[column].fillna(value)
-                else:
-                    cleaned_data = data.fillna(value)
-            except ValueError as e:
+                cleaned_data = _fillna_columns(data, data.mean())
+            except TypeError as e:
                 raise DataCleaningError(
-                    message="Invalid fill value for the data type",
-                    error_type="INVALID_VALUE",
-                    details=str(e)
+                    message="Cannot calculate 'mean' for non-numeric dataset",
+                    error_type="INVALID_OPERATION",
+                    details="The dataset contains non-numeric columns"
                 )
-        elif method == "ffill":
+        
+    elif method == "fillna_median":
+        if column:
             try:
-                if limit:
-                    limit = int(limit)
-                    if column:
-                        cleaned_data = data.copy()
-                        cleaned_data[column] = data[column].ffill(limit=limit if limit > 0 else None)
-                    else:
-                        cleaned_data = data.ffill(limit=limit if limit > 0 else None)
-                else:
-                    if column:
-                        cleaned_data = data.copy()
-                        cleaned_data[column] = data[column].ffill()
-                    else:
-                        cleaned_data = data.ffill()
-            except ValueError as e:
+                median_value = data[column].median()
+                cleaned_data = data.copy(deep=False)
+                cleaned_data[column] = data[column].fillna(median_value)
+            except TypeError as e:
                 raise DataCleaningError(
-                    message="Invalid limit value",
-                    error_type="INVALID_VALUE",
-                    details=str(e)
+                    message=f"Cannot calculate 'median' for non-numeric column '{column}'",
+                    error_type="INVALID_OPERATION",
+                    details=f"Column data type: {data[column].dtype}"
                 )
-            
-        elif method == "bfill":
+        else:
             try:
-                if limit:
-                    limit = int(limit)
-                    if column:
-                        cleaned_data = data.copy()
-                        cleaned_data[column] = data[column].bfill(limit=limit if limit > 0 else None)
-                    else:
-                        cleaned_data = data.bfill(limit=limit if limit > 0 else None)
-                else:
-                    if column:
-                        cleaned_data = data.copy()
-                        cleaned_data[column] = data[column].bfill()
-                    else:
-                        cleaned_data = data.bfill()
-            except ValueError as e:
+                cleaned_data = _fillna_columns(data, data.median())
+            except TypeError as e:
                 raise DataCleaningError(
-                    message="Invalid limit value",
-                    error_type="INVALID_VALUE",
-                    details=str(e)
+                    message="Cannot calculate 'median' for non-numeric dataset",
+                    error_type="INVALID_OPERATION",
+                    details="The dataset contains non-numeric columns"
                 )
 
-        elif method == "fillna_mean":
+    elif method == "fillna_mode":
+        try:
             if column:
-                try:
-                    mean_value = data[column].mean()
-                    cleaned_data = data.copy()
-                    cleaned_data[column] = data[column].fillna(mean_value)
-                except TypeError as e:
+                if data[column].notna().sum() == 0:
                     raise DataCleaningError(
-                        message=f"Cannot calculate 'mean' for non-numeric column '{column}'",
-                        error_type="INVALID_OPERATION",
-                        details=f"Column data type: {data[column].dtype}"
+                        message=f"Cannot calculate mode for column '{column}' because it contains only NaN values",
+                        error_type="EMPTY_COLUMN",
+                        details="The column has no valid values to compute a mode"
                     )
-            else:
-                try:
-                    cleaned_data = data.fillna(data.mean())
-                except TypeError as e:
+                
+                mode_value = data[column].mode()
+                if len(mode_value) == 0:
                     raise DataCleaningError(
-                        message="Cannot calculate 'mean' for non-numeric dataset",
-                        error_type="INVALID_OPERATION",
-                        details="The dataset contains non-numeric columns"
-                    )
-            
-        elif method == "fillna_median":
-            if column:
-                try:
-                    median_value = data[column].median()
-                    cleaned_data = data.copy()
-                    cleaned_data[column] = data[column].fillna(median_value)
-                except TypeError as e:
-                    raise DataCleaningError(
-                        message=f"Cannot calculate 'median' for non-numeric column '{column}'",
-                        error_type="INVALID_OPERATION",
-                        details=f"Column data type: {data[column].dtype}"
+                        message=f"Cannot calculate mode for column '{column}'",
+                        error_type="EMPTY_COLUMN",
+                        details="No mode found for the column"
                     )
+                    
+                cleaned_data = data.copy(deep=False)
+                cleaned_data[column] = data[column].fillna(mode_value[0])
             else:
-                try:
-                    cleaned_data = data.fillna(data.median())
-                except TypeError as e:
+                if data.notna().sum().sum() == 0:
                     raise DataCleaningError(
-                        message="Cannot calculate 'median' for non-numeric dataset",
-                        error_type="INVALID_OPERATION",
-                        details="The dataset contains non-numeric columns"
+                        message="Cannot calculate mode for the dataset because all columns contain only NaN values",
+                        error_type="EMPTY_DATASET",
+                        details="The dataset has no valid values to compute mode values"
                     )
+                
+                # One column at a time: DataFrame.mode() materialises every tied mode of
+                # every column, which for unique-valued columns is another full copy.
+                mode_values = {}
+                for col in data.columns:
+                    col_modes = data[col].mode()
+                    if len(col_modes) > 0:
+                        mode_values[col] = col_modes.iloc[0]
+                cleaned_data = _fillna_columns(data, mode_values)
+                
+        except Exception as e:
+            raise DataCleaningError(
+                message=f"Error calculating mode: {str(e)}",
+                error_type="EMPTY_COLUMN",
+                details="Error occurred while computing mode"
+            )
 
-        elif method == "fillna_mode":
-            try:
-                if column:
-                    if data[column].notna().sum() == 0:
-                        raise DataCleaningError(
-                            message=f"Cannot calculate mode for column '{column}' because it contains only NaN values",
-                            error_type="EMPTY_COLUMN",
-                            details="The column has no valid values to compute a mode"
-                        )
-                    
-                    mode_value = data[column].mode()
-                    if len(mode_value) == 0:
-                        raise DataCleaningError(
-                            message=f"Cannot calculate mode for column '{column}'",
-                            error_type="EMPTY_COLUMN",
-                            details="No mode found for the column"
-                        )
-                        
-                    cleaned_data = data.copy()
-                    cleaned_data[column] = data[column].fillna(mode_value[0])
-                else:
-                    if data.notna().sum().sum() == 0:
-                        raise DataCleaningError(
-                            message="Cannot calculate mode for the dataset because all columns contain only NaN values",
-                            error_type="EMPTY_DATASET",
-                            details="The dataset has no valid values to compute mode values"
-                        )
-                    
-                    mode_values = data.mode().iloc[0]
-                    cleaned_data = data.fillna(mode_values)
-                    
-            except Exception as e:
+    elif method == "replace":
+        replacements = parse_replacements(value, target_type)
+        try:
+            cleaned_data = replace_values(data, replacements, target_type, column=column, report=report)
+        except re.error as e:
+            raise DataCleaningError(
+                message="Invalid regular expression",
+                error_type="REPLACE_ERROR",
+                details=str(e)
+            )
+        except Exception as e:
+            raise DataCleaningError(
+                message="Error during value replacement",
+                error_type="REPLACE_ERROR",
+                details=str(e)
+            )
+    else:
+        raise DataCleaningError(
+            message=f"Unsupported cleaning method: {method}",
+            error_type="INVALID_METHOD"
+        )
+
+    return cleaned_data
+
+def clean_csv(input_data, method="dropna", column=None, value=None, target_type="str", limit=None, dataset_id=None, report=None, data_format="csv", output_format="csv", framed=False, compression=None, return_id=False):
+    """Encoded result of one cleaning method; with return_id, (result, its DatasetId or None when framed)"""
+    try:
+        _, data = load_dataset(input_data, dataset_id, data_format)
+
+        cleaned_data = apply_cleaning(data, method=method, column=column, value=value, target_type=target_type, limit=limit, report=report)
+        record_changes(report, data, cleaned_data)
+
+        result, result_dataset_id = register_result(cleaned_data, output_format, framed, compression)
+        return (result, result_dataset_id) if return_id else result
+
+    except DataCleaningError:
+        raise
+    except Exception as e:
+        raise DataCleaningError(
+            message="An unexpected error occurred",
+            error_type="UNKNOWN_ERROR",
+            details=str(e)
+        )
+
+def clean_pipeline(input_data, operations, dataset_id=None, report=None, data_format="csv", output_format="csv", framed=False, compression=None, return_id=False):
+    """Apply an ordered list of cleaning operations to one parsed DataFrame.
+
+    Each operation is a dict with the same method/column/value/target_type/limit keys
+    clean_csv accepts. The CSV is parsed once and serialized once; a failing step is
+    reported by its 1-based position and method. return_id works as in clean_csv.
+    """
+    try:
+        _, original = load_dataset(input_data, dataset_id, data_format)
+        data = original
+        if not isinstance(operations, list) or len(operations) == 0:
+            raise DataCleaningError(
+                message="Pipeline operations must be a non-empty list",
+                error_type="INVALID_PIPELINE"
+            )
+
+        for step, operation in enumerate(operations, start=1):
+            if not isinstance(operation, dict):
                 raise DataCleaningError(
-                    message=f"Error calculating mode: {str(e)}",
-                    error_type="EMPTY_COLUMN",
-                    details="Error occurred while computing mode"
+                    message=f"Pipeline step {step} must be an object",
+                    error_type="INVALID_PIPELINE",
+                    details=f"Received: {operation!r}"
                 )
-
-        elif method == "replace":
-            if not isinstance(value, dict) or 'oldVal' not in value or 'newVal' not in value:
+            method = operation.get("method", "dropna")
+            try:
+                data = apply_cleaning(
+                    data,
+                    method=method,
+                    column=operation.get("column"),
+                    value=operation.get("value"),
+                    target_type=operation.get("target_type"),
+                    limit=operation.get("limit"),
+                    report=report
+                )
+            except DataCleaningError as e:
                 raise DataCleaningError(
-                    message="Invalid replacement values",
-                    error_type="INVALID_VALUE",
-                    details="Both 'oldVal' and 'newVal' values must be provided for replace method"
+                    message=f"Pipeline step {step} ({method}) failed: {e}",
+                    error_type=e.error_type,
+                    details=e.details
                 )
-                
-            if target_type not in ['exact', 'contains']:
+            except Exception as e:
                 raise DataCleaningError(
-                    message="Invalid target_type for replace method",
-                    error_type="INVALID_TYPE",
-                    details="target_type must be either 'exact' or 'contains'"
+                    message=f"Pipeline step {step} ({method}) failed: An unexpected error occurred",
+                    error_type="UNKNOWN_ERROR",
+                    details=str(e)
                 )
-                
-            try:
-                old_value = value['oldVal'].strip()
-                new_value = value['newVal'].strip()
 
-                if (old_value == "" or new_value == ""):
+        record_changes(report, original, data)
+        result, result_dataset_id = register_result(data, output_format, framed, compression)
+        return (result, result_dataset_id) if return_id else result
+
+    except DataCleaningError:
+        raise
+    except Exception as e:
+        raise DataCleaningError(
+            message="An unexpected error occurred",
+            error_type="UNKNOWN_ERROR",
+            details=str(e)
+        )
+
+def iter_csv_chunks(input_path, chunksize=STREAM_CHUNKSIZE):
+    try:
+        with pd.read_csv(input_path, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield chunk
+    except Exception as e:
+        raise DataCleaningError(
+            message="Failed to parse CSV data",
+            error_type="PARSE_ERROR",
+            details=str(e)
+        )
+
+def csv_header(input_path):
+    try:
+        return pd.read_csv(input_path, nrows=0).columns
+    except Exception as e:
+        raise DataCleaningError(
+            message="Failed to parse CSV data",
+            error_type="PARSE_ERROR",
+            details=str(e)
+        )
+
+def _parse_limit(limit):
+    try:
+        limit = int(limit) if limit else 0
+    except ValueError as e:
+        raise DataCleaningError(
+            message="Invalid limit value",
+            error_type="INVALID_VALUE",
+            details=str(e)
+        )
+    return limit if limit > 0 else None
+
+def _stream_statistics(input_path, method, column, chunksize):
+    """First pass for fillna_mean/median/mode: one fill value per target column"""
+    statistic = method.split("_")[1]
+    sums, counts, sketches, value_counts = {}, {}, {}, {}
+
+    for chunk in iter_csv_chunks(input_path, chunksize):
+        targets = [column] if column else list(chunk.columns)
+        for col in targets:
+            values = chunk[col]
+            if statistic == "mode":
+                chunk_counts = values.value_counts()
+                value_counts[col] = value_counts[col].add(chunk_counts, fill_value=0) if col in value_counts else chunk_counts
+                continue
+
+            if not pd.api.types.is_numeric_dtype(values):
+                if column:
                     raise DataCleaningError(
-                        message="Please provide both the 'old value' and 'new value' for the replacement operation",
-                        error_type="REPLACE_ERROR"
+                        message=f"Cannot calculate '{statistic}' for non-numeric column '{column}'",
+                        error_type="INVALID_OPERATION",
+                        details=f"Column data type: {values.dtype}"
                     )
-                
-                try:
-                    old_value = float(old_value) if '.' in str(old_value) else int(old_value)
-                except (ValueError, TypeError):
-                    pass
-                    
-                try:
-                    new_value = float(new_value) if '.' in str(new_value) else int(new_value)
-                except (ValueError, TypeError):
-                    pass
-                
-                cleaned_data = data.copy()
-                if target_type == "exact":
-                    if column:
-                        cleaned_data[column] = cleaned_data[column].replace(old_value, new_value)
-                    else:
-                        cleaned_data = cleaned_data.replace(old_value, new_value)
-                else: 
-                    if column:
-                        cleaned_data[column] = cleaned_data[column].replace(
-                            to_replace=f".*{old_value}.*", value=new_value, regex=True
-                        )
-                    else:
-                        cleaned_data = cleaned_data.replace(
-                            to_replace=f".*{old_value}.*", value=new_value, regex=True
-                        )
-                    
-            except Exception as e:
                 raise DataCleaningError(
-                    message="Error during value replacement",
-                    error_type="REPLACE_ERROR",
-                    details=str(e)
+                    message=f"Cannot calculate '{statistic}' for non-numeric dataset",
+                    error_type="INVALID_OPERATION",
+                    details="The dataset contains non-numeric columns"
+                )
+            if statistic == "mean":
+                sums[col] = sums.get(col, 0) + values.sum()
+                counts[col] = counts.get(col, 0) + values.count()
+            else:
+                sketches.setdefault(col, KLLSketch()).update(values.to_numpy(dtype=float, na_value=float("nan")))
+
+    if statistic == "mean":
+        return {col: sums[col] / counts[col] if counts[col] else float("nan") for col in sums}
+    if statistic == "median":
+        return {col: sketch.quantile(0.5) for col, sketch in sketches.items()}
+
+    fill_values = {}
+    for col, col_counts in value_counts.items():
+        if len(col_counts) == 0:
+            fill_values[col] = float("nan")
+            continue
+        modes = col_counts[col_counts == col_counts.max()].index
+        try:
+            fill_values[col] = sorted(modes)[0]
+        except TypeError:
+            fill_values[col] = modes[0]
+    if all(pd.isna(mode) for mode in fill_values.values()):
+        raise DataCleaningError(
+            message=f"Cannot calculate mode for column '{column}' because it contains only NaN values" if column else
+                    "Cannot calculate mode for the dataset because all columns contain only NaN values",
+            error_type="EMPTY_COLUMN",
+            details="The column has no valid values to compute a mode"
+        )
+    return fill_values
+
+def _stream_ffill(chunks, column, limit):
+    carry = None
+    for chunk in chunks:
+        targets = [column] if column else list(chunk.columns)
+        original = chunk[targets]
+        combined = original if carry is None else pd.concat([carry, original], ignore_index=True)
+        filled = combined.ffill(limit=limit).iloc[len(combined) - len(original):]
+        for col in targets:
+            if original[col].isna().any():
+                chunk[col] = filled[col].to_numpy()
+        # Unlimited fills only need the last value seen per column; limited fills need the
+        # preceding `limit` original rows to know how far the current null run already is.
+        carry = filled.iloc[[-1]] if limit is None else combined.iloc[-limit:]
+        yield chunk
+
+def _stream_bfill(chunks, column, limit):
+    pending = None
+    targets = None
+    for chunk in chunks:
+        targets = [column] if column else list(chunk.columns)
+        buffer = chunk if pending is None else pd.concat([pending, chunk], ignore_index=True)
+        # Rows after a column's last valid value can only be resolved by later chunks,
+        # unless they are more than `limit` rows away from anything still unread.
+        ready = len(buffer)
+        for col in targets:
+            valid = buffer[col].notna().to_numpy().nonzero()[0]
+            resolved = valid[-1] + 1 if len(valid) else 0
+            if limit is not None:
+                resolved = max(resolved, len(buffer) - limit)
+            ready = min(ready, resolved)
+        pending = buffer.iloc[ready:]
+        if ready:
+            yield _bfill_rows(buffer, targets, limit).iloc[:ready]
+    if pending is not None and len(pending):
+        yield _bfill_rows(pending, targets, limit)
+
+def _bfill_rows(frame, targets, limit):
+    frame = frame.copy(deep=False)
+    for col in targets:
+        if frame[col].isna().any():
+            frame[col] = frame[col].bfill(limit=limit)
+    return frame
+
+def clean_csv_stream(input_path, output_path, method="dropna", column=None, value=None, target_type="str", limit=None, chunksize=STREAM_CHUNKSIZE, report=None):
+    """Clean a CSV file chunk by chunk, writing the result to output_path as it goes.
+
+    Memory is bounded by chunksize rather than file size. Row-local methods run
+    through apply_cleaning on each chunk. ffill carries the preceding rows over chunk
+    boundaries and bfill holds rows back until their next valid value is read.
+    fillna_mean and fillna_mode read the file twice for exact statistics, while
+    fillna_median estimates the median with a KLL sketch in the first pass.
+    Returns the number of rows written.
+    """
+    try:
+        if not input_path or not os.path.isfile(input_path):
+            raise DataCleaningError(
+                message="Input file not found",
+                error_type="INVALID_CSV",
+                details=f"Input path: {input_path}"
+            )
+
+        if column:
+            # Checked against the header before any pass over the file, the statistics pass included.
+            header = csv_header(input_path)
+            if column not in header:
+                raise DataCleaningError(
+                    message=f"Column '{column}' not found in dataset",
+                    error_type="INVALID_COLUMN",
+                    details=f"Available columns: {', '.join(header)}"
                 )
+
+        fill_values = None
+        if method in ("fillna_mean", "fillna_median", "fillna_mode"):
+            fill_values = _stream_statistics(input_path, method, column, chunksize)
+
+        def row_local_chunks():
+            date_format = value
+            for index, chunk in enumerate(iter_csv_chunks(input_path, chunksize)):
+                if index == 0 and method == "typecast" and target_type == "datetime" and column and not date_format:
+                    # One format for the whole file, inferred from the rows the in-memory path samples:
+                    # chunks inferring their own could read 01/02 both ways.
+                    sample = pd.read_csv(input_path, usecols=[column], nrows=DATETIME_SAMPLE_ROWS)[column]
+                    date_format = datetime_format(sample) or "mixed"
+                yield apply_cleaning(chunk, method=method, column=column, value=date_format, target_type=target_type, limit=limit, report=report)
+
+        if method in ROW_LOCAL_METHODS:
+            cleaned_chunks = row_local_chunks()
+        elif fill_values is not None:
+            cleaned_chunks = (chunk.fillna(fill_values) for chunk in iter_csv_chunks(input_path, chunksize))
+        elif method == "ffill":
+            cleaned_chunks = _stream_ffill(iter_csv_chunks(input_path, chunksize), column, _parse_limit(limit))
+        elif method == "bfill":
+            cleaned_chunks = _stream_bfill(iter_csv_chunks(input_path, chunksize), column, _parse_limit(limit))
         else:
             raise DataCleaningError(
                 message=f"Unsupported cleaning method: {method}",
                 error_type="INVALID_METHOD"
             )
 
-        output = io.StringIO()
-        cleaned_data.to_csv(output, index=False)
-        return output.getvalue()
+        rows = 0
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", newline="") as output:
+                for index, chunk in enumerate(cleaned_chunks):
+                    chunk.to_csv(output, index=False, header=index == 0)
+                    rows += len(chunk)
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return rows
 
     except DataCleaningError:
         raise
@@ -323,45 +910,95 @@ def clean_csv(input_data, method="dropna", column=None, value=None, target_type=
             details=str(e)
         )
 
-if __name__ == "__main__":
-    try:
-        input_json = sys.stdin.read()
-        if not input_json.strip():
+def process_request(input_data, payload=None):
+    """Run one cleaning request; payload is the raw dataset body sent after the JSON header"""
+    report = {}
+    input_path = input_data.get("input_path")
+    if input_path:
+        output_path = input_data.get("output_path")
+        if not output_path:
             raise DataCleaningError(
-                message="Empty input",
-                error_type="JSON_PARSE_ERROR",
-                details="No input provided"
+                message="Output path is required for streaming mode",
+                error_type="MISSING_DATA"
             )
-            
+        rows = clean_csv_stream(
+            input_path,
+            output_path,
+            method=input_data.get("method", "dropna"),
+            column=input_data.get("column"),
+            value=input_data.get("value"),
+            target_type=input_data.get("target_type"),
+            limit=input_data.get("limit"),
+            chunksize=input_data.get("chunksize") or STREAM_CHUNKSIZE,
+            report=report
+        )
+        return {
+            "Status": "success",
+            "Data": output_path,
+            "Rows": rows,
+            "Report": report
+        }
+
+    data_format = input_data.get("data_format") or "csv"
+    output_format = negotiate_format(input_data.get("output_format"))
+    try:
+        framed, compression = response_framing(input_data)
+    except TransportError as e:
+        raise DataCleaningError(message=str(e), error_type=e.error_type, details=e.details)
+    csv_data = input_data.get("csv_data") if payload is None else payload
+    if data_format == "csv" and isinstance(csv_data, bytes):
         try:
-            input_data = json.loads(input_json)
-        except json.JSONDecodeError as e:
+            csv_data = csv_data.decode("utf-8")
+        except UnicodeDecodeError as e:
             raise DataCleaningError(
-                message="Invalid JSON input",
-                error_type="JSON_PARSE_ERROR",
+                message="Failed to parse CSV data",
+                error_type="PARSE_ERROR",
                 details=str(e)
             )
+    dataset_id = input_data.get("dataset_id")
+    if not csv_data and not dataset_id:
+        raise DataCleaningError(
+            message="CSV data is required",
+            error_type="MISSING_DATA"
+        )
 
-        csv_data = input_data.get("csv_data")
-        if not csv_data:
-            raise DataCleaningError(
-                message="CSV data is required",
-                error_type="MISSING_DATA"
-            )
-
+    operations = input_data.get("operations")
+    if operations is not None:
+        cleaned, cleaned_id = clean_pipeline(csv_data, operations, dataset_id=dataset_id, report=report, data_format=data_format, output_format=output_format,
+                                             framed=framed, compression=compression, return_id=True)
+    else:
         method = input_data.get("method", "dropna")
         column = input_data.get("column")
         value = input_data.get("value")
         target_type = input_data.get("target_type")
         limit = input_data.get("limit")
 
-        cleaned_csv = clean_csv(csv_data, method=method, column=column, value=value, target_type=target_type, limit=limit)
-        
-        response = {
-            "Status": "success",
-            "Data": cleaned_csv
-        }
-        print(json.dumps(response), file=sys.stdout)
+        cleaned, cleaned_id = clean_csv(csv_data, method=method, column=column, value=value, target_type=target_type, limit=limit, dataset_id=dataset_id, report=report, data_format=data_format, output_format=output_format,
+                                        framed=framed, compression=compression, return_id=True)
+
+    response = {
+        "Status": "success",
+        "Data": cleaned,
+        "Report": report
+    }
+    if not framed:
+        # A framed result gets its DatasetId in the trailer, once it has been written.
+        response["DatasetId"] = cleaned_id
+    if output_format != "csv":
+        response["DataFormat"] = output_format
+    return response
+
+if __name__ == "__main__":
+    try:
+        try:
+            input_data, payload = read_request(sys.stdin.buffer)
+        except TransportError as e:
+            raise DataCleaningError(message=str(e), error_type=e.error_type, details=e.details)
+
+        response = process_request(input_data, payload)
+        trailer = write_response(response, sys.stdout)
+        if trailer and trailer.get("Status") == "error":
+            sys.exit(1)
 
     except DataCleaningError as e:
         error_response = {
@@ -373,4 +1010,4 @@ if __name__ == "__main__":
             }
         }
         print(json.dumps(error_response), file=sys.stderr)
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,241 @@
+import os
+import json
+import hashlib
+import tempfile
+import importlib.util
+from collections import OrderedDict
+from lazy_import import lazy_import
+
+pd = lazy_import("pandas")
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+DEFAULT_EXTRACTION_CACHE_MB = 512
+
+def content_hasher():
+    """Hash object behind content_id, for content that arrives or leaves in pieces"""
+    return hashlib.blake2b(digest_size=16)
+
+def content_id(content):
+    """Content address of an uploaded dataset: identical text or bytes always map to the same id."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    hasher = content_hasher()
+    hasher.update(content)
+    return hasher.hexdigest()
+
+def result_id(result_content_id):
+    """Id a cleaning result's frame is cached under, apart from the content id of its serialized form.
+
+    The cleaned frame keeps what its serialization does not (category and Int64
+    columns, the text "nan"), so it must not be what a later upload of the same
+    bytes resolves to; that upload is parsed like any other.
+    """
+    return f"result-{result_content_id}"
+
+def _feather_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+class DatasetCache:
+    """LRU cache of parsed DataFrames keyed by dataset id.
+
+    Frames are kept in memory until their combined size exceeds memory_budget bytes,
+    then the least recently used ones are evicted. With a spill_dir, evicted frames are
+    written there (Feather when pyarrow is available, pickle otherwise) and read back on
+    the next lookup instead of being dropped. Cached frames are shared between requests,
+    so callers must not modify them in place.
+    """
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024, spill_dir=None):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.spill_format = "feather" if _feather_available() else "pickle"
+        self._frames = OrderedDict()
+        self._sizes = {}
+        self.memory_usage = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def __contains__(self, dataset_id):
+        if dataset_id in self._frames:
+            return True
+        path = self._spill_path(dataset_id)
+        return path is not None and os.path.exists(path)
+
+    def get(self, dataset_id):
+        if dataset_id in self._frames:
+            self._frames.move_to_end(dataset_id)
+            return self._frames[dataset_id]
+
+        frame = self._read_spill(dataset_id)
+        if frame is not None:
+            self.put(dataset_id, frame)
+        return frame
+
+    def put(self, dataset_id, frame):
+        if dataset_id in self._frames:
+            self._discard(dataset_id)
+
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        if size > self.memory_budget:
+            self._write_spill(dataset_id, frame)
+            return
+
+        self._frames[dataset_id] = frame
+        self._sizes[dataset_id] = size
+        self.memory_usage += size
+        while self.memory_usage > self.memory_budget:
+            evicted_id, evicted = self._frames.popitem(last=False)
+            self.memory_usage -= self._sizes.pop(evicted_id)
+            self._write_spill(evicted_id, evicted)
+
+    def load(self, content, parse, dataset_id=None):
+        """Return (dataset_id, frame) for content, calling parse(content) only on a miss.
+
+        dataset_id is content_id(content) when the caller has hashed it already.
+        Content that is not a non-empty string or bytes is handed straight to parse
+        so the caller's own validation errors are raised unchanged.
+        """
+        if not isinstance(content, (str, bytes)) or not content:
+            return None, parse(content)
+
+        dataset_id = dataset_id or content_id(content)
+        frame = self.get(dataset_id)
+        if frame is None:
+            frame = parse(content)
+            self.put(dataset_id, frame)
+        return dataset_id, frame
+
+    def clear(self):
+        self._frames.clear()
+        self._sizes.clear()
+        self.memory_usage = 0
+
+    def _discard(self, dataset_id):
+        del self._frames[dataset_id]
+        self.memory_usage -= self._sizes.pop(dataset_id)
+
+    def _spill_path(self, dataset_id):
+        if not self.spill_dir:
+            return None
+        extension = "feather" if self.spill_format == "feather" else "pkl"
+        return os.path.join(self.spill_dir, f"{dataset_id}.{extension}")
+
+    def _write_spill(self, dataset_id, frame):
+        path = self._spill_path(dataset_id)
+        if path is None or os.path.exists(path):
+            return
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            if self.spill_format == "feather":
+                frame.reset_index(drop=True).to_feather(tmp_path)
+            else:
+                frame.to_pickle(tmp_path, protocol=5)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _read_spill(self, dataset_id):
+        path = self._spill_path(dataset_id)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            if self.spill_format == "feather":
+                return pd.read_feather(path)
+            return pd.read_pickle(path)
+        except Exception:
+            return None
+
+_default_cache = None
+
+def get_dataset_cache():
+    """Process-wide cache configured by CRESCO_DATASET_CACHE_MB and CRESCO_DATASET_CACHE_DIR."""
+    global _default_cache
+    if _default_cache is None:
+        budget_mb = float(os.environ.get("CRESCO_DATASET_CACHE_MB", DEFAULT_MEMORY_BUDGET_MB))
+        _default_cache = DatasetCache(
+            memory_budget=int(budget_mb * 1024 * 1024),
+            spill_dir=os.environ.get("CRESCO_DATASET_CACHE_DIR") or None
+        )
+    return _default_cache
+
+class ExtractionCache:
+    """Content-addressed disk cache of extraction results, shared by concurrent processes.
+
+    Entries are files in directory named by a hash of the document and the
+    parameters that shape the result. Each is written to a temporary file and
+    renamed into place, so readers only ever see whole entries. A hit refreshes the
+    entry's modification time, and once the directory holds more than max_bytes the
+    entries least recently written or read are removed. Entries another process
+    removes in between are simply misses.
+    """
+
+    SUFFIX = ".json"
+
+    def __init__(self, directory, max_bytes=DEFAULT_EXTRACTION_CACHE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(content, **params):
+        """Id of content extracted with params; params must be JSON serializable"""
+        hasher = content_hasher()
+        hasher.update(content_id(content).encode("ascii"))
+        hasher.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+        return hasher.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as handle:
+                payload = handle.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return payload
+
+    def put(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as output:
+                output.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.SUFFIX):
+                try:
+                    status = entry.stat()
+                except OSError:
+                    continue
+                entries.append((status.st_mtime_ns, status.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+def get_extraction_cache():
+    """Disk cache configured by CRESCO_TABLE_CACHE_DIR and CRESCO_TABLE_CACHE_MB, or None when no directory is set"""
+    directory = os.environ.get("CRESCO_TABLE_CACHE_DIR")
+    if not directory:
+        return None
+    size_mb = float(os.environ.get("CRESCO_TABLE_CACHE_MB", DEFAULT_EXTRACTION_CACHE_MB))
+    return ExtractionCache(directory, int(size_mb * 1024 * 1024))
@@ -1,8 +1,11 @@
-import pandas as pd
-import requests
 import sys
 import json
 from urllib.parse import urlparse
+from lazy_import import lazy_import
+
+# Loaded on first use, so a malformed URL is rejected before either is imported.
+requests = lazy_import("requests")
+pd = lazy_import("pandas")
 
 class HTMLScrapingError(Exception):
     def __init__(self, message, error_type=None, details=None):
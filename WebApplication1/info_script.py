@@ -1,7 +1,35 @@
-import pandas as pd
+import os
 import sys
 import io
 import json
+from collections import OrderedDict
+from dataset_cache import get_dataset_cache
+from lazy_import import lazy_import
+from sketches import HyperLogLog, KLLSketch, RowSample, RunningMoments, SpaceSaving
+from transport import (StreamedBody, TransportError, decode_frame, encode_frame, negotiate_format, read_request,
+                       response_framing, write_response)
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+STREAM_CHUNKSIZE = 100_000
+NUMERIC_ROWS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+CATEGORICAL_ROWS = ["count", "unique", "top", "freq"]
+BOOLEAN_TEXT = ["True", "TRUE", "true", "False", "FALSE", "false"]
+PROFILE_CACHE_SIZE = 32
+STATS = ("describe", "types", "nulls")
+SAMPLE_METHODS = ("reservoir", "stratified")
+SAMPLE_SIZE = 10_000
+SAMPLE_CONFIDENCE = 0.95
+# Columns each worker should get at least for a process pool to pay off.
+PARALLEL_MIN_COLUMNS = 8
+
+# Per-column info of recently profiled datasets, by dataset id, so that the info for
+# the result of a cleaning step only recomputes the columns that step changed.
+_profile_cache = OrderedDict()
+
+# The frame being profiled in parallel; forked workers inherit it instead of receiving a pickled copy.
+_shared_data = None
 
 class DataCleaningError(Exception):
     def __init__(self, message, error_type=None, details=None):
@@ -9,36 +37,264 @@ class DataCleaningError(Exception):
         self.error_type = error_type
         self.details = details
 
-def csv_info(input_data):
+def parse_csv(input_data, data_format="csv"):
     try:
-        try:
-            data = pd.read_csv(io.StringIO(input_data))
-        except Exception as e:
+        if data_format == "csv" and isinstance(input_data, str):
+            return pd.read_csv(io.StringIO(input_data))
+        return decode_frame(input_data, data_format)
+    except TransportError as e:
+        raise DataCleaningError(message=str(e), error_type=e.error_type, details=e.details)
+    except Exception as e:
+        raise DataCleaningError(
+            message="Failed to parse CSV data",
+            error_type="PARSE_ERROR",
+            details=str(e)
+        )
+
+def load_dataset(input_data=None, dataset_id=None, data_format="csv"):
+    cache = get_dataset_cache()
+    if dataset_id:
+        data = cache.get(dataset_id)
+        if data is None:
             raise DataCleaningError(
-                message="Failed to parse CSV data",
-                error_type="PARSE_ERROR",
-                details=str(e)
+                message=f"Dataset '{dataset_id}' not found",
+                error_type="DATASET_NOT_FOUND",
+                details="The dataset is no longer cached, send the CSV data again"
             )
-        info_csv = data.describe(include='all')
-        dtype_counts = data.apply(lambda col: col.map(lambda x: str(type(x))).value_counts(sort=False))
+        return dataset_id, data
+    return cache.load(input_data, lambda content: parse_csv(content, data_format))
 
-        dtype_counts = dtype_counts.fillna(0).astype('int64')
+def _type_label(value):
+    return str(type(value))
 
-        df_info = pd.concat([info_csv, dtype_counts], axis=0)
-        
-        null_counts = data.isnull().sum()
+def _counts_in_order(codes, labels):
+    """Counts per label, in order of first appearance like value_counts(sort=False)"""
+    order = pd.unique(codes)
+    counts = np.bincount(codes, minlength=len(labels))[order]
+    return pd.Series(counts, index=[labels[code] for code in order], dtype="int64")
 
-        null_counts = pd.DataFrame(null_counts).T
+def _object_type_codes(values):
+    """(codes, labels) of the Python types in an object array.
+
+    Text columns, by far the most common, are recognised in one pass and only their
+    missing values are inspected one by one (a str subclass counts as str there);
+    anything else maps type() over the array.
+    """
+    missing = pd.isna(values)
+    if pd.api.types.infer_dtype(values, skipna=True) == "string":
+        codes = np.zeros(len(values), dtype=np.intp)
+        null_codes, null_types = pd.factorize(np.frompyfunc(type, 1, 1)(values[missing]))
+        codes[missing] = null_codes + 1
+        return codes, [_type_label("")] + [str(kind) for kind in null_types]
+    codes, types = pd.factorize(np.frompyfunc(type, 1, 1)(values))
+    return codes, [str(kind) for kind in types]
+
+def column_type_counts(values):
+    """Count of each Python type among a column's values, as str(type(x)) per cell would.
+
+    Numeric, boolean and datetime-like columns are answered from their dtype and null
+    mask; categoricals per category. Missing values in nullable integer, float and
+    boolean columns count as NAType.
+    """
+    dtype = values.dtype
+    if len(values) == 0:
+        return pd.Series(dtype="int64")
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Categories are classified once; a missing value is mapped as NaN, a float.
+        labels = [_type_label(category) for category in values.cat.categories] + [_type_label(np.nan)]
+        label_codes, labels = pd.factorize(np.asarray(labels, dtype=object))
+        return _counts_in_order(label_codes[values.cat.codes.to_numpy()], list(labels))
+    if pd.api.types.is_datetime64_any_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype):
+        present = pd.Timestamp(0) if pd.api.types.is_datetime64_any_dtype(dtype) else pd.Timedelta(0)
+        return _counts_in_order(values.isna().to_numpy().astype(np.intp), [_type_label(present), _type_label(pd.NaT)])
+    if isinstance(values.array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+        present = np.zeros(1, dtype=dtype.numpy_dtype)[0].item()
+        return _counts_in_order(values.isna().to_numpy().astype(np.intp), [_type_label(present), _type_label(pd.NA)])
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufc":
+        # Every cell, NaN included, is boxed to the same Python scalar type.
+        return pd.Series([len(values)], index=[_type_label(np.zeros(1, dtype=dtype)[0].item())], dtype="int64")
+    return _counts_in_order(*_object_type_codes(values.to_numpy(dtype=object)))
+
+def type_counts(data):
+    """Type count rows of the info table: one row per Python type, one column per data column"""
+    counts = {column: column_type_counts(values).rename_axis(column) for column, values in data.items()}
+    return pd.DataFrame(counts, columns=data.columns)
+
+def column_info(values, stats=STATS):
+    """One column's share of the info table: its describe rows, type counts and null count"""
+    compute = {
+        "describe": lambda: values.describe(),
+        "types": lambda: column_type_counts(values),
+        "nulls": lambda: int(values.isna().sum())
+    }
+    return {stat: compute[stat]() for stat in stats}
+
+def info_from_columns(columns, stats=STATS):
+    """The info table for {column: column_info} in column order, as csv_info lays it out"""
+    describe = dtype_counts = null_counts = None
+    if "describe" in stats:
+        describes = [info["describe"] for info in columns.values()]
+        # Rows are ordered the way describe(include='all') orders them: shortest layout first.
+        rows = []
+        for column_describe in sorted(describes, key=len):
+            rows += [row for row in column_describe.index if row not in rows]
+        describe = pd.concat([d.reindex(rows) for d in describes], axis=1, sort=False)
+        describe.columns = list(columns)
+    if "types" in stats:
+        dtype_counts = pd.DataFrame({column: info["types"].rename_axis(column) for column, info in columns.items()},
+                                    columns=list(columns))
+    if "nulls" in stats:
+        null_counts = pd.Series({column: info["nulls"] for column, info in columns.items()}, dtype="int64")
+    return info_table(describe, dtype_counts, null_counts)
+
+def select_columns(data, columns):
+    """data restricted to the requested columns, in request order; all of them when columns is empty"""
+    if not columns:
+        return data
+    for column in columns:
+        if column not in data.columns:
+            raise DataCleaningError(
+                message=f"Column '{column}' not found in data",
+                error_type="INVALID_COLUMN",
+                details=f"Available columns: {', '.join(data.columns)}"
+            )
+    return data[list(columns)]
+
+def parse_stats(stats):
+    """The requested statistics in table order; all of them when stats is empty"""
+    if not stats:
+        return STATS
+    stats = [stats] if isinstance(stats, str) else stats
+    unknown = [stat for stat in stats if stat not in STATS]
+    if unknown:
+        raise DataCleaningError(
+            message=f"Unknown statistic '{unknown[0]}'",
+            error_type="INVALID_VALUE",
+            details=f"stats must be chosen from: {', '.join(STATS)}"
+        )
+    return tuple(stat for stat in STATS if stat in stats)
+
+def profile_workers(workers=None):
+    """Worker processes for profiling: the request's count, else CRESCO_PROFILE_WORKERS, else 1"""
+    try:
+        workers = int(workers or os.environ.get("CRESCO_PROFILE_WORKERS") or 1)
+    except (TypeError, ValueError):
+        workers = 0
+    if workers < 1:
+        raise DataCleaningError(
+            message="Invalid worker count",
+            error_type="INVALID_VALUE",
+            details="workers must be a positive integer"
+        )
+    return workers
+
+def _profile_group(group, stats, data=None):
+    data = _shared_data if data is None else data
+    return {column: column_info(data[column], stats) for column in group}
 
+def profile_columns_parallel(data, stats=STATS, workers=2):
+    """{column: column_info} computed by a pool of worker processes, one group of columns each.
+
+    Columns are dealt round-robin so that each group mixes cheap and expensive kinds.
+    Where processes are forked the workers read the columns from the parent's memory
+    and only the small per-column results are pickled back; elsewhere each worker is
+    sent its own columns.
+    """
+    global _shared_data
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    names = list(data.columns)
+    groups = [names[start::workers] for start in range(min(workers, len(names)))]
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if fork else "spawn")
+    results = {}
+    try:
+        _shared_data = data if fork else None
+        with ProcessPoolExecutor(max_workers=len(groups), mp_context=context) as pool:
+            futures = [pool.submit(_profile_group, group, stats, None if fork else data[group]) for group in groups]
+            for future in futures:
+                results.update(future.result())
+    finally:
+        _shared_data = None
+    return {column: results[column] for column in names}
+
+def cached_columns(dataset_id):
+    columns = _profile_cache.get(dataset_id)
+    if columns is not None:
+        _profile_cache.move_to_end(dataset_id)
+    return columns
+
+def cache_columns(dataset_id, columns):
+    _profile_cache[dataset_id] = columns
+    _profile_cache.move_to_end(dataset_id)
+    while len(_profile_cache) > PROFILE_CACHE_SIZE:
+        _profile_cache.popitem(last=False)
+
+def profile_columns(data, dataset_id=None, previous_dataset_id=None, changes=None, stats=STATS, workers=1):
+    """{column: column_info} for data, reusing what is known about it or previous_dataset_id.
+
+    changes is the "changes" entry of a cleaning Report: the columns the step changed
+    and whether it changed which rows are present. Other columns are taken from the
+    previous profile when it is still cached; any row change recomputes everything.
+    Only profiles with every statistic are cached. With more than one worker, wide
+    sets of columns still to profile are spread over a process pool.
+    """
+    known = {}
+    previous = cached_columns(previous_dataset_id) if previous_dataset_id else None
+    if previous is not None and changes is not None and not changes.get("rows_changed", True):
+        changed = set(changes.get("columns", []))
+        known = {column: info for column, info in previous.items() if column not in changed}
+    if dataset_id:
+        known.update(cached_columns(dataset_id) or {})
+
+    missing = [column for column in data.columns if column not in known]
+    if workers > 1 and len(missing) >= 2 * PARALLEL_MIN_COLUMNS:
+        fresh = profile_columns_parallel(data[missing], stats, min(workers, len(missing) // PARALLEL_MIN_COLUMNS))
+    else:
+        fresh = {column: column_info(data[column], stats) for column in missing}
+    columns = {column: fresh[column] if column in fresh else {stat: known[column][stat] for stat in stats}
+               for column in data.columns}
+    if stats != STATS:
+        fresh = {}
+    if dataset_id and (fresh or dataset_id not in _profile_cache):
+        cache_columns(dataset_id, {**known, **fresh})
+    return columns
+
+def info_table(describe=None, dtype_counts=None, null_counts=None):
+    """Stack the describe rows, the type count rows and the null count row, leaving out any that is None"""
+    parts = []
+    if describe is not None:
+        parts.append(describe)
+    if dtype_counts is not None:
+        parts.append(dtype_counts.fillna(0).astype('int64'))
+    if null_counts is not None:
+        null_counts = pd.DataFrame(null_counts).T
         null_counts.index = ['null value count']
+        parts.append(null_counts)
 
-        df_info = pd.concat([df_info, null_counts], axis=0)
+    df_info = pd.concat(parts, axis=0)
 
-        df_info = df_info.fillna("NA/0")
+    # Nullable columns (binary payloads) cannot hold the placeholder text.
+    nullable = [column for column, dtype in df_info.dtypes.items() if isinstance(dtype, pd.api.extensions.ExtensionDtype)]
+    df_info = df_info.astype({column: object for column in nullable})
+    return df_info.fillna("NA/0")
 
-        output = io.StringIO()
-        df_info.to_csv(output, index=True)
-        return output.getvalue()
+def encode_info(df_info, output_format="csv", framed=False, compression=None):
+    if framed:
+        return StreamedBody.for_frame(df_info, output_format, index=True, compression=compression)
+    return encode_frame(df_info, output_format, index=True)
+
+def csv_info(input_data, dataset_id=None, data_format="csv", output_format="csv", framed=False, compression=None,
+             previous_dataset_id=None, changes=None, columns=None, stats=None, workers=None, data=None):
+    """Encoded info table of a dataset; data, when given, is the already loaded frame of dataset_id"""
+    try:
+        if data is None:
+            dataset_id, data = load_dataset(input_data, dataset_id, data_format)
+        stats = parse_stats(stats)
+        profiles = profile_columns(select_columns(data, columns), dataset_id, previous_dataset_id, changes, stats,
+                                   profile_workers(workers))
+        return encode_info(info_from_columns(profiles, stats), output_format, framed, compression)
 
     except DataCleaningError:
         raise
@@ -49,33 +305,385 @@ def csv_info(input_data):
             details=str(e)
         )
 
+class ColumnProfile:
+    """Mergeable summary of one column of a CSV read in chunks of text.
 
+    It follows what read_csv would infer for the whole column (integer, float,
+    boolean or text) and keeps exact count, nulls, min, max, mean and std, plus KLL
+    quantiles, a HyperLogLog distinct count and space-saving top values. Profiles of
+    any split of the rows merge into the profile of all of them.
+    """
 
-if __name__ == "__main__":
+    def __init__(self, k=200, top_k=100):
+        self.rows = 0
+        self.nulls = 0
+        self.first_null = None
+        self.numeric = True
+        self.integer = True
+        self.boolean = True
+        self.moments = RunningMoments()
+        self.quantiles = KLLSketch(k)
+        self.distinct = HyperLogLog()
+        self.frequent = SpaceSaving(top_k)
+
+    def update(self, values):
+        missing = values.isna().to_numpy()
+        if self.first_null is None and len(values):
+            self.first_null = bool(missing[0])
+        self.rows += len(values)
+        self.nulls += int(missing.sum())
+
+        present = values[~missing]
+        counts = present.value_counts(sort=False)
+        self.distinct.update(counts.index.to_numpy(dtype=object))
+        self.frequent.update_counts(counts)
+        self.boolean = self.boolean and bool(counts.index.isin(BOOLEAN_TEXT).all())
+        if self.numeric:
+            numbers = pd.to_numeric(present, errors="coerce")
+            if numbers.isna().any():
+                self.numeric = False
+            else:
+                self.integer = self.integer and pd.api.types.is_integer_dtype(numbers)
+                self.moments.update(numbers)
+                self.quantiles.update(numbers)
+
+    def merge(self, other):
+        if self.first_null is None:
+            self.first_null = other.first_null
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.numeric = self.numeric and other.numeric
+        self.integer = self.integer and other.integer
+        self.boolean = self.boolean and other.boolean
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+        return self
+
+    def describe(self):
+        """This column's part of describe(include='all')"""
+        count = self.rows - self.nulls
+        if self.numeric:
+            if count == 0:
+                return pd.Series([0] + [np.nan] * 7, index=NUMERIC_ROWS, dtype=float)
+            moments = self.moments
+            values = [count, moments.mean, moments.std(), moments.min]
+            values += [self.quantiles.quantile(q) for q in (0.25, 0.5, 0.75)] + [moments.max]
+            return pd.Series(values, index=NUMERIC_ROWS, dtype=float)
+        top, freq = self.frequent.top()
+        # The top values are exact until more than top_k distinct values have been seen.
+        unique = self.distinct.estimate() if self.frequent.saturated else len(self.frequent.counts)
+        if self.boolean:
+            top = top.lower() == "true"
+        return pd.Series([count, unique, top, freq], index=CATEGORICAL_ROWS, dtype=object)
+
+    def type_counts(self):
+        """This column's type count rows, as the in-memory profile would count them"""
+        if self.numeric:
+            kind = 0 if self.integer and self.nulls == 0 and self.rows else 0.0
+            return pd.Series([self.rows], index=[_type_label(kind)], dtype="int64")
+        present = True if self.boolean else ""
+        counts = {_type_label(present): self.rows - self.nulls, _type_label(np.nan): self.nulls}
+        labels = list(counts)[::-1] if self.first_null else list(counts)
+        return pd.Series([counts[label] for label in labels], index=labels, dtype="int64").loc[lambda c: c > 0]
+
+def profile_chunks(chunks, profiles=None):
+    """Fold chunks of text columns into a {column: ColumnProfile} dict"""
+    profiles = {} if profiles is None else profiles
+    for chunk in chunks:
+        for column, values in chunk.items():
+            profiles.setdefault(column, ColumnProfile()).update(values)
+    return profiles
+
+def merge_profiles(left, right):
+    """Merge two partial {column: ColumnProfile} dicts, e.g. from different row ranges"""
+    merged = dict(left)
+    for column, profile in right.items():
+        if column in merged:
+            merged[column].merge(profile)
+        else:
+            merged[column] = profile
+    return merged
+
+def profile_csv_stream(input_path, chunksize=STREAM_CHUNKSIZE, columns=None):
+    """Profile a CSV file chunk by chunk; only one chunk is ever held in memory"""
     try:
-        input_json = sys.stdin.read()
-        try:
-            input_data = json.loads(input_json)
-        except json.JSONDecodeError:
-            raise DataCleaningError(
-                message="Invalid JSON input",
-                error_type="JSON_PARSE_ERROR"
-            )
+        if columns:
+            select_columns(pd.read_csv(input_path, nrows=0), columns)
+        chunks = pd.read_csv(input_path, dtype=str, chunksize=chunksize, usecols=columns or None)
+        return profile_chunks(chunk[columns] if columns else chunk for chunk in chunks)
+    except FileNotFoundError as e:
+        raise DataCleaningError(
+            message="Input file not found",
+            error_type="FILE_NOT_FOUND",
+            details=str(e)
+        )
+    except pd.errors.EmptyDataError as e:
+        raise DataCleaningError(
+            message="Empty CSV data",
+            error_type="INVALID_CSV",
+            details=str(e)
+        )
+
+def profile_info(profiles, stats=STATS):
+    """The info table for merged column profiles, in the same layout csv_info returns"""
+    compute = {
+        "describe": lambda profile: profile.describe(),
+        "types": lambda profile: profile.type_counts(),
+        "nulls": lambda profile: profile.nulls
+    }
+    return info_from_columns({
+        column: {stat: compute[stat](profile) for stat in stats}
+        for column, profile in profiles.items()
+    }, stats)
+
+def csv_info_stream(input_path, chunksize=STREAM_CHUNKSIZE, output_format="csv", framed=False, compression=None,
+                    columns=None, stats=None):
+    """Info for a CSV file too large to load: (encoded info table, row count)"""
+    try:
+        stats = parse_stats(stats)
+        profiles = profile_csv_stream(input_path, chunksize, columns)
+        rows = next(iter(profiles.values())).rows if profiles else 0
+        return encode_info(profile_info(profiles, stats), output_format, framed, compression), rows
+    except DataCleaningError:
+        raise
+    except Exception as e:
+        raise DataCleaningError(
+            message="An unexpected error occurred",
+            error_type="UNKNOWN_ERROR",
+            details=str(e)
+        )
+
+def parse_sample(sample):
+    """Validate a sample request, {"method", "size", "by", "seed", "confidence"}, filling in defaults"""
+    if not isinstance(sample, dict):
+        sample = {"method": sample}
+    method = sample.get("method") or "reservoir"
+    if method not in SAMPLE_METHODS:
+        raise DataCleaningError(
+            message=f"Invalid sampling method '{method}'",
+            error_type="INVALID_METHOD",
+            details=f"Supported sampling methods: {', '.join(SAMPLE_METHODS)}"
+        )
+    if method == "stratified" and not sample.get("by"):
+        raise DataCleaningError(
+            message="Stratified sampling needs a column to stratify by",
+            error_type="MISSING_COLUMN"
+        )
+    size = sample.get("size") or SAMPLE_SIZE
+    confidence = sample.get("confidence") or SAMPLE_CONFIDENCE
+    if not isinstance(size, int) or size < 2 or not 0 < confidence < 1:
+        raise DataCleaningError(
+            message="Invalid sample parameters",
+            error_type="INVALID_VALUE",
+            details="size must be an integer of at least 2 and confidence between 0 and 1"
+        )
+    return {
+        "method": method,
+        "size": size,
+        "by": sample.get("by") if method == "stratified" else None,
+        "seed": sample.get("seed"),
+        "confidence": confidence
+    }
+
+def _bounds(estimate, variance, z, low=-float("inf"), high=float("inf")):
+    """{"Estimate", "Lower", "Upper"} of a normal confidence interval, bounds None when unknown"""
+    if np.isnan(estimate):
+        return {"Estimate": None, "Lower": None, "Upper": None}
+    margin = z * np.sqrt(variance)
+    if np.isnan(margin):
+        return {"Estimate": float(estimate), "Lower": None, "Upper": None}
+    return {"Estimate": float(estimate), "Lower": float(max(low, estimate - margin)),
+            "Upper": float(min(high, estimate + margin))}
+
+def _estimate_total(strata, hits, z):
+    """Population count of rows with a property from per-stratum sample hits (stratified estimator)"""
+    total = variance = 0.0
+    for (size, rows), hit in zip(strata, hits):
+        n = len(rows)
+        share = hit / n
+        total += size * share
+        if n < size:
+            # Finite population correction; one sampled row says nothing about the spread.
+            variance += size * size * (1 - n / size) * share * (1 - share) / (n - 1) if n > 1 else np.nan
+    return _bounds(total, variance, z, 0, sum(size for size, _ in strata))
+
+def _estimate_mean(strata, column, z):
+    """Population mean of a numeric column's present values, as a ratio estimator over strata"""
+    parts = []
+    for size, rows in strata:
+        values = rows[column].to_numpy(dtype=float)
+        parts.append((size, values, ~np.isnan(values)))
+    present = sum(size * mask.mean() for size, _, mask in parts)
+    if present == 0:
+        return _bounds(np.nan, np.nan, z)
+    mean = sum(size * np.nansum(values) / len(values) for size, values, _ in parts) / present
+    variance = 0.0
+    for size, values, mask in parts:
+        n = len(values)
+        if n < size:
+            residuals = np.where(mask, values - mean, 0.0)
+            variance += size * size * (1 - n / size) * residuals.var(ddof=1) / n if n > 1 else np.nan
+    return _bounds(mean, variance / present ** 2, z)
+
+def sample_estimates(strata, columns, stats, confidence):
+    """Population estimates with confidence bounds for the sampled columns.
+
+    describe gives the count and, for numeric columns, the mean of present values;
+    types the count of each type; nulls the null count.
+    """
+    from statistics import NormalDist
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    estimates = {}
+    for column in columns:
+        column_estimates = {}
+        if "describe" in stats:
+            column_estimates["count"] = _estimate_total(strata, [rows[column].notna().sum() for _, rows in strata], z)
+            if pd.api.types.is_numeric_dtype(strata[0][1][column]) and not pd.api.types.is_bool_dtype(strata[0][1][column]):
+                column_estimates["mean"] = _estimate_mean(strata, column, z)
+        if "types" in stats:
+            counts = [column_type_counts(rows[column]) for _, rows in strata]
+            labels = list(dict.fromkeys(label for count in counts for label in count.index))
+            for label in labels:
+                column_estimates[label] = _estimate_total(strata, [count.get(label, 0) for count in counts], z)
+        if "nulls" in stats:
+            column_estimates["null value count"] = _estimate_total(strata, [rows[column].isna().sum() for _, rows in strata], z)
+        estimates[column] = column_estimates
+    return estimates
+
+def sampled_info(sampler, columns, stats, sample):
+    """(info table of the sampled rows, summary with population estimates) from a filled RowSample"""
+    strata = sampler.strata()
+    if not strata:
+        raise DataCleaningError(
+            message="Empty CSV data",
+            error_type="EMPTY_DATA"
+        )
+    rows = pd.concat([stratum_rows for _, stratum_rows in strata]).sort_index()
+    columns = list(columns) if columns else list(rows.columns)
+    info = info_from_columns({column: column_info(rows[column], stats) for column in columns}, stats)
+    summary = {
+        "Method": sample["method"],
+        "Rows": int(sampler.population.sum()),
+        "SampleRows": len(rows),
+        "Confidence": sample["confidence"],
+        "Estimates": sample_estimates(strata, columns, stats, sample["confidence"])
+    }
+    if sample["by"] is not None:
+        summary["By"] = sample["by"]
+    return info, summary
+
+def csv_info_sample(input_data=None, dataset_id=None, data_format="csv", input_path=None, sample=None,
+                    columns=None, stats=None, chunksize=STREAM_CHUNKSIZE, output_format="csv", framed=False,
+                    compression=None):
+    """Info of a row sample: (encoded info table of the sample, summary with population estimates).
 
-        csv_data = input_data.get("csv_data")
-        if not csv_data:
+    The sample comes from a cached or sent dataset, or from a CSV file read in chunks,
+    in which case only the requested columns are parsed and the sampled text is typed
+    the way read_csv would type it.
+    """
+    try:
+        sample = parse_sample(sample)
+        stats = parse_stats(stats)
+        sampler = RowSample(sample["size"], sample["by"], sample["seed"])
+        if input_path:
+            header = pd.read_csv(input_path, nrows=0)
+            needed = list(select_columns(header, columns).columns)
+            needed = list(select_columns(header, list(dict.fromkeys(needed + [sample["by"]] if sample["by"] else needed))).columns)
+            for chunk in pd.read_csv(input_path, dtype=str, usecols=needed, chunksize=chunksize):
+                sampler.update(chunk[needed])
+            if sampler.rows is not None:
+                sampler.retype(pd.read_csv(io.StringIO(sampler.rows.to_csv(index=False))))
+        else:
+            _, data = load_dataset(input_data, dataset_id, data_format)
+            select_columns(data, columns)
+            if sample["by"]:
+                select_columns(data, [sample["by"]])
+            sampler.update(data)
+        info, summary = sampled_info(sampler, columns, stats, sample)
+        return encode_info(info, output_format, framed, compression), summary
+    except DataCleaningError:
+        raise
+    except FileNotFoundError as e:
+        raise DataCleaningError(
+            message="Input file not found",
+            error_type="FILE_NOT_FOUND",
+            details=str(e)
+        )
+    except Exception as e:
+        raise DataCleaningError(
+            message="An unexpected error occurred",
+            error_type="UNKNOWN_ERROR",
+            details=str(e)
+        )
+
+def process_request(input_data, payload=None):
+    csv_data = input_data.get("csv_data") if payload is None else payload
+    dataset_id = input_data.get("dataset_id")
+    data_format = input_data.get("data_format") or "csv"
+    output_format = negotiate_format(input_data.get("output_format"))
+    try:
+        framed, compression = response_framing(input_data)
+    except TransportError as e:
+        raise DataCleaningError(message=str(e), error_type=e.error_type, details=e.details)
+    input_path = input_data.get("input_path")
+    columns = input_data.get("columns")
+    stats = input_data.get("stats")
+    chunksize = input_data.get("chunksize") or STREAM_CHUNKSIZE
+    if input_data.get("sample"):
+        if not input_path and not csv_data and not dataset_id:
             raise DataCleaningError(
                 message="CSV data is required",
                 error_type="MISSING_DATA"
             )
-        
-        data_info = csv_info(csv_data)
-        
-        response = {
-            "Status": "success",
-            "Data": data_info
-        }
-        print(json.dumps(response), file=sys.stdout)
+        info, summary = csv_info_sample(csv_data, dataset_id, data_format, input_path, input_data["sample"],
+                                        columns, stats, chunksize, output_format, framed, compression)
+        response = {"Status": "success", "Data": info, "Sample": summary}
+        if output_format != "csv":
+            response["DataFormat"] = output_format
+        return response
+
+    if input_path:
+        info, rows = csv_info_stream(input_path, chunksize, output_format=output_format, framed=framed,
+                                     compression=compression, columns=columns, stats=stats)
+        response = {"Status": "success", "Data": info, "Rows": rows}
+        if output_format != "csv":
+            response["DataFormat"] = output_format
+        return response
+
+    if not csv_data and not dataset_id:
+        raise DataCleaningError(
+            message="CSV data is required",
+            error_type="MISSING_DATA"
+        )
+
+    # The frame is passed on: one larger than the cache budget is not kept under its id.
+    dataset_id, data = load_dataset(csv_data, dataset_id, data_format)
+    response = {
+        "Status": "success",
+        "Data": csv_info(csv_data, dataset_id=dataset_id, data_format=data_format, output_format=output_format,
+                         framed=framed, compression=compression,
+                         previous_dataset_id=input_data.get("previous_dataset_id"), changes=input_data.get("changes"),
+                         columns=columns, stats=stats, workers=input_data.get("workers"), data=data),
+        "DatasetId": dataset_id
+    }
+    if output_format != "csv":
+        response["DataFormat"] = output_format
+    return response
+
+
+if __name__ == "__main__":
+    try:
+        try:
+            input_data, payload = read_request(sys.stdin.buffer)
+        except TransportError as e:
+            raise DataCleaningError(message=str(e), error_type=e.error_type, details=e.details)
+
+        response = process_request(input_data, payload)
+        trailer = write_response(response, sys.stdout)
+        if trailer and trailer.get("Status") == "error":
+            sys.exit(1)
         
     except DataCleaningError as e:
         error_response = {
@@ -0,0 +1,35 @@
+import sys
+import types
+import importlib
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported on first attribute access.
+
+    Scripts bind pandas and numpy through this so that requests rejected during
+    validation never pay for importing them. on_load runs once with the real module,
+    immediately if it had already been imported elsewhere.
+    """
+
+    def __init__(self, name, on_load=None):
+        super().__init__(name)
+        self._on_load = on_load
+        self._module = None
+        if name in sys.modules:
+            self._load()
+
+    def _load(self):
+        if self._module is None:
+            module = importlib.import_module(self.__name__)
+            if self._on_load is not None:
+                self._on_load(module)
+            self._module = module
+        return self._module
+
+    def __getattr__(self, name):
+        value = getattr(self._load(), name)
+        # Later lookups of the same name find it on the stand-in directly.
+        setattr(self, name, value)
+        return value
+
+def lazy_import(name, on_load=None):
+    return LazyModule(name, on_load)
@@ -0,0 +1,300 @@
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang and Liberty, 2016).
+
+    Values are kept in levels of compactors; level i holds items of weight 2**i.
+    When a level grows past its capacity it is sorted and every other item of its
+    upper part is promoted to the next level. Until the first compaction the sketch
+    is exact.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                # Compact only the largest items and keep half the capacity at this level, so
+                # a large batch still leaves every level populated after cascading upwards.
+                items = np.sort(items)
+                keep = self._capacity(level) // 2
+                keep += (items.size - keep) % 2
+                offset = int(self._rng.integers(2))
+                self.levels[level] = items[:keep]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[keep + offset::2]])
+            level += 1
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.nan
+        if len(self.levels) == 1:
+            return float(np.quantile(self.levels[0], q))
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(items.size, 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(values[order][min(position, values.size - 1)])
+
+class RunningMoments:
+    """Exact count, mean, variance, min and max, updated batch by batch.
+
+    Each batch is summarized with NumPy and folded in with Chan et al.'s parallel form
+    of Welford's update, which is also how two partial results merge.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        batch = RunningMoments()
+        batch.count = values.size
+        batch.mean = float(values.mean())
+        batch.m2 = float(np.square(values - batch.mean).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        self.merge(batch)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def variance(self, ddof=1):
+        return self.m2 / (self.count - ddof) if self.count > ddof else np.nan
+
+    def std(self, ddof=1):
+        return float(np.sqrt(self.variance(ddof)))
+
+class HyperLogLog:
+    """Distinct count estimate (Flajolet et al., 2007) with 2**p registers.
+
+    Values are hashed with pandas' fixed-key hash, so sketches built in different
+    processes merge, by a register-wise maximum, into exactly the sketch a single
+    pass over all values would have built. Relative error is about 1.04 / sqrt(2**p).
+    """
+
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = np.zeros(2 ** p, dtype=np.uint8)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=object)
+        if values.size == 0:
+            return
+        hashes = pd.util.hash_array(values, categorize=False)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        np.maximum.at(self.registers, index, (64 - self.p - _bit_length(rest) + 1).astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = self.registers.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(float)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+def _bit_length(values):
+    """Bit length of each uint64, without going through floats"""
+    values = values.copy()
+    lengths = np.zeros(values.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= np.uint64(1 << shift)
+        lengths += shift * high
+        values = np.where(high, values >> np.uint64(shift), values)
+    return lengths + (values > 0)
+
+class SpaceSaving:
+    """Top-k frequent values with count estimates (Metwally et al., 2005).
+
+    Up to k values are counted exactly; past that the least frequent are dropped and
+    a value arriving later is credited with the smallest count kept, so counts are
+    upper bounds. Summaries merge the same way (Cafaro et al., 2016). Values keep
+    their first-seen order, so ties between counts go to the earliest value.
+    """
+
+    def __init__(self, k=100):
+        self.k = k
+        self.counts = {}
+        self.saturated = False
+
+    def _floor(self):
+        return min(self.counts.values()) if self.saturated and self.counts else 0
+
+    def _merge_counts(self, counts, floor, saturated):
+        own_floor = self._floor()
+        merged = {value: count + counts.get(value, floor) for value, count in self.counts.items()}
+        for value, count in counts.items():
+            if value not in merged:
+                merged[value] = count + own_floor
+        self.saturated = self.saturated or saturated
+        if len(merged) > self.k:
+            kept = set(sorted(merged, key=merged.get, reverse=True)[:self.k])
+            merged = {value: count for value, count in merged.items() if value in kept}
+            self.saturated = True
+        self.counts = merged
+
+    def update(self, values):
+        self.update_counts(pd.Series(values, dtype=object).value_counts(sort=False, dropna=True))
+
+    def update_counts(self, counts):
+        """Add exact counts of a batch, a value_counts Series or a dict"""
+        if isinstance(counts, dict):
+            counts = pd.Series(counts, dtype="int64")
+        floor = 0
+        if len(counts) > self.k:
+            # Only the batch's own top k can enter the summary; the largest count left
+            # out bounds what any dropped value may have had.
+            order = np.argsort(-counts.to_numpy(), kind="stable")
+            floor = int(counts.iloc[order[self.k]])
+            counts = counts.iloc[np.sort(order[:self.k])]
+        self._merge_counts(dict(zip(counts.index, counts.tolist())), floor, floor > 0)
+
+    def merge(self, other):
+        self._merge_counts(other.counts, other._floor(), other.saturated)
+        return self
+
+    def top(self):
+        """(most frequent value, its estimated count), or (None, 0) when empty"""
+        if not self.counts:
+            return None, 0
+        value = max(self.counts, key=self.counts.get)
+        return value, self.counts[value]
+
+class RowSample:
+    """Fixed-size uniform sample of the rows of a table seen in chunks.
+
+    Every row draws a random key and the rows with the smallest keys are kept
+    (bottom-k sampling), which is a reservoir sample that also merges across row
+    ranges. Stratified by a column, the smallest keys are kept per stratum along
+    with each stratum's size, and the sample is allocated to strata in proportion
+    to their size, at least two rows each, once all rows have been seen.
+    """
+
+    def __init__(self, size, by=None, seed=None):
+        self.size = size
+        self.by = by
+        self.rows = None
+        self.keys = np.empty(0)
+        self.population = pd.Series(dtype="int64")
+        self._rng = np.random.default_rng(seed)
+
+    def _strata(self, rows):
+        if self.by is None:
+            return pd.Series(0, index=rows.index)
+        return rows[self.by]
+
+    def _keep(self, rows, keys):
+        rows = rows.reset_index(drop=True)
+        if self.by is None:
+            keep = np.argpartition(keys, self.size)[:self.size] if len(keys) > self.size else np.arange(len(keys))
+        else:
+            rank = pd.Series(keys).groupby(self._strata(rows), dropna=False, sort=False).rank(method="first")
+            keep = np.flatnonzero(rank.to_numpy() <= self.size)
+        # Kept rows stay in their original order.
+        keep = np.sort(keep)
+        self.rows = rows.take(keep).reset_index(drop=True)
+        self.keys = keys[keep]
+
+    def _count(self, rows):
+        sizes = self._strata(rows).value_counts(sort=False, dropna=False)
+        self.population = self.population.add(sizes, fill_value=0).astype("int64")
+
+    def update(self, rows):
+        self._count(rows)
+        keys = self._rng.random(len(rows))
+        if self.rows is not None:
+            rows = pd.concat([self.rows, rows], ignore_index=True)
+            keys = np.concatenate([self.keys, keys])
+        self._keep(rows, keys)
+
+    def merge(self, other):
+        if other.rows is None:
+            return self
+        self.population = self.population.add(other.population, fill_value=0).astype("int64")
+        if self.rows is None:
+            self._keep(other.rows, other.keys)
+        else:
+            self._keep(pd.concat([self.rows, other.rows], ignore_index=True), np.concatenate([self.keys, other.keys]))
+        return self
+
+    def retype(self, rows):
+        """Swap the sampled rows for the same rows with other dtypes, e.g. text parsed by read_csv.
+
+        Stratum sizes were counted under the old values of the stratum column; they are
+        keyed by the new ones, merging values that now compare equal.
+        """
+        if self.by is not None and self.rows is not None:
+            keys = dict(zip(self.rows[self.by], rows[self.by]))
+            index = self.population.index.map(lambda key: keys.get(key, key))
+            self.population = self.population.groupby(index, dropna=False, sort=False).sum()
+        self.rows = rows
+
+    def strata(self):
+        """[(stratum size, sampled rows of that stratum)], the whole table being one stratum when not stratified"""
+        if self.rows is None:
+            return []
+        total = int(self.population.sum())
+        result = []
+        for stratum, rows in self.rows.groupby(self._strata(self.rows), dropna=False, sort=False):
+            # Missing values may be keyed as None or NaN, depending on how they were counted.
+            size = int(self.population[self.population.index.isna()].sum() if pd.isna(stratum) else self.population.loc[stratum])
+            allocated = min(size, max(2, int(round(self.size * size / total))))
+            keys = pd.Series(self.keys[rows.index.to_numpy()], index=rows.index)
+            result.append((size, rows[keys.rank(method="first") <= allocated]))
+        return result
@@ -1,10 +1,46 @@
+import os
 import sys
 import base64
 import io
-import pandas as pd
-import pdfplumber
-from docx import Document
+import re
 import json
+import mmap
+from contextlib import closing
+from itertools import islice
+from lazy_import import lazy_import
+from dataset_cache import get_extraction_cache
+from transport import StreamedBody, write_response
+
+pd = lazy_import("pandas")
+
+# --framed writes the tables as length-prefixed frames (see transport.FrameWriter),
+# --gzip does the same with the frames gzip-compressed. --ndjson writes one JSON
+# record per table, with its page, as soon as the table is extracted.
+OUTPUT_FLAGS = ("--framed", "--gzip", "--ndjson")
+# --raw reads the document from stdin as is instead of base64 encoded.
+INPUT_FLAGS = ("--raw",)
+# --name=value options; --path=FILE maps the document from a file instead of reading stdin.
+OPTIONS = ("workers", "pages", "max-tables", "mode", "path")
+
+# "fast" skips pages whose content stream cannot draw a ruled table with text in it;
+# "exhaustive" runs the full table finder on every page.
+PREFILTER_MODES = ("fast", "exhaustive")
+# Fewest ruling edges of a table with two cells; a single box is not worth extracting.
+PREFILTER_MIN_EDGES = 5
+# Content stream operators the prefilter counts: rectangles, line segments, text and XObjects.
+CONTENT_OPERATORS = re.compile(rb"(?<![A-Za-z0-9*])(re|l|Tj|TJ|'|\"|Do)(?![A-Za-z0-9*])")
+
+# Fewest pages worth giving a worker process; shorter documents are read in this process.
+PARALLEL_MIN_PAGES = 4
+
+# Part of every extraction cache key; bump it when a change alters the tables extracted,
+# so that results cached by an older version are not served.
+EXTRACTION_VERSION = 1
+
+# The document being read in parallel; forked workers inherit it instead of receiving a pickled copy.
+_shared_bytes = None
+# The document as opened by a worker process.
+_worker_pdf = None
 
 class DocHandlerError(Exception):
     def __init__(self, message, error_type=None, details=None):
@@ -12,6 +48,111 @@ class DocHandlerError(Exception):
         self.error_type = error_type
         self.details = details
 
+def Document(stream):
+    # python-docx is only imported for Word documents, pdfplumber only for PDFs.
+    from docx import Document as open_document
+    return open_document(stream)
+
+class MappedDocument(io.RawIOBase):
+    """Read-only file object over a memory-mapped document, for pdfplumber and python-docx.
+
+    The mapping itself is a file object too, but it has one position for every
+    reader and, before Python 3.13, no seekable() for zipfile; each of these keeps
+    its own position and only copies the ranges that are read.
+    """
+
+    def __init__(self, mapping):
+        self._mapping = mapping
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._mapping)}[whence]
+        self._position = max(base + offset, 0)
+        return self._position
+
+    def read(self, size=-1):
+        end = len(self._mapping) if size is None or size < 0 else self._position + size
+        data = self._mapping[self._position:end]
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def document_stream(file_bytes):
+    """A file object over the document, bytes or a memory map, that does not copy it"""
+    if isinstance(file_bytes, mmap.mmap):
+        return MappedDocument(file_bytes)
+    return io.BytesIO(file_bytes)
+
+def map_document(path):
+    """The file at path mapped read-only, so its pages are read from the page cache in place"""
+    try:
+        with open(path, "rb") as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                raise DocHandlerError(
+                    message="No data provided",
+                    error_type="MISSING_DATA",
+                    details=f"{path} is empty"
+                )
+            return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError as e:
+        raise DocHandlerError(
+            message="Document file not found",
+            error_type="FILE_NOT_FOUND",
+            details=str(e)
+        )
+
+def read_document(options, flags):
+    """The document named by --path, mapped, else stdin's raw bytes with --raw, else stdin decoded from base64"""
+    if "path" in options:
+        if "--raw" in flags:
+            raise DocHandlerError(
+                message="Invalid usage",
+                error_type="INVALID_ARGS",
+                details="--raw reads stdin and --path a file; give one of them"
+            )
+        return map_document(options["path"])
+
+    if "--raw" in flags:
+        file_bytes = getattr(sys.stdin, "buffer", sys.stdin).read()
+        if not file_bytes:
+            raise DocHandlerError(
+                message="No data provided",
+                error_type="MISSING_DATA",
+                details="Input data is required"
+            )
+        return file_bytes
+
+    base64_data = sys.stdin.read().strip()
+
+    if not base64_data:
+        raise DocHandlerError(
+            message="No data provided",
+            error_type="MISSING_DATA",
+            details="Input data is required"
+        )
+
+    try:
+        return base64.b64decode(base64_data)
+    except Exception as e:
+        raise DocHandlerError(
+            message="Invalid base64 data",
+            error_type="DECODE_ERROR",
+            details=str(e)
+        )
+
 def make_columns_unique(columns):
     seen = {}
     unique_columns = []
@@ -24,24 +165,167 @@ def make_columns_unique(columns):
             unique_columns.append(item)
     return unique_columns
 
-def pdf_tables_to_list(file_bytes):
+def pdf_workers(workers=None):
+    """Worker processes for PDF pages: the --workers count, else CRESCO_PDF_WORKERS, else 1"""
     try:
-        tables = []
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            for page in pdf.pages:
-                page_tables = page.extract_tables()
-                for table in page_tables:
+        workers = int(workers or os.environ.get("CRESCO_PDF_WORKERS") or 1)
+    except (TypeError, ValueError):
+        workers = 0
+    if workers < 1:
+        raise DocHandlerError(
+            message="Invalid worker count",
+            error_type="INVALID_ARGS",
+            details="--workers must be a positive integer"
+        )
+    return workers
+
+def parse_pages(spec, page_count):
+    """0-based page numbers of a 1-based --pages spec such as "1-3,7,10-", in order; every page when spec is None"""
+    if spec is None:
+        return list(range(page_count))
+    pages = set()
+    try:
+        for part in spec.split(","):
+            first, _, last = part.partition("-")
+            first = int(first)
+            last = int(last) if last else (page_count if "-" in part else first)
+            if first < 1 or last < first:
+                raise ValueError(part)
+            pages.update(range(first - 1, min(last, page_count)))
+    except ValueError:
+        raise DocHandlerError(
+            message="Invalid page range",
+            error_type="INVALID_ARGS",
+            details=f"--pages takes 1-based pages and ranges such as 1-3,7,10-, got '{spec}'"
+        )
+    if not pages:
+        raise DocHandlerError(
+            message="No pages selected",
+            error_type="INVALID_ARGS",
+            details=f"The document has {page_count} pages"
+        )
+    return sorted(pages)
+
+def max_table_count(value):
+    if value is None:
+        return None
+    try:
+        count = int(value)
+    except ValueError:
+        count = 0
+    if count < 1:
+        raise DocHandlerError(
+            message="Invalid table count",
+            error_type="INVALID_ARGS",
+            details="--max-tables must be a positive integer"
+        )
+    return count
+
+def worth_extracting(page):
+    """Whether the page's content stream can draw a ruled table holding text.
+
+    pdfplumber finds tables from ruling lines, and laying out a page's characters
+    is most of the cost of extract_tables, so this only counts operators in the raw
+    content stream: rectangles give four edges, line segments one, and a table
+    needs PREFILTER_MIN_EDGES of them plus some text. A page drawing XObjects,
+    which may hold either, is always extracted.
+    """
+    from pdfminer.pdftypes import resolve1
+
+    content = b"\n".join(resolve1(stream).get_data() for stream in page.page_obj.contents or [])
+    counts = {}
+    for operator in CONTENT_OPERATORS.findall(content):
+        counts[operator] = counts.get(operator, 0) + 1
+    if counts.get(b"Do"):
+        return True
+    edges = 4 * counts.get(b"re", 0) + counts.get(b"l", 0)
+    text = sum(counts.get(operator, 0) for operator in (b"Tj", b"TJ", b"'", b'"'))
+    return edges >= PREFILTER_MIN_EDGES and text > 0
+
+def prefilter_mode(mode):
+    mode = mode or "fast"
+    if mode not in PREFILTER_MODES:
+        raise DocHandlerError(
+            message="Invalid mode",
+            error_type="INVALID_ARGS",
+            details=f"--mode must be one of: {', '.join(PREFILTER_MODES)}"
+        )
+    return mode
+
+def page_tables(pdf, number, mode="fast"):
+    """Raw tables of the 0-based page, closing it after; a page is not revisited"""
+    page = pdf.pages[number]
+    if mode == "fast" and not worth_extracting(page):
+        return number, []
+    tables = page.extract_tables()
+    # Parsed layout objects are the bulk of pdfplumber's memory.
+    page.close()
+    return number, tables
+
+def _open_worker_document(file_bytes):
+    global _worker_pdf
+    import pdfplumber
+
+    _worker_pdf = pdfplumber.open(document_stream(_shared_bytes if file_bytes is None else file_bytes))
+
+def _worker_page_tables(number, mode):
+    return page_tables(_worker_pdf, number, mode)
+
+def extract_pages_parallel(file_bytes, page_numbers, workers, mode="fast"):
+    """Yield page_tables of each page from a pool of worker processes, in page order.
+
+    Every worker opens the document once and takes pages one at a time, so dense
+    pages spread over the pool wherever they sit; a page is yielded as soon as it
+    and every page before it are done. Where processes are forked the workers read
+    the document from the parent's memory, or mapping, and only the raw cell text
+    is pickled back.
+    Closing the generator early cancels the pages not yet started.
+    """
+    global _shared_bytes
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if fork else "spawn")
+    _shared_bytes = file_bytes if fork else None
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_open_worker_document,
+                               initargs=(None if fork else bytes(file_bytes),))
+    try:
+        yield from pool.map(_worker_page_tables, page_numbers, [mode] * len(page_numbers))
+    finally:
+        pool.shutdown(cancel_futures=True)
+        _shared_bytes = None
+
+def iter_pdf_tables(file_bytes, pages=None, workers=1, mode="fast"):
+    """Yield (1-based page number, DataFrame) for the tables of the selected pages, as each page is done.
+
+    pages is a --pages spec (see parse_pages). Pages are read by up to workers
+    processes when there are at least PARALLEL_MIN_PAGES for each. In "fast" mode
+    pages that worth_extracting rules out are skipped.
+    """
+    try:
+        import pdfplumber
+
+        found = False
+        with pdfplumber.open(document_stream(file_bytes)) as pdf:
+            page_numbers = parse_pages(pages, len(pdf.pages))
+            workers = min(workers, len(page_numbers) // PARALLEL_MIN_PAGES)
+            if workers > 1:
+                extracted = extract_pages_parallel(file_bytes, page_numbers, workers, mode)
+            else:
+                extracted = (page_tables(pdf, number, mode) for number in page_numbers)
+            for number, tables in extracted:
+                for table in tables:
                     if table and len(table) > 0:
                         headers = make_columns_unique(table[0])
-                        df = pd.DataFrame(table[1:], columns=headers)
-                        tables.append(df)
-        if not tables:
+                        found = True
+                        yield number + 1, pd.DataFrame(table[1:], columns=headers)
+        if not found:
             raise DocHandlerError(
                 message="No tables found in PDF",
                 error_type="NO_TABLES",
                 details="The PDF document does not contain any tables"
             )
-        return tables
     except Exception as e:
         if isinstance(e, DocHandlerError):
             raise
@@ -51,10 +335,14 @@ def pdf_tables_to_list(file_bytes):
             details=str(e)
         )
 
+def pdf_tables_to_list(file_bytes, workers=1, pages=None, max_tables=None, mode="fast"):
+    with closing(iter_pdf_tables(file_bytes, pages, workers, mode)) as tables:
+        return [df for _, df in islice(tables, max_tables)]
+
 def extract_tables_from_docx(file_bytes):
     try:
         tables = []
-        doc = Document(io.BytesIO(file_bytes))
+        doc = Document(document_stream(file_bytes))
         for table in doc.tables:
             data = [[cell.text.strip() for cell in row.cells] for row in table.rows]
             if data and len(data) > 0:
@@ -77,53 +365,127 @@ def extract_tables_from_docx(file_bytes):
             details=str(e)
         )
 
-def main():
-    try:
-        if len(sys.argv) != 2:
-            raise DocHandlerError(
-                message="Invalid usage",
-                error_type="INVALID_ARGS",
-                details="Usage: script.py <file_extension>"
-            )
+def table_record(df):
+    return {
+        "data": df.to_dict(orient='records'),
+        "columns": df.columns.tolist()
+    }
 
-        file_extension = sys.argv[1].lower()
-        base64_data = sys.stdin.read().strip()
+def table_json(index, table, page=None):
+    """table is a DataFrame, or its table_record as the extraction cache holds it"""
+    result = {"table_index": index, **(table if isinstance(table, dict) else table_record(table))}
+    if page is not None:
+        result["page"] = page
+    return result
 
-        if not base64_data:
-            raise DocHandlerError(
-                message="No data provided",
-                error_type="MISSING_DATA",
-                details="Input data is required"
-            )
+def streamed_tables(tables, compression=None):
+    """The same JSON array main prints, written one table at a time into response frames"""
+    def write(handle):
+        handle.write(b"[")
+        for i, table in enumerate(tables):
+            if i > 0:
+                handle.write(b", ")
+            handle.write(json.dumps(table_json(i, table)).encode("utf-8"))
+        handle.write(b"]")
+    return StreamedBody(write, compression)
 
-        try:
-            file_bytes = base64.b64decode(base64_data)
-        except Exception as e:
+def write_ndjson(tables, handle):
+    """One table_json line per (page, table), flushed as each arrives; page is None for Word documents"""
+    for i, (page, table) in enumerate(tables):
+        handle.write(json.dumps(table_json(i, table, page)).encode("utf-8") + b"\n")
+        handle.flush()
+
+def cache_tables(tables, cache, key):
+    """Pass (page, DataFrame) pairs on as (page, table_record), storing them all once the extraction completes.
+
+    An extraction stopped early, by --max-tables or an error, is not stored.
+    """
+    records = []
+    with closing(tables):
+        for page, df in tables:
+            record = table_record(df)
+            records.append([page, record])
+            yield page, record
+    cache.put(key, json.dumps(records).encode("utf-8"))
+
+def cached_tables(payload):
+    """The (page, table_record) pairs stored by cache_tables"""
+    for page, record in json.loads(payload):
+        yield page, record
+
+def write_tables(file_bytes, file_extension, options, flags, max_tables):
+    """Extract the document's tables, or take them from the extraction cache, and write them to stdout"""
+    if file_extension == '.pdf':
+        params = {"pages": options.get("pages"), "mode": prefilter_mode(options.get("mode"))}
+        workers = pdf_workers(options.get("workers"))
+    elif file_extension in ('.doc', '.docx'):
+        if "pages" in options:
             raise DocHandlerError(
-                message="Invalid base64 data",
-                error_type="DECODE_ERROR",
-                details=str(e)
+                message="Word documents have no pages",
+                error_type="INVALID_ARGS",
+                details="--pages only applies to PDF documents"
             )
+        params = {}
+    else:
+        raise DocHandlerError(
+            message="Unsupported file format",
+            error_type="INVALID_FORMAT",
+            details=f"File extension {file_extension} is not supported"
+        )
 
+    # A cached result is written out as stored, without loading pandas or the document libraries.
+    cache = get_extraction_cache()
+    key = cache.key(file_bytes, format=file_extension, version=EXTRACTION_VERSION, **params) if cache else None
+    payload = cache.get(key) if cache else None
+    if payload is not None:
+        tables = cached_tables(payload)
+    else:
         if file_extension == '.pdf':
-            tables = pdf_tables_to_list(file_bytes)
-        elif file_extension in ('.doc', '.docx'):
-            tables = extract_tables_from_docx(file_bytes)
+            tables = iter_pdf_tables(file_bytes, params["pages"], workers, params["mode"])
         else:
+            tables = ((None, df) for df in extract_tables_from_docx(file_bytes))
+        if cache:
+            tables = cache_tables(tables, cache, key)
+
+    with closing(tables):
+        tables = islice(tables, max_tables)
+        if "--ndjson" in flags:
+            write_ndjson(tables, sys.stdout.buffer)
+            return
+        tables = [table for _, table in tables]
+
+    if flags & {"--framed", "--gzip"}:
+        compression = "gzip" if "--gzip" in flags else None
+        trailer = write_response({"Status": "success", "Data": streamed_tables(tables, compression)}, sys.stdout)
+        if trailer.get("Status") == "error":
+            sys.exit(1)
+        return
+
+    tables_json = [table_json(i, table) for i, table in enumerate(tables)]
+    print(json.dumps(tables_json))
+
+def main():
+    try:
+        options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+        args = [arg for arg in sys.argv[1:]
+                if arg not in OUTPUT_FLAGS + INPUT_FLAGS and not (arg.startswith("--") and "=" in arg)]
+        flags = set(sys.argv[1:]) - set(args) - {f"--{name}={value}" for name, value in options.items()}
+        if len(args) != 1 or set(options) - set(OPTIONS):
             raise DocHandlerError(
-                message="Unsupported file format",
-                error_type="INVALID_FORMAT",
-                details=f"File extension {file_extension} is not supported"
+                message="Invalid usage",
+                error_type="INVALID_ARGS",
+                details="Usage: script.py <file_extension> [--raw | --path=FILE] [--framed] [--gzip] [--ndjson] "
+                        "[--workers=N] [--pages=1-3,7] [--max-tables=N] [--mode=fast|exhaustive]"
             )
+        max_tables = max_table_count(options.get("max-tables"))
 
-        tables_json = []
-        for i, df in enumerate(tables):
-            tables_json.append({
-                "table_index": i,
-                "data": df.to_dict(orient='records'),
-                "columns": df.columns.tolist()
-            })
-        print(json.dumps(tables_json))
+        file_extension = args[0].lower()
+        file_bytes = read_document(options, flags)
+        try:
+            write_tables(file_bytes, file_extension, options, flags, max_tables)
+        finally:
+            if isinstance(file_bytes, mmap.mmap):
+                file_bytes.close()
 
     except DocHandlerError as e:
         error_response = {
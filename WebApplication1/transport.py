@@ -0,0 +1,374 @@
+import io
+import json
+import struct
+import zlib
+import importlib.util
+from dataset_cache import content_hasher
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+BINARY_FORMATS = ("arrow", "npz")
+DATA_FORMATS = ("csv",) + BINARY_FORMATS
+COMPRESSIONS = ("gzip",)
+
+FRAME_SIZE = 64 * 1024
+FRAME_LENGTH = struct.Struct(">I")
+
+class TransportError(Exception):
+    def __init__(self, message, error_type=None, details=None):
+        super().__init__(message)
+        self.error_type = error_type
+        self.details = details
+
+def arrow_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+def negotiate_format(requested):
+    """Pick the output format from a name or a preference-ordered list of names.
+
+    "arrow" falls back to the NumPy "npz" encoding when pyarrow is not installed;
+    anything unrecognised, or nothing at all, means the CSV default.
+    """
+    candidates = requested if isinstance(requested, list) else [requested]
+    for candidate in candidates:
+        if candidate == "arrow":
+            return "arrow" if arrow_available() else "npz"
+        if candidate in DATA_FORMATS:
+            return candidate
+    return "csv"
+
+def _check_format(data_format):
+    if data_format not in DATA_FORMATS:
+        raise TransportError(
+            message=f"Unsupported data format: {data_format}",
+            error_type="INVALID_FORMAT",
+            details=f"Supported formats: {', '.join(DATA_FORMATS)}"
+        )
+    if data_format == "arrow" and not arrow_available():
+        raise TransportError(
+            message="Arrow data format is not available",
+            error_type="INVALID_FORMAT",
+            details="pyarrow is not installed, send the data as 'npz' or 'csv'"
+        )
+
+def encode_frame(frame, data_format, index=False):
+    """Serialize a DataFrame; CSV comes back as str, the binary formats as bytes"""
+    _check_format(data_format)
+    if data_format == "csv":
+        return frame.to_csv(index=index)
+
+    # Binary formats have no index; a labelled index becomes a leading unnamed column,
+    # which is also how it appears in the CSV header.
+    frame = frame.reset_index(names="") if index else frame.reset_index(drop=True)
+    frame.columns = [str(name) for name in frame.columns]
+    if data_format == "arrow":
+        output = io.BytesIO()
+        frame.to_feather(output)
+        return output.getvalue()
+    return _encode_npz(frame)
+
+def decode_frame(payload, data_format):
+    _check_format(data_format)
+    if data_format == "csv":
+        return pd.read_csv(io.BytesIO(payload) if isinstance(payload, (bytes, bytearray, memoryview)) else io.StringIO(payload))
+    if data_format == "arrow":
+        import pyarrow
+        return pd.read_feather(pyarrow.BufferReader(payload))
+    return _decode_npz(payload)
+
+def _encode_strings(values, prefix, arrays):
+    mask = values.isna().to_numpy()
+    encoded = [str(value).encode("utf-8") if not missing else b"" for value, missing in zip(values.tolist(), mask)]
+    arrays[prefix] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    arrays[f"{prefix}_offsets"] = np.cumsum([0] + [len(value) for value in encoded], dtype=np.int64)
+    arrays[f"{prefix}_mask"] = mask
+
+def _decode_strings(arrays, prefix):
+    data = arrays[prefix].tobytes()
+    offsets = arrays[f"{prefix}_offsets"]
+    mask = arrays[f"{prefix}_mask"]
+    values = [data[start:end].decode("utf-8") for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+    return pd.Series(values, dtype=object).where(~mask, np.nan)
+
+def _encode_npz(frame):
+    """Column buffers in an uncompressed .npz archive, readable without pickle.
+
+    Numeric columns are stored as their NumPy arrays, nullable and datetime columns
+    as values plus a null mask, and text as UTF-8 bytes with offsets.
+    """
+    arrays = {}
+    columns = []
+    for position, (name, values) in enumerate(frame.items()):
+        key = f"c{position}"
+        dtype = values.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            kind = "category"
+            arrays[key] = values.cat.codes.to_numpy()
+            _encode_strings(pd.Series(values.cat.categories), f"{key}_categories", arrays)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            kind = "datetime"
+            if getattr(dtype, "tz", None) is not None:
+                values = values.dt.tz_convert("UTC").dt.tz_localize(None)
+            arrays[key] = values.to_numpy("datetime64[ns]").view(np.int64)
+            arrays[f"{key}_mask"] = values.isna().to_numpy()
+        elif isinstance(values.array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+            kind = "masked"
+            arrays[key] = values.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+            arrays[f"{key}_mask"] = values.isna().to_numpy()
+        elif isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+            kind = "numpy"
+            arrays[key] = values.to_numpy()
+        else:
+            kind = "string"
+            _encode_strings(values, key, arrays)
+        columns.append({"name": name, "kind": kind, "dtype": str(dtype)})
+
+    arrays["__meta__"] = np.frombuffer(json.dumps({"columns": columns, "rows": len(frame)}).encode("utf-8"), dtype=np.uint8)
+    output = io.BytesIO()
+    np.savez(output, **arrays)
+    return output.getvalue()
+
+def _decode_npz(payload):
+    try:
+        arrays = np.load(io.BytesIO(payload), allow_pickle=False)
+        meta = json.loads(arrays["__meta__"].tobytes())
+    except Exception as e:
+        raise TransportError(
+            message="Invalid npz data",
+            error_type="PARSE_ERROR",
+            details=str(e)
+        )
+
+    columns = {}
+    for position, column in enumerate(meta["columns"]):
+        key = f"c{position}"
+        kind = column["kind"]
+        if kind == "category":
+            categories = _decode_strings(arrays, f"{key}_categories")
+            columns[column["name"]] = pd.Categorical.from_codes(arrays[key], categories=categories)
+        elif kind == "datetime":
+            values = arrays[key].view("datetime64[ns]").copy()
+            values[arrays[f"{key}_mask"]] = np.datetime64("NaT")
+            columns[column["name"]] = values
+        elif kind == "masked":
+            columns[column["name"]] = pd.array(arrays[key], dtype=column["dtype"])
+            columns[column["name"]][arrays[f"{key}_mask"]] = pd.NA
+        elif kind == "numpy":
+            columns[column["name"]] = arrays[key]
+        else:
+            columns[column["name"]] = _decode_strings(arrays, key).to_numpy()
+    return pd.DataFrame(columns, index=pd.RangeIndex(meta["rows"]))
+
+def announces_body(request):
+    """Whether a request header is followed by a raw dataset body.
+
+    It is when the header gives 'data_length', or names a binary 'data_format'
+    with neither 'csv_data' nor a 'dataset_id' to read instead. The scripts and
+    the worker both go by this.
+    """
+    if not isinstance(request, dict):
+        return False
+    if request.get("data_length") is not None:
+        return True
+    return (request.get("data_format") in BINARY_FORMATS and "csv_data" not in request
+            and not request.get("dataset_id"))
+
+def read_request(stream):
+    """Read one request from a binary stream.
+
+    The input is either a single JSON document (the CSV-in-JSON default) or a JSON
+    header line that announces a raw body (see announces_body): the rest of the
+    stream, or exactly 'data_length' bytes of it. Returns (request, body or None).
+    """
+    header_line = stream.readline()
+    if not header_line.strip():
+        raise TransportError(
+            message="Empty input",
+            error_type="JSON_PARSE_ERROR",
+            details="No input provided"
+        )
+
+    try:
+        header = json.loads(header_line)
+    except json.JSONDecodeError:
+        header = None
+
+    if announces_body(header):
+        data_length = header.get("data_length")
+        body = stream.read(data_length) if data_length is not None else stream.read()
+        if data_length is not None and len(body) != data_length:
+            raise TransportError(
+                message="Truncated data body",
+                error_type="MISSING_DATA",
+                details=f"Expected {data_length} bytes, received {len(body)}"
+            )
+        return header, body
+
+    document = header_line if header is not None else header_line + stream.read()
+    try:
+        request = json.loads(document) if header is None else header
+    except json.JSONDecodeError as e:
+        raise TransportError(
+            message="Invalid JSON input",
+            error_type="JSON_PARSE_ERROR",
+            details=str(e)
+        )
+    return request, None
+
+def response_framing(request):
+    """(framed, compression) asked for by a request's 'framed' and 'compression' fields"""
+    compression = request.get("compression") or None
+    if compression == "none":
+        compression = None
+    if compression is not None and compression not in COMPRESSIONS:
+        raise TransportError(
+            message=f"Unsupported compression: {compression}",
+            error_type="INVALID_COMPRESSION",
+            details=f"Supported compressions: {', '.join(COMPRESSIONS)}"
+        )
+    return bool(request.get("framed")) or compression is not None, compression
+
+class FrameWriter(io.RawIOBase):
+    """Binary file object that writes length-prefixed frames to a stream.
+
+    Each frame is a 4-byte big-endian length followed by that many bytes; a zero
+    length frame ends the body. With gzip compression the frame payloads together
+    form one gzip stream, so they can be forwarded as-is with Content-Encoding: gzip.
+    The uncompressed size and content id of everything written are kept as it goes.
+    """
+
+    def __init__(self, stream, compression=None, frame_size=FRAME_SIZE):
+        super().__init__()
+        self.stream = stream
+        self.frame_size = frame_size
+        self.size = 0
+        self._hasher = content_hasher()
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compression == "gzip" else None
+        self._pending = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.size += len(data)
+        self._hasher.update(data)
+        self._pending += self._compressor.compress(data) if self._compressor else data
+        while len(self._pending) >= self.frame_size:
+            self._write_frame(self._pending[:self.frame_size])
+            del self._pending[:self.frame_size]
+        return len(data)
+
+    def _write_frame(self, payload):
+        self.stream.write(FRAME_LENGTH.pack(len(payload)))
+        self.stream.write(payload)
+
+    @property
+    def content_id(self):
+        return self._hasher.hexdigest()
+
+    def close(self):
+        if not self.closed:
+            if self._compressor:
+                self._pending += self._compressor.flush()
+            if self._pending:
+                self._write_frame(self._pending)
+                self._pending.clear()
+            self._write_frame(b"")
+        super().close()
+
+class StreamedBody:
+    """Response Data that write_response streams as frames instead of holding in memory.
+
+    write(handle) receives a binary file object and may return extra trailer fields,
+    e.g. a content id that is only known once the whole body has been written.
+    """
+
+    def __init__(self, write, compression=None):
+        self.write = write
+        self.compression = compression
+
+    @classmethod
+    def for_frame(cls, frame, data_format, index=False, compression=None, on_written=None):
+        """Body serializing a DataFrame; CSV goes straight from to_csv into the frames.
+
+        on_written(content_id) is called after the last byte and may return trailer fields.
+        """
+        _check_format(data_format)
+
+        def write(handle):
+            if data_format == "csv":
+                text = io.TextIOWrapper(handle, encoding="utf-8", newline="", write_through=True)
+                frame.to_csv(text, index=index)
+                text.detach()
+            else:
+                handle.write(encode_frame(frame, data_format, index=index))
+            return on_written(handle.content_id) if on_written else None
+
+        return cls(write, compression)
+
+def write_framed_response(response, stream):
+    """Write the JSON header line, the body frames and a JSON trailer line.
+
+    The trailer carries DataLength (uncompressed) and whatever the body adds. A
+    failure while writing the body still terminates the frames; the trailer then has
+    Status "error" and the Error that caused it. Returns the trailer.
+    """
+    body = response["Data"]
+    header = {key: value for key, value in response.items() if key != "Data"}
+    header["Framing"] = "length-prefixed"
+    if body.compression:
+        header["Compression"] = body.compression
+    stream.write(json.dumps(header).encode("utf-8") + b"\n")
+
+    writer = FrameWriter(stream, body.compression)
+    try:
+        trailer = dict(body.write(writer) or {})
+    except Exception as e:
+        trailer = {
+            "Status": "error",
+            "Error": {
+                "Type": getattr(e, "error_type", None) or "SYSTEM_ERROR",
+                "Message": "Failed to write the response body",
+                "Details": str(e)
+            }
+        }
+    writer.close()
+    trailer["DataLength"] = writer.size
+    stream.write(json.dumps(trailer).encode("utf-8") + b"\n")
+    stream.flush()
+    return trailer
+
+def read_framed_response(stream):
+    """Read a framed response back into (header, uncompressed body, trailer)"""
+    header = json.loads(stream.readline())
+    payload = bytearray()
+    while True:
+        (length,) = FRAME_LENGTH.unpack(stream.read(FRAME_LENGTH.size))
+        if length == 0:
+            break
+        payload += stream.read(length)
+    trailer = json.loads(stream.readline())
+    if header.get("Compression") == "gzip":
+        payload = zlib.decompress(bytes(payload), 31)
+    return header, bytes(payload), trailer
+
+def write_response(response, stream):
+    """Write a response as one JSON line, followed by the raw body when Data is bytes.
+
+    A StreamedBody in Data is written in frames by write_framed_response. Returns the
+    trailer of a framed response, None otherwise.
+    """
+    stream = getattr(stream, "buffer", stream)
+    data = response.get("Data")
+    if isinstance(data, StreamedBody):
+        return write_framed_response(response, stream)
+    if isinstance(data, (bytes, bytearray)):
+        header = {key: value for key, value in response.items() if key != "Data"}
+        header["DataLength"] = len(data)
+        stream.write(json.dumps(header).encode("utf-8") + b"\n")
+        stream.write(data)
+    else:
+        stream.write(json.dumps(response).encode("utf-8") + b"\n")
+    stream.flush()
@@ -1,7 +1,46 @@
-import pandas as pd
-import sys
 import io
+import re
+import sys
 import json
+from collections import OrderedDict
+from dataset_cache import content_id, get_dataset_cache
+from lazy_import import lazy_import
+from transport import (StreamedBody, TransportError, decode_frame, encode_frame, negotiate_format, read_request,
+                       response_framing, write_response)
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+# Column name suffix of each statistic; percentiles are named pNN and suffixed PNN.
+STAT_SUFFIXES = {
+    "count": "Count",
+    "sum": "Total",
+    "mean": "Mean",
+    "min": "Min",
+    "max": "Max",
+    "std": "Std",
+    "median": "Median"
+}
+METHOD_STATS = {"sum": ["sum"], "mean": ["mean"], "both": ["sum", "mean"]}
+PERCENTILE = re.compile(r"^p(\d+(?:\.\d+)?)$")
+# Statistics a rollup cube holds for every numeric column; quantiles need the rows.
+ROLLUP_STATS = ["count", "sum", "mean", "min", "max", "std"]
+ROLLUP_MAX_CARDINALITY = 100
+ROLLUP_CACHE_SIZE = 16
+BIN_METHODS = ("width", "quantile")
+DEFAULT_BINS = 20
+MAX_BINS = 1000
+# Upper bound on the rows of any chart; groups past it are folded into OTHER_LABEL.
+MAX_CHART_GROUPS = 1000
+OTHER_LABEL = "Other"
+# Upper bound on the cells of a pivoted table; the most frequent row and column keys are kept.
+MAX_PIVOT_CELLS = 10_000
+STREAM_CHUNKSIZE = 100_000
+# Statistics that merge exactly across chunks.
+STREAM_STATS = ["count", "sum", "mean", "min", "max", "std"]
+
+# Rollup cubes of recently charted datasets, by dataset id.
+_rollup_cache = OrderedDict()
 
 class DataCleaningError(Exception):
     def __init__(self, message, error_type=None, details=None):
@@ -9,16 +48,677 @@ class DataCleaningError(Exception):
         self.error_type = error_type
         self.details = str(details) if details is not None else None
 
-def vis_data(csv_data, method, target_column, selected_cols):
+def parse_data(content, data_format="csv"):
+    try:
+        return decode_frame(content, data_format)
+    except TransportError as e:
+        raise DataCleaningError(message=str(e), error_type=e.error_type, details=e.details)
+
+def load_dataset(csv_data=None, dataset_id=None, data_format="csv", csv_id=None):
+    """(dataset id, frame) of a cached dataset or of csv_data, whose content_id csv_id may already be known"""
+    cache = get_dataset_cache()
+    if dataset_id:
+        data = cache.get(dataset_id)
+        if data is None:
+            raise DataCleaningError(
+                message=f"Dataset '{dataset_id}' not found",
+                error_type="DATASET_NOT_FOUND",
+                details="The dataset is no longer cached, send the CSV data again"
+            )
+        return dataset_id, data
+    return cache.load(csv_data, lambda content: parse_data(content, data_format), csv_id)
+
+def parse_stats(method, stats=None):
+    """[(statistic, column suffix, quantile or None)] for a method or an explicit list of statistics"""
+    if not stats:
+        if method not in METHOD_STATS:
+            raise DataCleaningError(
+                message="Invalid method specified",
+                error_type="INVALID_METHOD",
+                details=f"Supported methods: sum, mean, both. Received: {method}"
+            )
+        stats = METHOD_STATS[method]
+
+    parsed = []
+    for stat in ([stats] if isinstance(stats, str) else stats):
+        percentile = PERCENTILE.match(str(stat))
+        if stat in STAT_SUFFIXES:
+            parsed.append((stat, STAT_SUFFIXES[stat], 0.5 if stat == "median" else None))
+        elif percentile and float(percentile.group(1)) <= 100:
+            parsed.append((stat, f"P{percentile.group(1)}", float(percentile.group(1)) / 100))
+        else:
+            raise DataCleaningError(
+                message=f"Invalid statistic '{stat}'",
+                error_type="INVALID_METHOD",
+                details=f"Supported statistics: {', '.join(STAT_SUFFIXES)} and percentiles such as p90"
+            )
+    return parsed
+
+def _group_quantiles(values, groups, starts, counts, quantiles):
+    """Linearly interpolated quantiles of each group's present values, as groupby().quantile() gives.
+
+    The values are sorted within their groups once for all the requested quantiles.
+    """
+    ordered = values[np.lexsort((values, groups))]
+    results = {}
+    for q in quantiles:
+        # NaN sorts last, so each group's present values lead its segment.
+        position = starts + q * np.maximum(counts - 1, 0)
+        low = np.floor(position).astype(np.intp)
+        high = np.ceil(position).astype(np.intp)
+        result = ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+        results[q] = np.where(counts > 0, result, np.nan)
+    return results
+
+def _segment_partials(values, groups, starts, sizes, names):
+    """count, sum and mean of the present values of each group segment, and min, max and m2 when named.
+
+    m2 is the sum of squared deviations from the group mean.
+    """
+    missing = np.isnan(values) if values.dtype.kind == "f" else np.zeros(len(values), dtype=bool)
+    counts = sizes - np.add.reduceat(missing.astype(np.intp), starts)
+    # Integer and boolean sums stay integers, as groupby().sum() keeps them.
+    summable = values.astype(np.int64) if values.dtype.kind == "b" else values
+    sums = np.add.reduceat(np.where(missing, 0, summable), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        partials = {"count": counts, "sum": sums, "mean": np.where(counts > 0, sums / counts, np.nan)}
+    if "min" in names:
+        partials["min"] = np.fmin.reduceat(values, starts)
+    if "max" in names:
+        partials["max"] = np.fmax.reduceat(values, starts)
+    if "m2" in names:
+        deviations = np.where(missing, 0, values - partials["mean"][groups])
+        partials["m2"] = np.add.reduceat(deviations * deviations, starts)
+    return partials
+
+def _std(counts, m2):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 1, np.sqrt(m2 / (counts - 1)), np.nan)
+
+def _column_stats(values, groups, starts, sizes, stats):
+    """{statistic: value per group} for one column whose values are ordered by group"""
+    names = {stat for stat, _, _ in stats}
+    computed = _segment_partials(values, groups, starts, sizes, names | ({"m2"} if "std" in names else set()))
+    if "std" in names:
+        computed["std"] = _std(computed["count"], computed["m2"])
+    quantiles = [q for _, _, q in stats if q is not None]
+    if quantiles:
+        computed.update(_group_quantiles(values.astype(float), groups, starts, computed["count"], quantiles))
+    return [computed[q if q is not None else stat] for stat, _, q in stats]
+
+def group_rows(codes, uniques):
+    """(uniques, rows ordered by group, their groups, group sizes, group starts) of a factorized key"""
+    present = np.flatnonzero(codes >= 0)
+    # In the smallest unsigned type the codes are radix sorted.
+    group_codes = codes[present].astype(np.min_scalar_type(max(len(uniques) - 1, 0)))
+    order = np.argsort(group_codes, kind="stable")
+    rows = present[order]
+    groups = group_codes[order]
+    sizes = np.bincount(groups, minlength=len(uniques))
+    if (sizes == 0).any():
+        # Only groups with rows are kept, e.g. of bins that no value fell in.
+        remap = np.full(len(uniques), -1)
+        kept = np.flatnonzero(sizes)
+        remap[kept] = np.arange(len(kept))
+        return group_rows(np.where(codes >= 0, remap[codes], -1), uniques[kept])
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+    return uniques, rows, groups, sizes, starts
+
+def composite_key(data, keys):
+    """(codes, uniques as a MultiIndex) of several key columns taken together, -1 where any key is missing.
+
+    Each column is factorized once and the codes are combined as code_a * groups_b +
+    code_b; the combined key is factorized again only at the end, or earlier when
+    the product of the group counts would overflow int64. Groups come in order of
+    first appearance.
+    """
+    combined, groups = None, 1
+    for key in keys:
+        codes, uniques = pd.factorize(data[key])
+        codes = codes.astype(np.int64)
+        if combined is not None:
+            if groups * len(uniques) >= 2 ** 62:
+                combined, groups = _refactorize(combined)
+            codes = np.where((combined < 0) | (codes < 0), -1, combined * len(uniques) + codes)
+        combined, groups = codes, groups * max(len(uniques), 1)
+    combined, _ = _refactorize(combined)
+    # Codes come in order of first appearance, so each group starts where the running maximum rises.
+    first = np.flatnonzero(np.diff(np.maximum.accumulate(combined), prepend=-1) > 0)
+    return combined, pd.MultiIndex.from_frame(data[list(keys)].iloc[first].reset_index(drop=True))
+
+def _refactorize(combined):
+    """(dense codes in order of first appearance, their count), keeping -1 for missing keys"""
+    present = combined >= 0
+    codes = np.full(len(combined), -1, dtype=np.int64)
+    codes[present], uniques = pd.factorize(combined[present])
+    return codes, len(uniques)
+
+def factorize_key(data, target_column):
+    """(codes, uniques) of one key column, or of a list of them as a composite key"""
+    if isinstance(target_column, str):
+        return pd.factorize(data[target_column])
+    return composite_key(data, target_column)
+
+def aggregate_groups(data, target_column, selected_cols, stats, grouping=None, ordered=False):
+    """Row count and the requested statistics of selected_cols per value of target_column.
+
+    The key is factorized once and the rows are ordered by group once; every
+    statistic of every column is then a vectorized reduction over contiguous group
+    segments. Rows come in value_counts order, most frequent group first, and rows
+    with a missing key are left out, as with groupby. grouping is group_rows of the
+    key, when it is already known; ordered keeps the rows in the order of its uniques.
+    """
+    uniques, rows, groups, sizes, starts = grouping or group_rows(*factorize_key(data, target_column))
+
+    column_stats = {}
+    for col in selected_cols:
+        values = data[col].to_numpy()
+        if values.dtype.kind not in "biuf":
+            values = data[col].to_numpy(dtype=float, na_value=np.nan)
+        if len(rows) == 0:
+            column_stats[col] = [values[:0].astype(float) for _ in stats]
+        else:
+            column_stats[col] = _column_stats(values[rows], groups, starts, sizes, stats)
+    return group_table(target_column, uniques, sizes, column_stats, stats, ordered)
+
+def value_counts_order(sizes):
+    """Group positions most frequent first, ties broken the way value_counts breaks them"""
+    # value_counts sorts its first-appearance counts the same way.
+    return pd.Series(sizes, dtype="int64").sort_values(ascending=False).index.to_numpy()
+
+def group_table(target_column, uniques, sizes, column_stats, stats, ordered=False):
+    """The chart table: key, Counts, then {col: [values per group of each statistic]} as named columns.
+
+    Rows are in value_counts order, or in the order of uniques when ordered.
+    """
+    output_order = np.arange(len(uniques)) if ordered else value_counts_order(sizes)
+    keys = uniques.take(output_order)
+    if isinstance(uniques, pd.MultiIndex):
+        result = {name: keys.get_level_values(level) for level, name in enumerate(target_column)}
+    else:
+        result = {target_column: keys}
+    result["Counts"] = sizes[output_order]
+    # Statistic by statistic, then column by column, as one groupby per statistic concatenated would.
+    for index, (_, suffix, _) in enumerate(stats):
+        for col, values in column_stats.items():
+            result[f"{col}_{suffix}"] = values[index][output_order]
+    return pd.DataFrame(result)
+
+def build_rollup(data, max_cardinality=ROLLUP_MAX_CARDINALITY):
+    """{dimension: aggregate_groups of every numeric column by it} for each low-cardinality column.
+
+    Dimensions are the columns, other than floating point ones, with at most
+    max_cardinality distinct values. Each is factorized once, both to check its
+    cardinality and to group by it.
+    """
+    measures = [col for col in data.columns if pd.api.types.is_numeric_dtype(data[col])]
+    stats = parse_stats(None, ROLLUP_STATS)
+    cube = {}
+    for column in data.columns:
+        if pd.api.types.is_float_dtype(data[column]):
+            continue
+        codes, uniques = pd.factorize(data[column])
+        if len(uniques) <= max_cardinality:
+            cube[column] = aggregate_groups(data, column, measures, stats, group_rows(codes, uniques))
+    return cube
+
+def rollup_table(cube):
+    """The cube as one long table, Dimension and Value first, for sending to the client"""
+    parts = [
+        grouped.rename(columns={dimension: "Value"}).assign(Value=lambda frame: frame["Value"].astype(str))
+        for dimension, grouped in cube.items()
+    ]
+    if not parts:
+        return pd.DataFrame(columns=["Dimension", "Value", "Counts"])
+    table = pd.concat(parts, keys=list(cube), names=["Dimension", None]).reset_index(level=0)
+    return table.reset_index(drop=True)
+
+def cached_rollup(dataset_id):
+    cube = _rollup_cache.get(dataset_id)
+    if cube is not None:
+        _rollup_cache.move_to_end(dataset_id)
+    return cube
+
+def cache_rollup(dataset_id, cube):
+    _rollup_cache[dataset_id] = cube
+    _rollup_cache.move_to_end(dataset_id)
+    while len(_rollup_cache) > ROLLUP_CACHE_SIZE:
+        _rollup_cache.popitem(last=False)
+
+def slice_rollup(cube, method, target_column, selected_cols, stats=None):
+    """vis_data's result read off a rollup cube, or None when the cube cannot answer the request"""
+    grouped = cube.get(target_column) if isinstance(target_column, str) else None
+    if grouped is None:
+        return None
+    parsed = parse_stats(method, stats)
+    if any(stat not in ROLLUP_STATS for stat, _, _ in parsed):
+        return None
+    names = [f"{col}_{suffix}" for _, suffix, _ in parsed for col in selected_cols]
+    if any(name not in grouped.columns for name in names):
+        return None
+    return grouped[[target_column, "Counts"] + names]
+
+def encode_result(result, output_format="csv", framed=False, compression=None):
+    if framed:
+        return StreamedBody.for_frame(result, output_format, compression=compression)
+    return encode_frame(result, output_format)
+
+def vis_rollup(csv_data, dataset_id=None, data_format="csv", output_format="csv", framed=False, compression=None,
+               max_cardinality=ROLLUP_MAX_CARDINALITY, data=None):
+    """Build and cache the rollup cube of a dataset: (encoded cube table, its dimensions)"""
+    try:
+        if data is None:
+            dataset_id, data = load_dataset(csv_data, dataset_id, data_format)
+        cube = build_rollup(data, max_cardinality)
+        cache_rollup(dataset_id, cube)
+        return encode_result(rollup_table(cube), output_format, framed, compression), list(cube)
+    except DataCleaningError:
+        raise
+    except Exception as e:
+        raise DataCleaningError(
+            message="An unexpected error occurred during data visualization",
+            error_type="UNKNOWN_ERROR",
+            details=str(e)
+        )
+
+def _is_ordered_key(values):
+    return ((pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values))
+            or pd.api.types.is_datetime64_any_dtype(values))
+
+def _positive_int(value, name, upper):
+    if not isinstance(value, int) or isinstance(value, bool) or not 0 < value <= upper:
+        raise DataCleaningError(
+            message=f"Invalid {name}",
+            error_type="INVALID_VALUE",
+            details=f"{name} must be an integer between 1 and {upper}"
+        )
+    return value
+
+def bin_key(values, bins):
+    """(codes, labels) of the fixed width or quantile bin of each numeric or datetime value, -1 for missing"""
+    if not _is_ordered_key(values):
+        raise DataCleaningError(
+            message=f"Column '{values.name}' must be numeric or datetime to be binned",
+            error_type="INVALID_DATA_TYPE",
+            details=f"Current type: {values.dtype}"
+        )
+    bins = bins if isinstance(bins, dict) else {"count": bins}
+    method = bins.get("method") or "width"
+    if method not in BIN_METHODS:
+        raise DataCleaningError(
+            message=f"Invalid binning method '{method}'",
+            error_type="INVALID_METHOD",
+            details=f"Supported binning methods: {', '.join(BIN_METHODS)}"
+        )
+    count = _positive_int(DEFAULT_BINS if bins.get("count") is None else bins["count"], "bin count", MAX_BINS)
+    if values.notna().sum() == 0:
+        raise DataCleaningError(
+            message=f"Column '{values.name}' has no values to bin",
+            error_type="EMPTY_COLUMN"
+        )
+    # Quantile edges that coincide, as with many repeated values, are merged into one bin.
+    binned = pd.cut(values, count) if method == "width" else pd.qcut(values, count, duplicates="drop")
+    return binned.cat.codes.to_numpy(), pd.Index(binned.cat.categories.astype(str), dtype=object)
+
+def top_key(codes, uniques, top_n):
+    """(codes, labels, ordered) keeping the top_n most frequent keys and folding the rest into OTHER_LABEL.
+
+    The kept keys come first in value_counts order, then the Other group; with no
+    more than top_n keys nothing changes.
+    """
+    if len(uniques) <= top_n:
+        return codes, uniques, False
+    remap, labels = fold_groups(np.bincount(codes[codes >= 0], minlength=len(uniques)), uniques, top_n)
+    return np.where(codes >= 0, remap[codes], -1), labels, True
+
+def fold_groups(sizes, uniques, top_n):
+    """(new group of each group, labels) keeping the top_n largest groups in value_counts order, then Other"""
+    top = value_counts_order(sizes)[:top_n]
+    remap = np.full(len(uniques), top_n)
+    remap[top] = np.arange(top_n)
+    if isinstance(uniques, pd.MultiIndex):
+        other = (OTHER_LABEL,) * uniques.nlevels
+        return remap, pd.MultiIndex.from_tuples(list(uniques.take(top)) + [other], names=uniques.names)
+    return remap, pd.Index(list(uniques.take(top)) + [OTHER_LABEL], dtype=object)
+
+def lttb(x, y, points):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps of the series (x, y), first and last included.
+
+    The points between the first and the last are split into points - 2 buckets; from
+    each, the point forming the largest triangle with the previously kept point and
+    the average of the next bucket is kept (Steinarsson, 2013).
+    """
+    n = len(x)
+    if points >= n:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    edges = (np.arange(points - 1) * (n - 2) / (points - 2)).astype(np.intp) + 1
+    edges[-1] = n - 1
+    kept = [0]
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x, next_y = x[end:edges[bucket + 2]].mean(), y[end:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        previous = kept[-1]
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        kept.append(start + int(np.argmax(areas)))
+    kept.append(n - 1)
+    return np.asarray(kept)
+
+def chart_groups(data, target_column, selected_cols, stats, bins=None, top_n=None, downsample=None, pivot=None):
+    """aggregate_groups with a bounded number of rows.
+
+    bins groups numeric or datetime keys by fixed width or quantile bins, in bin
+    order; downsample orders the groups by key and keeps as many as asked with
+    LTTB, following the first statistic, or the counts; otherwise the top_n most
+    frequent groups are kept and the rest summarized as one Other group. Anything
+    past MAX_CHART_GROUPS is folded into Other even when none of these is asked.
+    A list of key columns is grouped as one composite key, and with two keys the
+    result can be pivoted into a matrix, bounded by its cell count instead.
+    """
+    if not isinstance(target_column, str):
+        if bins or downsample:
+            raise DataCleaningError(
+                message="Binning and downsampling need a single target column",
+                error_type="INVALID_OPERATION"
+            )
+        codes, uniques = composite_key(data, target_column)
+        if pivot:
+            result = aggregate_groups(data, target_column, selected_cols, stats, group_rows(codes, uniques))
+            return pivot_groups(result, target_column, pivot)
+        top_n = _positive_int(top_n, "group count", MAX_CHART_GROUPS) if top_n else MAX_CHART_GROUPS
+        codes, labels, ordered = top_key(codes, uniques, top_n)
+        return aggregate_groups(data, target_column, selected_cols, stats, group_rows(codes, labels), ordered)
+    if pivot:
+        raise DataCleaningError(
+            message="A pivot needs two target columns",
+            error_type="INVALID_OPERATION"
+        )
+
+    key = data[target_column]
+    if bins:
+        grouping, ordered = group_rows(*bin_key(key, bins)), True
+    elif downsample:
+        downsample = _downsample_points(downsample, _is_ordered_key(key), key.dtype)
+        grouping, ordered = group_rows(*pd.factorize(key, sort=True)), True
+    else:
+        top_n = _positive_int(top_n, "group count", MAX_CHART_GROUPS) if top_n else MAX_CHART_GROUPS
+        codes, labels, ordered = top_key(*pd.factorize(key), top_n)
+        grouping = group_rows(codes, labels)
+
+    result = aggregate_groups(data, target_column, selected_cols, stats, grouping, ordered)
+    return downsample_rows(result, target_column, downsample) if downsample else result
+
+def pivot_groups(result, keys, pivot):
+    """A two-key chart table as a matrix: one row per first key, one column per second key.
+
+    pivot is True or {"value": a column of the table, Counts by default,
+    "max_cells": cap}. Past the cap only the most frequent keys of each axis are
+    kept, in proportion to how many each axis has. Both axes are sorted.
+    """
+    pivot = pivot if isinstance(pivot, dict) else {}
+    value = pivot.get("value") or "Counts"
+    max_cells = _positive_int(pivot.get("max_cells") or MAX_PIVOT_CELLS, "max_cells", MAX_PIVOT_CELLS)
+    if len(keys) != 2:
+        raise DataCleaningError(
+            message="A pivot needs two target columns",
+            error_type="INVALID_OPERATION",
+            details=f"Received {len(keys)} target columns"
+        )
+    if value not in result.columns[2:]:
+        raise DataCleaningError(
+            message=f"Pivot value '{value}' is not a column of the result",
+            error_type="INVALID_COLUMN",
+            details=f"Available columns: {', '.join(result.columns[2:])}"
+        )
+
+    row_key, column_key = keys
+    rows = result.groupby(row_key, sort=False)["Counts"].sum().sort_values(ascending=False, kind="stable")
+    columns = result.groupby(column_key, sort=False)["Counts"].sum().sort_values(ascending=False, kind="stable")
+    if len(rows) * len(columns) > max_cells:
+        kept_rows = max(1, min(len(rows), int(np.sqrt(max_cells * len(rows) / len(columns)))))
+        kept_columns = max(1, min(len(columns), max_cells // kept_rows))
+        result = result[result[row_key].isin(rows.index[:kept_rows]) & result[column_key].isin(columns.index[:kept_columns])]
+
+    matrix = result.pivot(index=row_key, columns=column_key, values=value)
+    matrix.columns = [str(column) for column in matrix.columns]
+    return matrix.reset_index()
+
+def _downsample_points(downsample, key_is_ordered, dtype):
+    downsample = _positive_int(downsample, "point count", MAX_CHART_GROUPS)
+    if downsample < 3 or not key_is_ordered:
+        raise DataCleaningError(
+            message="Downsampling needs an ordered numeric or datetime target and at least 3 points",
+            error_type="INVALID_VALUE",
+            details=f"Current type: {dtype}"
+        )
+    return downsample
+
+def downsample_rows(result, target_column, points):
+    """The rows of a chart table ordered by key that LTTB keeps, following its first statistic or its counts"""
+    if len(result) <= points:
+        return result
+    x = result[target_column]
+    x = x.to_numpy(dtype="datetime64[ns]").view(np.int64) if pd.api.types.is_datetime64_any_dtype(x) else x
+    y = result.iloc[:, 2] if result.shape[1] > 2 else result["Counts"]
+    return result.iloc[lttb(x, y, points)].reset_index(drop=True)
+
+def merge_partials(partials, codes, groups):
+    """Combine the partials of groups that share a code into groups partials, by Chan et al.'s update"""
+    count = np.zeros(groups, dtype=np.int64)
+    np.add.at(count, codes, partials["count"])
+    total = np.zeros(groups, dtype=partials["sum"].dtype)
+    np.add.at(total, codes, partials["sum"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, total / count, 0.0)
+        part_mean = np.where(partials["count"] > 0, partials["sum"] / partials["count"], 0.0)
+    m2 = np.zeros(groups)
+    np.add.at(m2, codes, partials["m2"] + partials["count"] * (part_mean - mean[codes]) ** 2)
+    minimum = np.full(groups, np.inf)
+    np.fmin.at(minimum, codes, partials["min"])
+    maximum = np.full(groups, -np.inf)
+    np.fmax.at(maximum, codes, partials["max"])
+    return {"count": count, "sum": total, "m2": m2, "min": minimum, "max": maximum}
+
+class GroupPartials:
+    """Per-group count, sum, sum of squared deviations, min and max of numeric columns, chunk by chunk.
+
+    Memory grows with the number of groups, not of rows. Keys are kept as the text
+    of the CSV and typed once at the end the way read_csv would type the whole
+    column, so groups whose text differs but whose value is the same ("1" and
+    "1.0") merge as they would in memory.
+    """
+
+    def __init__(self, target_column, columns):
+        self.target_column = target_column
+        self.columns = list(columns)
+        self.keys = pd.Index([], dtype=object)
+        self.sizes = np.zeros(0, dtype=np.int64)
+        self.rows = 0
+        self.missing_key = False
+        self.kinds = {}
+        self.partials = {col: self._empty(0) for col in self.columns}
+
+    @staticmethod
+    def _empty(groups):
+        return {"count": np.zeros(groups, dtype=np.int64), "sum": np.zeros(groups, dtype=np.int64),
+                "m2": np.zeros(groups), "min": np.full(groups, np.inf), "max": np.full(groups, -np.inf)}
+
+    def _check_kind(self, col, values):
+        kind = values.dtype.kind
+        previous = self.kinds.get(col, kind)
+        # Booleans mixed with numbers, or any text, make read_csv return an object column.
+        if kind not in "biuf" or (kind == "b") != (previous == "b"):
+            raise DataCleaningError(
+                message=f"Column '{col}' must be numeric",
+                error_type="INVALID_DATA_TYPE",
+                details=f"Current type: {values.dtype if kind not in 'biuf' else 'object'}"
+            )
+        self.kinds[col] = "f" if "f" in (kind, previous) else kind
+
+    def update(self, chunk, key=None):
+        """Fold in a chunk; key is the text of its target column when that was not read as text"""
+        self.rows += len(chunk)
+        key = chunk[self.target_column] if key is None else key
+        codes, uniques = pd.factorize(key)
+        self.missing_key = self.missing_key or bool((codes < 0).any())
+
+        ids = self.keys.get_indexer(uniques)
+        new = ids < 0
+        if new.any():
+            ids[new] = len(self.keys) + np.arange(new.sum())
+            self.keys = self.keys.append(pd.Index(uniques[new], dtype=object))
+            self.sizes = np.concatenate([self.sizes, np.zeros(new.sum(), dtype=np.int64)])
+            for col in self.columns:
+                grown = self._empty(new.sum())
+                self.partials[col] = {name: np.concatenate([values, grown[name].astype(values.dtype)])
+                                      for name, values in self.partials[col].items()}
+
+        _, rows, groups, sizes, starts = group_rows(codes, uniques)
+        self.sizes[ids] += sizes
+        for col in self.columns:
+            values = chunk[col].to_numpy()
+            self._check_kind(col, values)
+            if len(rows) == 0:
+                continue
+            self._merge(col, ids, _segment_partials(values[rows], groups, starts, sizes, {"min", "max", "m2"}))
+
+    def _merge(self, col, ids, chunk):
+        partials = self.partials[col]
+        if chunk["sum"].dtype.kind == "f" and partials["sum"].dtype.kind != "f":
+            partials["sum"] = partials["sum"].astype(float)
+        before = partials["count"][ids]
+        count = before + chunk["count"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = np.where(chunk["count"] > 0, chunk["mean"], 0.0) - np.where(before > 0, partials["sum"][ids] / before, 0.0)
+            partials["m2"][ids] += chunk["m2"] + np.where(count > 0, delta * delta * before * chunk["count"] / count, 0.0)
+        partials["count"][ids] = count
+        partials["sum"][ids] += chunk["sum"]
+        partials["min"][ids] = np.fmin(partials["min"][ids], chunk["min"])
+        partials["max"][ids] = np.fmax(partials["max"][ids], chunk["max"])
+
+    def typed_keys(self):
+        """The keys as read_csv would type the whole column: missing values can turn integers into floats"""
+        keys = list(self.keys) + ([np.nan] if self.missing_key else [])
+        text = pd.Series(keys, name=self.target_column, dtype=object).to_csv(index=False)
+        return pd.read_csv(io.StringIO(text))[self.target_column].iloc[:len(self.keys)]
+
+    def grouped(self, top_n=None):
+        """(uniques, sizes, {col: partials}, ordered) of the groups, keys typed and merged"""
+        codes, uniques = pd.factorize(self.typed_keys())
+        sizes, partials = self.sizes, self.partials
+        if len(uniques) < len(self.keys):
+            sizes = np.bincount(codes, weights=sizes, minlength=len(uniques)).astype(np.int64)
+            partials = {col: merge_partials(values, codes, len(uniques)) for col, values in partials.items()}
+        ordered = False
+        if top_n and len(uniques) > top_n:
+            remap, uniques = fold_groups(sizes, uniques, top_n)
+            sizes = np.bincount(remap, weights=sizes, minlength=top_n + 1).astype(np.int64)
+            partials = {col: merge_partials(values, remap, top_n + 1) for col, values in partials.items()}
+            ordered = True
+        return uniques, sizes, partials, ordered
+
+    def table(self, stats, top_n=None, sort_keys=False):
+        """The same table aggregate_groups gives for the whole file"""
+        uniques, sizes, partials, ordered = self.grouped(None if sort_keys else top_n)
+        if sort_keys:
+            order = np.argsort(uniques.to_numpy(), kind="stable")
+            uniques, sizes = uniques.take(order), sizes[order]
+            partials = {col: {name: values[order] for name, values in column.items()} for col, column in partials.items()}
+            ordered = True
+        column_stats = {}
+        for col, column in partials.items():
+            count = column["count"]
+            kind = self.kinds.get(col, "f")
+            with np.errstate(invalid="ignore", divide="ignore"):
+                computed = {"count": count, "sum": column["sum"], "mean": np.where(count > 0, column["sum"] / count, np.nan),
+                            "std": _std(count, column["m2"])}
+            for name in ("min", "max"):
+                values = np.where(count > 0, column[name], np.nan)
+                computed[name] = values.astype(bool if kind == "b" else np.int64) if kind in "biu" and len(values) else values
+            column_stats[col] = [computed[stat] for stat, _, _ in stats]
+        return group_table(self.target_column, uniques, sizes, column_stats, stats, ordered)
+
+def vis_data_stream(input_path, method, target_column, selected_cols, stats=None, top_n=None, downsample=None,
+                    chunksize=STREAM_CHUNKSIZE, output_format="csv", framed=False, compression=None):
+    """vis_data of a CSV file read in chunks, holding one chunk and the per-group partials: (encoded table, rows).
+
+    Percentiles, median and binning need every row and are not available here.
+    """
     try:
-        data = pd.read_csv(io.StringIO(csv_data))
-        
-        if target_column not in data.columns:
+        stats = parse_stats(method, stats)
+        unsupported = [stat for stat, _, _ in stats if stat not in STREAM_STATS]
+        if unsupported or (top_n and downsample):
             raise DataCleaningError(
-                message=f"Target column '{target_column}' not found in data",
-                error_type="INVALID_COLUMN",
-                details=f"Available columns: {', '.join(data.columns)}"
+                message="Statistic not available when streaming" if unsupported else "Use either top_n or downsample",
+                error_type="INVALID_METHOD",
+                details=f"Statistics available when streaming: {', '.join(STREAM_STATS)}"
             )
+        header = pd.read_csv(input_path, nrows=0)
+        for col in [target_column] + list(selected_cols):
+            if col not in header.columns:
+                raise DataCleaningError(
+                    message=f"Column '{col}' not found in data",
+                    error_type="INVALID_COLUMN",
+                    details=f"Available columns: {', '.join(header.columns)}"
+                )
+
+        partials = GroupPartials(target_column, selected_cols)
+        columns = list(dict.fromkeys([target_column] + list(selected_cols)))
+        # Keys are read as text, unless the target is also aggregated; its key text then comes from the values.
+        key_is_value = target_column in selected_cols
+        dtype = None if key_is_value else {target_column: str}
+        for chunk in pd.read_csv(input_path, usecols=columns, dtype=dtype, chunksize=chunksize):
+            key = chunk[target_column]
+            partials.update(chunk, key.astype(str).where(key.notna()) if key_is_value else None)
+
+        if downsample:
+            key = partials.typed_keys()
+            downsample = _downsample_points(downsample, _is_ordered_key(key), key.dtype)
+            result = downsample_rows(partials.table(stats, sort_keys=True), target_column, downsample)
+        else:
+            top_n = _positive_int(top_n, "group count", MAX_CHART_GROUPS) if top_n else MAX_CHART_GROUPS
+            result = partials.table(stats, top_n)
+        return encode_result(result, output_format, framed, compression), partials.rows
+
+    except DataCleaningError:
+        raise
+    except FileNotFoundError as e:
+        raise DataCleaningError(
+            message="Input file not found",
+            error_type="FILE_NOT_FOUND",
+            details=str(e)
+        )
+    except pd.errors.EmptyDataError:
+        raise DataCleaningError(
+            message="The input CSV data is empty",
+            error_type="EMPTY_DATA",
+            details="Please provide non-empty CSV data"
+        )
+    except Exception as e:
+        raise DataCleaningError(
+            message="An unexpected error occurred during data visualization",
+            error_type="UNKNOWN_ERROR",
+            details=str(e)
+        )
+
+def vis_data(csv_data, method, target_column, selected_cols, dataset_id=None, data_format="csv", output_format="csv", framed=False, compression=None, stats=None, bins=None, top_n=None, downsample=None, pivot=None, data=None):
+    try:
+        if data is None:
+            _, data = load_dataset(csv_data, dataset_id, data_format)
+
+        targets = [target_column] if isinstance(target_column, str) else list(target_column or [None])
+        for target in targets:
+            if target not in data.columns:
+                raise DataCleaningError(
+                    message=f"Target column '{target}' not found in data",
+                    error_type="INVALID_COLUMN",
+                    details=f"Available columns: {', '.join(data.columns)}"
+                )
             
         for col in selected_cols:
             if col not in data.columns:
@@ -34,30 +734,9 @@ def vis_data(csv_data, method, target_column, selected_cols):
                     details=f"Current type: {data[col].dtype}"
                 )
 
-        type_counts = data[target_column].value_counts().reset_index()
-        type_counts.columns = [target_column, 'Counts']
-        
-        if method == "sum":
-            grouped = data.groupby(target_column)[selected_cols].sum()
-            grouped = grouped.rename(columns={col: f"{col}_Total" for col in grouped.columns})
-        elif method == "mean":
-            grouped = data.groupby(target_column)[selected_cols].mean()
-            grouped = grouped.rename(columns={col: f"{col}_Mean" for col in grouped.columns})
-        elif method == "both":
-            grouped_sum = data.groupby(target_column)[selected_cols].sum()
-            grouped_mean = data.groupby(target_column)[selected_cols].mean()
-            grouped_sum = grouped_sum.rename(columns={col: f"{col}_Total" for col in grouped_sum.columns})
-            grouped_mean = grouped_mean.rename(columns={col: f"{col}_Mean" for col in grouped_mean.columns})
-            grouped = pd.concat([grouped_sum, grouped_mean], axis=1)
-        else:
-            raise DataCleaningError(
-                message="Invalid method specified",
-                error_type="INVALID_METHOD",
-                details=f"Supported methods: sum, mean, both. Received: {method}"
-            )
-
-        result = type_counts.merge(grouped.reset_index(), on=target_column)
-        return result.to_csv(index=False)
+        result = chart_groups(data, target_column, selected_cols, parse_stats(method, stats), bins, top_n, downsample,
+                              pivot)
+        return encode_result(result, output_format, framed, compression)
 
     except DataCleaningError:
         raise
@@ -74,36 +753,103 @@ def vis_data(csv_data, method, target_column, selected_cols):
             details=str(e)
         )
 
-if __name__ == "__main__":
+def process_request(input_data, payload=None):
+    csv_data = input_data.get("csv_data") if payload is None else payload
+    dataset_id = input_data.get("dataset_id")
+    data_format = input_data.get("data_format") or "csv"
+    output_format = negotiate_format(input_data.get("output_format"))
     try:
-        input_json = sys.stdin.read()
-        try:
-            input_data = json.loads(input_json)
-        except json.JSONDecodeError as e:
-            raise DataCleaningError(
-                message="Invalid JSON input",
-                error_type="JSON_PARSE_ERROR",
-                details=str(e)
-            )
+        framed, compression = response_framing(input_data)
+    except TransportError as e:
+        raise DataCleaningError(message=str(e), error_type=e.error_type, details=e.details)
 
-        csv_data = input_data.get("csv_data")
-        if not csv_data:
+    method = input_data.get("method")
+    target_column = input_data.get("target_column")
+    selected_cols = input_data.get("selected_cols", [])
+    stats = input_data.get("stats")
+    chart_options = {option: input_data.get(option) for option in ("bins", "top_n", "downsample", "pivot")}
+
+    input_path = input_data.get("input_path")
+    if input_path:
+        if chart_options["bins"] or chart_options["pivot"] or not isinstance(target_column, str):
             raise DataCleaningError(
-                message="CSV data is required",
-                error_type="MISSING_DATA",
-                details="The 'csv_data' field is missing or empty"
+                message="Binning, pivots and several target columns are not available when streaming",
+                error_type="INVALID_OPERATION",
+                details="Load the dataset instead"
             )
+        data, rows = vis_data_stream(input_path, method, target_column, selected_cols, stats, chart_options["top_n"],
+                                     chart_options["downsample"], input_data.get("chunksize") or STREAM_CHUNKSIZE,
+                                     output_format, framed, compression)
+        response = {"Status": "success", "Data": data, "Rows": rows}
+        if output_format != "csv":
+            response["DataFormat"] = output_format
+        return response
 
-        method = input_data.get("method")
-        target_column = input_data.get("target_column")
-        selected_cols = input_data.get("selected_cols", [])
+    if not csv_data and not dataset_id:
+        raise DataCleaningError(
+            message="CSV data is required",
+            error_type="MISSING_DATA",
+            details="The 'csv_data' field is missing or empty"
+        )
 
-        visualization_data = vis_data(csv_data, method, target_column, selected_cols)
+    # A chart of a dataset whose cube is cached is a lookup, even once the rows have been evicted.
+    cube_id = dataset_id or (content_id(csv_data) if isinstance(csv_data, (str, bytes)) else None)
+    reshaped = any(chart_options.values())
+    cube = cached_rollup(cube_id) if cube_id and method != "rollup" and not reshaped else None
+    result = slice_rollup(cube, method, target_column, selected_cols, stats) if cube is not None else None
+    if result is not None:
         response = {
             "Status": "success",
-            "Data": visualization_data
+            "Data": encode_result(result, output_format, framed, compression),
+            "DatasetId": cube_id
         }
-        print(json.dumps(response))
+        if output_format != "csv":
+            response["DataFormat"] = output_format
+        return response
+
+    try:
+        # The frame is passed on: one larger than the cache budget is not kept under its id.
+        dataset_id, data = load_dataset(csv_data, dataset_id, data_format, csv_id=cube_id)
+    except pd.errors.EmptyDataError:
+        raise DataCleaningError(
+            message="The input CSV data is empty",
+            error_type="EMPTY_DATA",
+            details="Please provide non-empty CSV data"
+        )
+
+    if method == "rollup":
+        cube, dimensions = vis_rollup(csv_data, dataset_id=dataset_id, data_format=data_format,
+                                      output_format=output_format, framed=framed, compression=compression,
+                                      max_cardinality=_positive_int(input_data.get("max_cardinality") or ROLLUP_MAX_CARDINALITY,
+                                                                    "max_cardinality", MAX_CHART_GROUPS),
+                                      data=data)
+        response = {"Status": "success", "Data": cube, "Dimensions": dimensions, "DatasetId": dataset_id}
+        if output_format != "csv":
+            response["DataFormat"] = output_format
+        return response
+
+    response = {
+        "Status": "success",
+        "Data": vis_data(csv_data, method, target_column, selected_cols, dataset_id=dataset_id,
+                         data_format=data_format, output_format=output_format, framed=framed, compression=compression,
+                         stats=stats, data=data, **chart_options),
+        "DatasetId": dataset_id
+    }
+    if output_format != "csv":
+        response["DataFormat"] = output_format
+    return response
+
+if __name__ == "__main__":
+    try:
+        try:
+            input_data, payload = read_request(sys.stdin.buffer)
+        except TransportError as e:
+            raise DataCleaningError(message=str(e), error_type=e.error_type, details=e.details)
+
+        response = process_request(input_data, payload)
+        trailer = write_response(response, sys.stdout)
+        if trailer and trailer.get("Status") == "error":
+            sys.exit(1)
         sys.exit(0)
 
     except DataCleaningError as e:
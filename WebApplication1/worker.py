@@ -0,0 +1,113 @@
+import sys
+import json
+
+import cleaning_script
+import info_script
+import visualisation_data
+from transport import announces_body, write_response
+
+class WorkerError(Exception):
+    def __init__(self, message, error_type=None, details=None):
+        super().__init__(message)
+        self.error_type = error_type
+        self.details = details
+
+OPERATIONS = {
+    "clean": cleaning_script.process_request,
+    "info": info_script.process_request,
+    "vis_data": visualisation_data.process_request
+}
+
+SCRIPT_ERRORS = (
+    WorkerError,
+    cleaning_script.DataCleaningError,
+    info_script.DataCleaningError,
+    visualisation_data.DataCleaningError
+)
+
+def error_response(error_type, message, details=None):
+    return {
+        "Status": "error",
+        "Error": {
+            "Type": error_type,
+            "Message": message,
+            "Details": details
+        }
+    }
+
+def parse_request(line):
+    try:
+        input_data = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise WorkerError(
+            message="Invalid JSON input",
+            error_type="JSON_PARSE_ERROR",
+            details=str(e)
+        )
+
+    if not isinstance(input_data, dict):
+        raise WorkerError(
+            message="Invalid request format",
+            error_type="JSON_PARSE_ERROR",
+            details="Each request must be a JSON object"
+        )
+    return input_data
+
+def handle_request(line, payload=None):
+    request_id = None
+    try:
+        input_data = parse_request(line)
+        request_id = input_data.get("request_id")
+        operation = input_data.get("operation")
+        if operation not in OPERATIONS:
+            raise WorkerError(
+                message="Unknown operation",
+                error_type="INVALID_OPERATION",
+                details=f"Supported operations: {', '.join(OPERATIONS)}. Received: {operation}"
+            )
+
+        if announces_body(input_data) and payload is None:
+            raise WorkerError(
+                message="Missing data body",
+                error_type="MISSING_DATA",
+                details="Requests with a 'data_format' must give the body size in 'data_length'"
+            )
+
+        response = OPERATIONS[operation](input_data, payload)
+
+    except SCRIPT_ERRORS as e:
+        response = error_response(e.error_type, str(e), e.details)
+    except Exception as e:
+        response = error_response("SYSTEM_ERROR", "An unexpected error occurred", str(e))
+
+    if request_id is not None:
+        response["RequestId"] = request_id
+    return response
+
+def read_payload(line, stdin):
+    """Read the raw body announced by a request header line, if any"""
+    try:
+        request = parse_request(line)
+    except WorkerError:
+        return None
+    data_length = request.get("data_length")
+    if not announces_body(request) or not isinstance(data_length, int) or data_length < 0:
+        return None
+    return stdin.read(data_length)
+
+def serve(stdin=sys.stdin.buffer, stdout=sys.stdout.buffer):
+    """Answer newline-delimited JSON requests until stdin is closed.
+
+    Each request carries an 'operation' ("clean", "info" or "vis_data") next to the
+    fields the matching script reads from stdin, and an optional 'request_id' that is
+    echoed back. A request with 'data_format' and 'data_length' is followed by that
+    many bytes of raw dataset body instead of 'csv_data'. Every request gets exactly
+    one response, errors included, so the caller can keep reusing the same process.
+    """
+    for line in stdin:
+        if not line.strip():
+            continue
+        write_response(handle_request(line, read_payload(line, stdin)), stdout)
+
+if __name__ == "__main__":
+    serve()
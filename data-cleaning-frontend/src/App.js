@@ -372,6 +372,9 @@ function App() {
                 <Tooltip title="Replace Values that Exactly match the given value">
                   <FormControlLabel value="contains" control={<Radio />} label="Replace Containing Values" />                  
                 </Tooltip>
+                <Tooltip title="Replace Values that match the given regular expression">
+                  <FormControlLabel value="regex" control={<Radio />} label="Replace Regex Matches" />
+                </Tooltip>
               </RadioGroup>
             </FormControl>              
           </div>
@@ -408,6 +411,8 @@ function App() {
               <MenuItem key="type-str" value="str">String (str)</MenuItem>
               <MenuItem key="type-bool" value="bool">Boolean (bool)</MenuItem>
               <MenuItem key="type-float" value="float">Float</MenuItem>
+              <MenuItem key="type-datetime" value="datetime">Date/Time</MenuItem>
+              <MenuItem key="type-category" value="category">Category</MenuItem>
             </Select>
           </FormControl>
         </div>